@@ -7,24 +7,48 @@ posting across multiple social media platforms.
 
 import logging
 import os
+from typing import TYPE_CHECKING
 
-from .blue_sky_api.blue_sky_poster import BlueskyPoster
-from .config import APP_TEMPLATES, GOOGLE_API_KEY
-from .facebook_api.facebook_poster import FacebookPoster
-from .imagekit_api.imagekit_upload_image import ImageKitUploader
-from .instagram_api.instagram_poster import InstagramPoster
-from .PosterGenerator import AdContent, AppInfo, PosterGenerator
-from .twitter_api.twitter_poster import TwitterPoster
+from . import config as app_config
+from .config import APP_TEMPLATES
+from .media_cache import cached_upload
+from .platform_registry import get_poster_class, get_uploader_class
+from .posting_executor import PlatformPostingExecutor
+from .posting_progress import PostingCheckpoint
+
+# Platform posters and the generator (google.genai, PIL) are imported on first
+# use, so importing AdPoster stays cheap for the web interface
+if TYPE_CHECKING:
+    from .PosterGenerator import AdContent
 
 
 class AdPoster:
     """Main AdPoster class for generating social media ads"""
 
-    def __init__(self):
-        pass
+    def __init__(self, transport=None):
+        # HttpTransport for the platform APIs; None uses the shared one
+        self.transport = transport
+        self.generation_errors: dict[str, str] = {}
+        self.stage_timings: dict[str, dict] = {}
+        self.campaign_file = None
+
+    def post_ad(
+        self,
+        platform: str,
+        image_path: str,
+        body_text: str,
+        app_url: str,
+        on_step=None,
+        checkpoint=None,
+    ):
+        """Post ad to specified platform.
 
-    def post_ad(self, platform: str, image_path: str, body_text: str, app_url: str):
-        """Post ad to specified platform"""
+        ``on_step(step, status, message, duration_ms)`` is called as each
+        posting step (login, upload, publish, ...) starts and finishes.
+        Pass the ``PostingCheckpoint`` of a failed attempt to resume it
+        without repeating the steps that already succeeded.
+        """
+        checkpoint = checkpoint or PostingCheckpoint()
         logging.info("AdPoster.post_ad() called - Platform: %s", platform)
         logging.info(
             "Parameters: image_path=%s, body_text_length=%s, app_url=%s",
@@ -36,7 +60,9 @@ class AdPoster:
         try:
             if platform == "facebook":
                 logging.info("Initializing FacebookPoster...")
-                poster = FacebookPoster()
+                poster = get_poster_class("facebook")(
+                    on_step=on_step, transport=self.transport, checkpoint=checkpoint
+                )
                 logging.info(
                     "Calling FacebookPoster.post_image_and_comment() with image: %s",
                     image_path,
@@ -48,7 +74,9 @@ class AdPoster:
 
             elif platform == "twitter":
                 logging.info("Initializing TwitterPoster...")
-                poster = TwitterPoster()
+                poster = get_poster_class("twitter")(
+                    on_step=on_step, checkpoint=checkpoint
+                )
                 logging.info(
                     "Calling TwitterPoster.post_text_and_link() with text: %s...",
                     body_text[:50],
@@ -58,7 +86,9 @@ class AdPoster:
 
             elif platform == "bluesky":
                 logging.info("Initializing BlueskyPoster...")
-                poster = BlueskyPoster()
+                poster = get_poster_class("bluesky")(
+                    on_step=on_step, transport=self.transport, checkpoint=checkpoint
+                )
                 logging.info(
                     "Calling BlueskyPoster.post_image() with image: %s", image_path
                 )
@@ -67,24 +97,40 @@ class AdPoster:
 
             elif platform == "instagram":
                 logging.info("Initializing InstagramPoster and ImageKitUploader...")
-                poster = InstagramPoster()
-                uploader = ImageKitUploader()
-
-                logging.info("Uploading image to ImageKit: %s", image_path)
-                uploaded_url = uploader.upload_image(
-                    image_path, "uploaded_image.jpg", tags=["ads", "upload"]
+                poster = get_poster_class("instagram")(
+                    on_step=on_step, transport=self.transport, checkpoint=checkpoint
                 )
+                uploader = get_uploader_class("imagekit")()
 
-                if uploaded_url:
-                    logging.info(
-                        "Image uploaded successfully to ImageKit. URL: %s", uploaded_url
+                def upload():
+                    logging.info("Uploading image to ImageKit: %s", image_path)
+                    url = uploader.upload_image(
+                        image_path, "uploaded_image.jpg", tags=["ads", "upload"]
                     )
-                    result = poster.post_image(uploaded_url, body_text)
-                    logging.info("Instagram posting result: %s", result)
-                else:
-                    error_msg = "Image upload to ImageKit failed"
-                    logging.error(error_msg)
-                    raise RuntimeError(error_msg)
+                    if not url:
+                        error_msg = "Image upload to ImageKit failed"
+                        logging.error(error_msg)
+                        raise RuntimeError(error_msg)
+                    return url
+
+                uploaded_url = checkpoint.step(
+                    on_step,
+                    "upload_image",
+                    "Uploading image to ImageKit",
+                    "image_url",
+                    lambda: cached_upload(
+                        image_path,
+                        "imagekit",
+                        upload,
+                        account=app_config.IMAGEKIT_URL_ENDPOINT,
+                    )[0],
+                )
+
+                logging.info(
+                    "Image uploaded successfully to ImageKit. URL: %s", uploaded_url
+                )
+                result = poster.post_image(uploaded_url, body_text)
+                logging.info("Instagram posting result: %s", result)
             else:
                 error_msg = "Unsupported platform: %s"
                 logging.error(error_msg, platform)
@@ -100,50 +146,114 @@ class AdPoster:
             # Re-raise the exception so the web interface can handle it
             raise e
 
-    def post_to_all(self, ads_data: dict[str, AdContent]):
-        """Post ads to all specified platforms"""
+    def post_to_all(self, ads_data: dict[str, "AdContent"]) -> dict:
+        """Post ads to all specified platforms at the same time.
+
+        Returns the aggregated result of ``PlatformPostingExecutor.run``.
+        """
+        tasks = {}
         for platform, ad_content in ads_data.items():
             image_path = ad_content.image_path
             body_text = ad_content.body_text
             app_url = ad_content.app_url
-            print(f"Posting to {platform}...")
             if body_text:
                 if not image_path or not os.path.exists(image_path):
                     print(
                         f"No valid image path for {platform}, posting without image..."
                     )
 
-                self.post_ad(platform, image_path, body_text, app_url)
+                tasks[platform] = self._posting_task(
+                    platform, image_path, body_text, app_url
+                )
             else:
                 print(f"Missing image or text for {platform}, skipping...")
 
+        if not tasks:
+            return {"status": "failed", "elapsed_ms": 0, "platforms": {}}
+
+        print(f"Posting to {', '.join(tasks)}...")
+        executor = PlatformPostingExecutor(
+            max_workers=len(tasks),
+            default_timeout=app_config.POST_TIMEOUT_SECONDS,
+            timeouts=app_config.POST_TIMEOUTS_BY_PLATFORM,
+        )
+        try:
+            result = executor.run(tasks)
+        finally:
+            executor.shutdown(wait_for_tasks=False)
+        for platform, outcome in result["platforms"].items():
+            print(f"{platform}: {outcome['status']} {outcome.get('error', '')}")
+        return result
+
+    def _posting_task(self, platform, image_path, body_text, app_url):
+        def task():
+            self.post_ad(platform, image_path, body_text, app_url)
+            return {"status": "completed"}
+
+        return task
+
     def generate_and_post(self, app_info: dict, platforms: list, generate_images=True):
         """Generate ads and post to specified platforms"""
 
-        ads_data: dict[str, AdContent] = self.generate_ads(
+        ads_data: dict[str, "AdContent"] = self.generate_ads(
             app_info, platforms, generate_images
         )
         self.post_to_all(ads_data)
 
     def generate_ads(
-        self, app_info: dict, platforms: list, generate_images=True
-    ) -> dict[str, AdContent]:
-        """Generate ads for specified platforms and return the data"""
-        if not GOOGLE_API_KEY:
+        self,
+        app_info: dict,
+        platforms: list,
+        generate_images=True,
+        use_cache=True,
+        on_field=None,
+        on_progress=None,
+        app_key=None,
+        master_image=None,
+    ) -> dict[str, "AdContent"]:
+        """Generate ads for specified platforms and return the data.
+
+        Pass ``use_cache=False`` to bypass cached ad text and ask Gemini again,
+        ``on_field(platform, field, value)`` to receive each text field as soon
+        as it has been generated, and ``on_progress(platform, stage, status)``
+        to follow each platform through text and image generation.
+        ``app_key`` is saved with the campaign so its app is known later.
+        ``master_image`` derives every platform's image from one generated
+        image (defaults to the ``master_image_mode`` setting).
+        """
+        # Read through the module so a reload from /config is picked up
+        google_api_key = app_config.GOOGLE_API_KEY
+        if not google_api_key:
             print("Please set your GOOGLE_API_KEY in configuration")
             return {}
 
-        poster_generator = PosterGenerator(GOOGLE_API_KEY)
-        ads_data: dict[str, AdContent] = poster_generator.generate_multiple_ads(
-            app_info, platforms, generate_images=generate_images
+        # Imported here: loading the generator loads google.genai and PIL
+        from .PosterGenerator import (  # pylint: disable=import-outside-toplevel
+            PosterGenerator,
+        )
+
+        poster_generator = PosterGenerator(google_api_key)
+        ads_data: dict[str, "AdContent"] = poster_generator.generate_multiple_ads(
+            app_info,
+            platforms,
+            generate_images=generate_images,
+            use_cache=use_cache,
+            on_field=on_field,
+            on_progress=on_progress,
+            master_image=master_image,
         )
+        self.generation_errors = poster_generator.generation_errors
+        self.stage_timings = poster_generator.stage_timings
 
         # Display previews
         for ad_content in ads_data.values():
             poster_generator.print_ad_preview(ad_content)
 
         # Save to file
-        saved_file = poster_generator.save_ads_to_file(ads_data)
+        saved_file = poster_generator.save_ads_to_file(
+            ads_data, app_key=app_key, app_name=app_info.name
+        )
+        self.campaign_file = str(saved_file)
         print(f"All ads saved to: {saved_file}")
 
         return ads_data
@@ -151,6 +261,8 @@ class AdPoster:
 
 def main():
     """Example usage of AdPoster"""
+    from .PosterGenerator import AppInfo  # pylint: disable=import-outside-toplevel
+
     # app_info: AppInfo = AppInfo(**APP_TEMPLATES['game_terra_nova'])
     # app_info: AppInfo = AppInfo(**APP_TEMPLATES['illusion_of_mastery'])
     app_info: AppInfo = AppInfo(**APP_TEMPLATES["dark_stories"])
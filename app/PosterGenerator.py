@@ -6,15 +6,41 @@ Generates promotional content using Google Gemini AI
 
 import json
 import logging
+import uuid
 from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional
-
-from google import genai
-
-from .config import APP_TEMPLATES, GOOGLE_API_KEY, IMAGE_AI_MODEL, IMAGEN_MODEL, PLATFORM_SETTINGS
-from .google_api.ads_image_generator import AdImageGenerator
+from typing import Callable, Dict, List, Optional
+
+from google.genai import types
+
+from . import config as app_config
+from .config import (
+    APP_TEMPLATES,
+    BATCH_TEXT_GENERATION,
+    GENERATION_CONCURRENCY,
+    GENERATION_QUEUE_SIZE,
+    GOOGLE_API_KEY,
+    IMAGE_GENERATION_CONCURRENCY,
+    MASTER_IMAGE_MODE,
+    MASTER_IMAGE_SIZE,
+    PLATFORM_SETTINGS,
+)
+from .generation_pipeline import AdGenerationPipeline
+from .google_api.client_registry import get_genai_client, get_image_generator
+from .image_variants import choose_master_aspect_ratio
+from .json_stream import IncrementalJsonParser, parse_json_text
+from .response_cache import ResponseCache, get_response_cache
+
+
+def file_stamp() -> str:
+    """Return a timestamp plus random suffix for generated file names.
+
+    Jobs run concurrently in several server processes, so two of them can
+    finish in the same second; the suffix keeps their files apart.
+    """
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
 
 
 @dataclass
@@ -32,6 +58,10 @@ class AppInfo:
     screenshots: Optional[List[str]] = None
 
 
+# Called as on_field(platform, field, value) when a streamed field completes
+FieldCallback = Callable[[str, str, object], None]
+
+
 @dataclass
 class AdContent:
     """Generated ad content structure"""
@@ -57,6 +87,8 @@ class PosterGenerator:
         self.model = None
         self.client = None
         self.gemini_api_key = gemini_api_key
+        self.generation_errors: Dict[str, str] = {}
+        self.stage_timings: Dict[str, dict] = {}
         self.setup_gemini()
         self.setup_logging()
 
@@ -77,9 +109,11 @@ class PosterGenerator:
         #     )
         # )
 
-        self.client = genai.Client(api_key=self.gemini_api_key)
-        self.image_ai_model = IMAGE_AI_MODEL
-        self.imagen_model = IMAGEN_MODEL
+        # Shared, long-lived client; models are read from the config module so
+        # a reload from /config takes effect without a restart
+        self.client = get_genai_client(self.gemini_api_key)
+        self.image_ai_model = app_config.IMAGE_AI_MODEL
+        self.imagen_model = app_config.IMAGEN_MODEL
         self.logger = logging.getLogger(__name__)
 
     def setup_logging(self):
@@ -157,54 +191,51 @@ class PosterGenerator:
         return prompt
 
     def generate_ad_content(
-        self, app_info: AppInfo, platform: str
+        self,
+        app_info: AppInfo,
+        platform: str,
+        use_cache: bool = True,
+        on_field: Optional[FieldCallback] = None,
     ) -> Optional[AdContent]:
-        """Generate ad content using Gemini AI"""
+        """Generate ad content using Gemini AI.
+
+        Parsed responses are read from the response cache unless ``use_cache``
+        is False; freshly generated content is written back to it once it has
+        passed ``validate_ad_content``, and cached content that fails it is
+        dropped.
+        With ``on_field`` the response is streamed and each field (headline,
+        body_text, ...) is reported as soon as it is complete.
+        """
         try:
             prompt = self.create_prompt(app_info, platform)
-            self.logger.info("Generating ad content for %s", platform)
-
-            # Access API methods through services on the client object
-            response = self.client.models.generate_content(
-                model=self.image_ai_model, contents=prompt
-            )
-
-            # response = self.model.generate_content(prompt)
-            content_json = None
-            try:
-                # 1. Access the candidate's content
-                candidate = response.candidates[0]
-                content = candidate.content
-
-                # 2. Get the markdown-formatted text block
-                markdown_text = content.parts[0].text
-
-                # 3. Clean up the markdown and extract the JSON
-                # This removes the ```json and ``` markers
-                json_string = markdown_text.strip().lstrip("```json\n").rstrip("```")
-
-                # 4. Parse the JSON string
-                content_json = json.loads(json_string)
-
-                print(content_json)
+            cache_key = ResponseCache.make_key(self.image_ai_model, prompt)
+            content_json = self.get_cached_response(cache_key, use_cache)
+            if content_json is not None:
+                problem = self.validate_ad_content(content_json, platform)
+                if problem:
+                    # Never serve a bad reply again; ask Gemini instead
+                    self.logger.warning(
+                        "Dropping cached content for %s: %s", platform, problem
+                    )
+                    self.forget_cached_response(cache_key)
+                    content_json = None
+
+            if content_json is not None:
+                if on_field:
+                    for field, value in content_json.items():
+                        on_field(platform, field, value)
+            else:
+                self.logger.info("Generating ad content for %s", platform)
+                field_callback = partial(on_field, platform) if on_field else None
+                content_json = self.request_ad_json(prompt, field_callback)
+                # Only replies that passed validation are cached
+                if content_json and not self.validate_ad_content(
+                    content_json, platform
+                ):
+                    self.store_cached_response(cache_key, content_json)
 
-            except (AttributeError, IndexError, json.JSONDecodeError) as e:
-                print(f"Error parsing the response: {e}")
-            # Parse JSON response
-            # content_json = json.loads(response.text)
             if content_json:
-                ad_content = AdContent(
-                    platform=platform,
-                    headline=content_json["headline"],
-                    body_text=content_json["body_text"],
-                    hashtags=content_json["hashtags"],
-                    call_to_action=content_json["call_to_action"],
-                    suggested_image_description=content_json[
-                        "suggested_image_description"
-                    ],
-                    timestamp=datetime.now().isoformat(),
-                    app_url=app_info.app_url,
-                )
+                ad_content = self.build_ad_content(content_json, app_info, platform)
 
                 self.logger.info("Successfully generated ad content for %s", platform)
                 return ad_content
@@ -217,31 +248,337 @@ class PosterGenerator:
             )
             return None
 
-    def generate_multiple_ads(
-        self, app_info: AppInfo, platforms: List[str], generate_images: bool = True
+    def request_ad_json(
+        self,
+        prompt: str,
+        on_field: Optional[Callable[[str, object], None]] = None,
+        generation_config: Optional[types.GenerateContentConfig] = None,
+    ):
+        """Send a prompt to Gemini and parse the JSON it returns.
+
+        When ``on_field`` is given the response is streamed and
+        ``on_field(field, value)`` is called for each top-level field of the
+        JSON object as soon as it is complete. Returns None if the response
+        cannot be parsed.
+        """
+        try:
+            if on_field is None:
+                response = self.client.models.generate_content(
+                    model=self.image_ai_model,
+                    contents=prompt,
+                    config=generation_config,
+                )
+                return parse_json_text(response.text)
+
+            parser = IncrementalJsonParser()
+            for chunk in self.client.models.generate_content_stream(
+                model=self.image_ai_model, contents=prompt, config=generation_config
+            ):
+                for field, value in parser.feed(chunk.text or ""):
+                    on_field(field, value)
+
+            if parser.complete:
+                return parser.result
+            # The stream ended without a closing brace; try the full text
+            return parse_json_text(parser.text)
+
+        except (AttributeError, IndexError, TypeError, ValueError) as e:
+            self.logger.error("Error parsing the response: %s", e)
+            return None
+
+    def get_cached_response(self, cache_key: str, use_cache: bool = True):
+        """Return a cached parsed response, or None if absent or bypassed"""
+        cache = get_response_cache()
+        if cache is None or not use_cache:
+            return None
+        return cache.get(cache_key)
+
+    def store_cached_response(self, cache_key: str, content_json):
+        """Store a parsed response in the response cache (if enabled)"""
+        cache = get_response_cache()
+        if cache is not None:
+            cache.set(cache_key, content_json)
+
+    def forget_cached_response(self, cache_key: str):
+        """Remove a cached response that turned out to be unusable"""
+        cache = get_response_cache()
+        if cache is not None:
+            cache.delete(cache_key)
+
+    def create_batch_prompt(self, app_info: AppInfo, platforms: List[str]) -> str:
+        """Create a single prompt asking for ads for several platforms at once"""
+        requirements = []
+        for platform in platforms:
+            config = self.platform_configs.get(platform, {})
+            requirements.append(
+                f"- {platform}: maximum {config.get('max_chars', 2200)} characters "
+                f"of body text, maximum {config.get('hashtag_limit', 20)} hashtags"
+            )
+        requirements_text = "\n        ".join(requirements)
+
+        prompt = f"""
+        Create a compelling social media ad for each of these platforms:
+        {", ".join(platforms)}, promoting an Android app with the following details:
+
+        App Name: {app_info.name}
+        Description: {app_info.description}
+        Category: {app_info.category}
+        Key Features: {", ".join(app_info.key_features)}
+        Target Audience: {app_info.target_audience}
+        App URL: {app_info.app_url}
+        Game guide: [{app_info.game_guide}]
+
+        Platform Requirements (these limits are strict):
+        {requirements_text}
+
+        For every platform please provide:
+        1. An attention-grabbing headline (max 60 characters).
+        2. Engaging body text that highlights the app's key benefits and appeals
+        to the target audience.
+        3. Relevant hashtags (within the platform limit, concise and trending where
+        possible).
+        4. A strong, clear call-to-action that encourages immediate engagement
+        (e.g., download, try now, explore).
+        5. A suggested promotional image description — **must be a purely visual
+        concept, without any text, logos, or overlays**.
+
+        Format your response as strict JSON with one object per platform, keyed by
+        the platform name:
+        {{
+            "<platform>": {{
+                "headline": "Your headline here",
+                "body_text": "Your body text here",
+                "hashtags": ["hashtag1", "hashtag2", "hashtag3"],
+                "call_to_action": "Your CTA here",
+                "suggested_image_description": "Purely visual description of
+                promotional image, no text or logos"
+            }}
+        }}
+
+        Tailor each ad to what performs best on its platform.
+        """
+
+        return prompt
+
+    def validate_ad_content(self, content_json, platform: str) -> Optional[str]:
+        """Check generated content against the platform limits.
+
+        Returns a description of the first problem found, or None if valid.
+        """
+        if not isinstance(content_json, dict):
+            return "content is not a JSON object"
+
+        for key in (
+            "headline",
+            "body_text",
+            "call_to_action",
+            "suggested_image_description",
+        ):
+            if not isinstance(content_json.get(key), str) or not content_json[key]:
+                return f"missing or empty '{key}'"
+
+        hashtags = content_json.get("hashtags")
+        if not isinstance(hashtags, list):
+            return "'hashtags' is not a list"
+
+        config = self.platform_configs.get(platform, {})
+        max_chars = config.get("max_chars", 2200)
+        hashtag_limit = config.get("hashtag_limit", 20)
+        if len(content_json["body_text"]) > max_chars:
+            return (
+                f"body_text has {len(content_json['body_text'])} characters "
+                f"(max {max_chars})"
+            )
+        if len(hashtags) > hashtag_limit:
+            return f"{len(hashtags)} hashtags (max {hashtag_limit})"
+        return None
+
+    def build_ad_content(
+        self, content_json: dict, app_info: AppInfo, platform: str
+    ) -> AdContent:
+        """Build an AdContent from the JSON returned by Gemini"""
+        return AdContent(
+            platform=platform,
+            headline=content_json["headline"],
+            body_text=content_json["body_text"],
+            hashtags=content_json["hashtags"],
+            call_to_action=content_json["call_to_action"],
+            suggested_image_description=content_json["suggested_image_description"],
+            timestamp=datetime.now().isoformat(),
+            app_url=app_info.app_url,
+        )
+
+    def generate_batch_ad_content(
+        self,
+        app_info: AppInfo,
+        platforms: List[str],
+        use_cache: bool = True,
+        on_field: Optional[FieldCallback] = None,
     ) -> Dict[str, AdContent]:
-        """Generate ads for multiple platforms"""
+        """Generate ad content for several platforms with a single Gemini call.
+
+        Only platforms whose content passes ``validate_ad_content`` are
+        returned; callers should fall back to ``generate_ad_content`` for the
+        rest. With ``on_field`` the response is streamed and each valid
+        platform's fields are reported as soon as that platform is complete.
+        """
+
+        def report_platform(platform, content_json):
+            if on_field and not self.validate_ad_content(content_json, platform):
+                for field, value in content_json.items():
+                    on_field(platform, field, value)
+
+        try:
+            prompt = self.create_batch_prompt(app_info, platforms)
+            cache_key = ResponseCache.make_key(
+                self.image_ai_model,
+                prompt,
+                {"response_mime_type": "application/json"},
+            )
+            batch_json = self.get_cached_response(cache_key, use_cache)
+            if batch_json is not None and not (
+                isinstance(batch_json, dict)
+                and any(
+                    not self.validate_ad_content(batch_json.get(platform), platform)
+                    for platform in platforms
+                )
+            ):
+                self.logger.warning("Dropping unusable cached batched content")
+                self.forget_cached_response(cache_key)
+                batch_json = None
+
+            if batch_json is not None:
+                for platform in platforms:
+                    report_platform(platform, batch_json.get(platform))
+            else:
+                self.logger.info("Generating batched ad content for %s", platforms)
+                batch_json = self.request_ad_json(
+                    prompt,
+                    report_platform if on_field else None,
+                    types.GenerateContentConfig(response_mime_type="application/json"),
+                )
+                if not isinstance(batch_json, dict):
+                    raise ValueError("batched response is not a JSON object")
+                # Only the platforms that passed validation are cached
+                valid = {
+                    platform: batch_json[platform]
+                    for platform in platforms
+                    if not self.validate_ad_content(batch_json.get(platform), platform)
+                }
+                if valid:
+                    self.store_cached_response(cache_key, valid)
+
+        except (
+            ValueError,
+            TypeError,
+            KeyError,
+            AttributeError,
+            ConnectionError,
+            TimeoutError,
+        ) as e:
+            self.logger.error("Error generating batched ad content: %s", str(e))
+            return {}
+
         ads = {}
+        for platform in platforms:
+            problem = self.validate_ad_content(batch_json.get(platform), platform)
+            if problem:
+                self.logger.warning(
+                    "Batched content for %s failed validation: %s", platform, problem
+                )
+                continue
+            ads[platform] = self.build_ad_content(
+                batch_json[platform], app_info, platform
+            )
+
+        self.logger.info(
+            "Batched generation produced valid content for %d of %d platform(s)",
+            len(ads),
+            len(platforms),
+        )
+        return ads
 
+    def generate_multiple_ads(
+        self,
+        app_info: AppInfo,
+        platforms: List[str],
+        generate_images: bool = True,
+        max_workers: Optional[int] = None,
+        batch_text: Optional[bool] = None,
+        use_cache: bool = True,
+        on_field: Optional[FieldCallback] = None,
+        on_progress: Optional[Callable[[str, str, str], None]] = None,
+        master_image: Optional[bool] = None,
+    ) -> Dict[str, AdContent]:
+        """Generate ads for multiple platforms concurrently.
+
+        Text and image generation run as two overlapping stages (see
+        ``AdGenerationPipeline``), so a campaign takes roughly as long as its
+        slowest platform. With ``batch_text`` (defaults to the
+        ``batch_text_generation`` setting) all platforms' text is requested in
+        one Gemini call, with per-platform calls only for platforms whose
+        batched content fails validation. ``use_cache=False`` bypasses the
+        response cache for this run, and ``on_field`` streams each field of
+        the generated text as it completes. ``on_progress(platform, stage,
+        status)`` reports each platform moving through the text and image
+        stages. With ``master_image`` (defaults to the ``master_image_mode``
+        setting) one Imagen image is generated for the campaign and every
+        platform's image is derived from it. Per-platform failures are collected
+        in ``self.generation_errors`` and stage timings in
+        ``self.stage_timings``.
+        """
+        self.generation_errors = {}
+        self.stage_timings = {}
+
+        supported_platforms = []
         for platform in platforms:
             if platform in self.platform_configs:
-                ad_content = self.generate_ad_content(app_info, platform)
-                if ad_content:
-                    if generate_images:
-                        ad_content.image_path = self.generate_image_from_text(
-                            platform, ad_content.suggested_image_description
-                        )
-                    ads[platform] = ad_content
+                supported_platforms.append(platform)
             else:
                 self.logger.warning("Platform %s not supported", platform)
+                self.generation_errors[platform] = "Platform not supported"
+
+        if not supported_platforms:
+            return {}
+
+        pipeline = AdGenerationPipeline(
+            self,
+            text_workers=max_workers or GENERATION_CONCURRENCY,
+            image_workers=IMAGE_GENERATION_CONCURRENCY,
+            queue_size=GENERATION_QUEUE_SIZE,
+            use_cache=use_cache,
+            on_field=on_field,
+            on_progress=on_progress,
+            master_image=MASTER_IMAGE_MODE if master_image is None else master_image,
+        )
+        self.logger.info(
+            "Generating ads for %d platform(s) with %d text / %d image worker(s)",
+            len(supported_platforms),
+            pipeline.text_workers,
+            pipeline.image_workers,
+        )
+        if batch_text is None:
+            batch_text = BATCH_TEXT_GENERATION
+        ads = pipeline.run(
+            app_info, supported_platforms, generate_images, batch_text=batch_text
+        )
 
-        return ads
+        self.generation_errors.update(pipeline.errors)
+        self.stage_timings = pipeline.timings_summary()
+
+        # Keep the caller's platform order regardless of completion order
+        return {platform: ads[platform] for platform in platforms if platform in ads}
 
-    def save_ads_to_file(self, ads: Dict[str, AdContent], filename: str = None):
-        """Save generated ads to JSON file"""
+    def save_ads_to_file(
+        self,
+        ads: Dict[str, AdContent],
+        filename: str = None,
+        app_key: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ):
+        """Save generated ads to JSON file, tagged with the app they are for"""
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ads_{timestamp}.json"
+            filename = f"ads_{file_stamp()}.json"
 
         filepath = self.output_dir / filename
 
@@ -259,6 +596,10 @@ class PosterGenerator:
                 "timestamp": ad_content.timestamp,
                 "app_url": ad_content.app_url,
             }
+            if app_key:
+                ads_data[platform]["app_key"] = app_key
+            if app_name:
+                ads_data[platform]["app_name"] = app_name
 
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(ads_data, f, indent=2, ensure_ascii=False)
@@ -291,10 +632,11 @@ class PosterGenerator:
         """
 
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ads_{platform}_{timestamp}.png"
+            filename = f"ads_{platform}_{file_stamp()}.png"
             # filepath = self.output_dir / filename
-            ad_image_generator = AdImageGenerator(self.gemini_api_key, self.imagen_model)
+            ad_image_generator = get_image_generator(
+                self.gemini_api_key, self.imagen_model
+            )
             image_path = ad_image_generator.generate_image_from_text(
                 platform, prompt, self.output_dir, filename
             )
@@ -304,6 +646,29 @@ class PosterGenerator:
             print(f"An error occurred: {e}")
             return None
 
+    def generate_master_image(self, prompt: str, platforms: List[str]):
+        """Generate one image to derive the given platforms' images from.
+
+        The aspect ratio is the one that needs the least cropping for the
+        platforms. Returns a PIL image, or None on failure.
+        """
+        aspect_ratio = choose_master_aspect_ratio(platforms)
+        self.logger.info(
+            "Generating %s master image for %s", aspect_ratio, ", ".join(platforms)
+        )
+        ad_image_generator = get_image_generator(self.gemini_api_key, self.imagen_model)
+        return ad_image_generator.generate_master_image(
+            prompt, aspect_ratio, MASTER_IMAGE_SIZE or None
+        )
+
+    def derive_image(self, platform: str, master) -> str:
+        """Cut a platform's image from a master image and save it to a file"""
+        filename = f"ads_{platform}_{file_stamp()}.png"
+        ad_image_generator = get_image_generator(self.gemini_api_key, self.imagen_model)
+        return ad_image_generator.save_platform_variant(
+            master, platform, self.output_dir, filename
+        )
+
 
 # Example usage
 def main():
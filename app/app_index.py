@@ -0,0 +1,202 @@
+"""
+In-memory index for resolving which app a campaign was generated for.
+
+Campaigns store the ``app_key`` and ``app_name`` of their app in every
+platform entry, so resolving the app is a dictionary lookup. Campaign files
+written before that are migrated once by ``backfill_app_keys``, which runs
+the old name/URL/text matching and saves the key it finds.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from .campaign_repository import CampaignRepository
+from .file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_name(name: str) -> str:
+    return name.strip().lower()
+
+
+def _normalize_url(url: str) -> str:
+    return url.strip().lower().rstrip("/")
+
+
+class AppIndex:
+    """Lookup tables from app key, name and store URL to the app key"""
+
+    def __init__(self, templates: Optional[dict] = None):
+        self._names: Dict[str, str] = {}
+        self._by_name: Dict[str, str] = {}
+        self._by_url: Dict[str, str] = {}
+        self.rebuild(templates or {})
+
+    def rebuild(self, templates: dict):
+        """Rebuild the lookup tables after the app templates changed"""
+        names, by_name, by_url = {}, {}, {}
+        for key, template in templates.items():
+            name = template.get("name") or key
+            names[key] = name
+            by_name.setdefault(_normalize_name(name), key)
+            if template.get("app_url"):
+                by_url.setdefault(_normalize_url(template["app_url"]), key)
+
+        # Swap in the new tables in one step so readers never see a mix
+        self._names, self._by_name, self._by_url = names, by_name, by_url
+        logger.debug("App index rebuilt with %d app(s)", len(names))
+
+    def resolve(self, ad_data: dict) -> Optional[str]:
+        """Return the key of the app a campaign belongs to, if it is known"""
+        names, by_name, by_url = self._names, self._by_name, self._by_url
+        platforms = [data for data in ad_data.values() if isinstance(data, dict)]
+
+        for platform_data in platforms:
+            if platform_data.get("app_key") in names:
+                return platform_data["app_key"]
+        for platform_data in platforms:
+            for field, table, normalize in (
+                ("app_name", by_name, _normalize_name),
+                ("name", by_name, _normalize_name),
+                ("app_url", by_url, _normalize_url),
+            ):
+                value = platform_data.get(field)
+                if isinstance(value, str) and normalize(value) in table:
+                    return table[normalize(value)]
+        return None
+
+    def display_name(self, ad_data: dict) -> str:
+        """Return the app name to show for a campaign"""
+        key = self.resolve(ad_data)
+        if key is not None:
+            return self._names.get(key, key)
+
+        # The app may have been deleted; fall back to the name saved with it
+        for platform_data in ad_data.values():
+            if isinstance(platform_data, dict) and platform_data.get("app_name"):
+                return platform_data["app_name"]
+        return "Unknown App"
+
+    def name_for(self, key: str) -> Optional[str]:
+        """Return the current name of an app key"""
+        return self._names.get(key)
+
+    def guess_key(self, ad_data: dict) -> Optional[str]:
+        """Find a campaign's app with the legacy partial-match heuristics.
+
+        Slow (every template is compared with every platform's text); only
+        used to migrate campaigns saved without an app key.
+        """
+        names = self._names
+        urls = {key: url for url, key in self._by_url.items()}
+        for platform_data in ad_data.values():
+            if not isinstance(platform_data, dict):
+                continue
+
+            # Exact names were tried by resolve(); try partial URL matches
+            app_url = platform_data.get("app_url")
+            if isinstance(app_url, str) and app_url:
+                app_url = _normalize_url(app_url)
+                for key, url in urls.items():
+                    if url in app_url or app_url in url:
+                        return key
+
+            # If not found, try to match by keywords in headline/body text
+            if "headline" in platform_data:
+                content = (
+                    f"{platform_data['headline']} {platform_data.get('body_text', '')}"
+                ).lower()
+                for key, name in names.items():
+                    # Check if app name appears in content
+                    if name.lower() in content:
+                        return key
+        return None
+
+
+def backfill_app_keys(
+    repository: CampaignRepository, app_index: AppIndex
+) -> Dict[str, int]:
+    """Store app_key/app_name in campaign files that were saved without them"""
+    counts = {"updated": 0, "unmatched": 0, "skipped": 0}
+    try:
+        file_names = [
+            name for name in os.listdir(repository.output_dir) if name.endswith(".json")
+        ]
+    except OSError as e:
+        logger.error("Could not list %s: %s", repository.output_dir, e)
+        return counts
+
+    for file_name in file_names:
+        try:
+            ad_data = repository.load(file_name)
+        except (OSError, ValueError):
+            counts["skipped"] += 1
+            continue
+        if not isinstance(ad_data, dict):
+            counts["skipped"] += 1
+            continue
+
+        platforms = [data for data in ad_data.values() if isinstance(data, dict)]
+        if not platforms or all("app_key" in data for data in platforms):
+            counts["skipped"] += 1
+            continue
+
+        key = app_index.resolve(ad_data) or app_index.guess_key(ad_data)
+        if key is None:
+            counts["unmatched"] += 1
+            continue
+
+        def add_keys(ad_data, key=key):
+            for platform_data in ad_data.values():
+                if isinstance(platform_data, dict):
+                    platform_data.setdefault("app_key", key)
+                    platform_data.setdefault("app_name", app_index.name_for(key))
+
+        # Under the campaign lock, so a concurrent update is not overwritten
+        try:
+            repository.update(file_name, add_keys)
+            counts["updated"] += 1
+        except (OSError, ValueError) as e:
+            logger.error("Could not update %s: %s", file_name, e)
+
+    logger.info(
+        "App key backfill: %d updated, %d unmatched, %d skipped",
+        counts["updated"],
+        counts["unmatched"],
+        counts["skipped"],
+    )
+    return counts
+
+
+def backfill_app_keys_once(
+    repository: CampaignRepository, app_index: AppIndex, marker_path: str
+):
+    """Run backfill_app_keys unless the marker file says it already ran"""
+    # Every server process calls this at startup; the lock lets one of them
+    # run the backfill while the others wait and then find the marker
+    with file_lock(f"{marker_path}.lock"):
+        if os.path.exists(marker_path):
+            return
+        counts = backfill_app_keys(repository, app_index)
+        try:
+            os.makedirs(os.path.dirname(marker_path), exist_ok=True)
+            with open(marker_path, "w", encoding="utf-8") as f:
+                json.dump(counts, f)
+        except OSError as e:
+            logger.warning("Could not write backfill marker %s: %s", marker_path, e)
+
+
+def main():
+    """Backfill app keys into existing campaign files"""
+    from .config import APP_TEMPLATES  # pylint: disable=import-outside-toplevel
+
+    logging.basicConfig(level=logging.INFO)
+    output_dir = os.path.join(os.path.dirname(__file__), "..", "output")
+    print(backfill_app_keys(CampaignRepository(output_dir), AppIndex(APP_TEMPLATES)))
+
+
+if __name__ == "__main__":
+    main()
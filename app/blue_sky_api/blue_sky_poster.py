@@ -1,21 +1,53 @@
 import datetime
 import logging
-import os
 
 import grapheme
 import requests
 
-from ..config import BSKY_HANDLE, BSKY_PASSWORD
+from ..config import BSKY_HANDLE, BSKY_PASSWORD, PLATFORM_SETTINGS
+from ..http_transport import get_transport
+from ..media_buffer import open_media
+from ..media_cache import cached_upload, forget_upload
+from ..media_info import validate_media
+from ..posting_progress import PostingCheckpoint, timed_step
+from .session_store import get_session_store
 
 # Configure logging for BlueskyPoster
 logger = logging.getLogger(__name__)
 
+XRPC_URL = "https://bsky.social/xrpc"
+
+# XRPC errors meaning the access token must be renewed before retrying
+TOKEN_ERRORS = ("ExpiredToken", "InvalidToken")
+
+
+def _token_rejected(response) -> bool:
+    if response.status_code not in (400, 401):
+        return False
+    try:
+        return response.json().get("error") in TOKEN_ERRORS
+    except ValueError:
+        return False
+
 
 class BlueskyPoster:
-    def __init__(self, handle=BSKY_HANDLE, password=BSKY_PASSWORD):
+    def __init__(
+        self,
+        handle=BSKY_HANDLE,
+        password=BSKY_PASSWORD,
+        on_step=None,
+        transport=None,
+        session_store=None,
+        checkpoint=None,
+    ):
         self.handle = handle
         self.password = password
         self.session = None
+        self.on_step = on_step
+        self.http = transport or get_transport()
+        # Sessions are shared by all posters and kept across restarts
+        self.sessions = session_store or get_session_store()
+        self.checkpoint = checkpoint or PostingCheckpoint()
         logger.info(f"BlueskyPoster initialized with handle: {self.handle}")
 
     def login(self):
@@ -31,8 +63,8 @@ class BlueskyPoster:
             raise Exception(error_msg)
 
         try:
-            response = requests.post(
-                "https://bsky.social/xrpc/com.atproto.server.createSession",
+            response = self.http.post(
+                f"{XRPC_URL}/com.atproto.server.createSession",
                 json={"identifier": self.handle, "password": self.password},
                 timeout=30,
             )
@@ -41,7 +73,7 @@ class BlueskyPoster:
             logger.debug(f"Login response headers: {dict(response.headers)}")
 
             response.raise_for_status()
-            self.session = response.json()
+            self.session = self.sessions.save(self.handle, response.json())
 
             logger.info("Successfully logged in to BlueSky")
             logger.debug(f"Session DID: {self.session.get('did', 'N/A')}")
@@ -68,6 +100,74 @@ class BlueskyPoster:
             logger.error(error_msg)
             raise Exception(error_msg)
 
+    def refresh_session(self, refresh_jwt):
+        """Get new tokens with a refresh token instead of the password"""
+        logger.info(f"Refreshing BlueSky session for handle: {self.handle}")
+        try:
+            response = self.http.post(
+                f"{XRPC_URL}/com.atproto.server.refreshSession",
+                headers={"Authorization": f"Bearer {refresh_jwt}"},
+                timeout=30,
+            )
+            logger.info(f"Refresh response status: {response.status_code}")
+            response.raise_for_status()
+            self.session = self.sessions.save(self.handle, response.json())
+            logger.info("Successfully refreshed BlueSky session")
+            return self.session
+
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Error refreshing session: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def ensure_session(self):
+        """Use the stored session, refreshing it or logging in only if needed"""
+        with self.sessions.lock(self.handle):
+            stored = self.sessions.get(self.handle)
+            if self.sessions.access_valid(stored):
+                logger.info("Reusing stored BlueSky session")
+                self.session = stored
+                return self.session
+            if self.sessions.refresh_valid(stored):
+                try:
+                    return self.refresh_session(stored["refreshJwt"])
+                except Exception as e:
+                    logger.warning(f"Session refresh failed, logging in again: {e}")
+            return self.login()
+
+    def _renew_session(self):
+        """Replace an access token the server rejected"""
+        with self.sessions.lock(self.handle):
+            stored = self.sessions.get(self.handle)
+            # Another poster may already have renewed the session
+            if (
+                stored
+                and stored["accessJwt"] != self.session["accessJwt"]
+                and self.sessions.access_valid(stored)
+            ):
+                self.session = stored
+                return
+            try:
+                self.refresh_session(self.session["refreshJwt"])
+            except Exception as e:
+                logger.warning(f"Session refresh failed, logging in again: {e}")
+                self.sessions.clear(self.handle)
+                self.login()
+
+    def _authorized_post(self, url, headers=None, **kwargs):
+        """POST with the access token, renewing it once if it was rejected"""
+        for attempt in range(2):
+            auth_headers = {
+                **(headers or {}),
+                "Authorization": f"Bearer {self.session['accessJwt']}",
+            }
+            response = self.http.post(url, headers=auth_headers, **kwargs)
+            if attempt == 0 and _token_rejected(response):
+                logger.info("BlueSky access token rejected, renewing session")
+                self._renew_session()
+                continue
+            return response
+
     def upload_image(self, image_path):
         """Upload an image and return the blob reference"""
         logger.info(f"Attempting to upload image: {image_path}")
@@ -76,39 +176,33 @@ class BlueskyPoster:
             logger.error("No active session for image upload")
             raise Exception("Not logged in. Call login() first.")
 
-        if not os.path.exists(image_path):
-            error_msg = f"Image file not found: {image_path}"
+        # Check the file from its header before sending it
+        max_kb = PLATFORM_SETTINGS["bluesky"].get("max_image_filesize_kb")
+        try:
+            info = validate_media(image_path, max_kb * 1024 if max_kb else None)
+        except ValueError as e:
+            error_msg = str(e)
             logger.error(error_msg)
             raise Exception(error_msg)
-
-        # Get file size
-        file_size = os.path.getsize(image_path)
-        logger.info(f"Image file size: {file_size} bytes")
+        logger.info(f"Image file size: {info.size} bytes")
 
         try:
-            with open(image_path, "rb") as img:
-                image_data = img.read()
-                logger.debug(f"Read {len(image_data)} bytes from image file")
-
-                # Determine content type based on file extension
-                if image_path.lower().endswith(".png"):
-                    content_type = "image/png"
-                elif image_path.lower().endswith((".jpg", ".jpeg")):
-                    content_type = "image/jpeg"
-                else:
-                    content_type = "image/jpeg"  # default
+            # The image is sent from memory or the mapped file without copying
+            with open_media(image_path) as media:
+                logger.debug(f"Sending {media.size} bytes from {media.source}")
 
+                # Generated images are JPEG whatever their extension says
+                content_type = info.content_type
                 headers = {
-                    "Authorization": f"Bearer {self.session['accessJwt']}",
                     "Content-Type": content_type,
                 }
 
                 logger.info(f"Uploading image with content-type: {content_type}")
 
-                response = requests.post(
-                    "https://bsky.social/xrpc/com.atproto.repo.uploadBlob",
+                response = self._authorized_post(
+                    f"{XRPC_URL}/com.atproto.repo.uploadBlob",
                     headers=headers,
-                    data=image_data,
+                    data=media.view,
                     timeout=60,  # 60 second timeout for image upload
                 )
 
@@ -150,8 +244,8 @@ class BlueskyPoster:
 
         try:
             if not self.session:
-                logger.info("No active session, attempting login...")
-                self.login()
+                with timed_step(self.on_step, "login", "Signing in to Bluesky"):
+                    self.ensure_session()
 
             # Check the grapheme length and truncate if necessary
             original_message = message
@@ -168,7 +262,27 @@ class BlueskyPoster:
                 logger.info(f"Final message with URL: {len(message)} characters")
 
             logger.info("Uploading image to BlueSky...")
-            blob = self.upload_image(image_path)
+            # Blobs from an earlier attempt or the media cache may have expired
+            blob_reused = "blob" in self.checkpoint
+
+            def upload():
+                nonlocal blob_reused
+                blob, from_cache = cached_upload(
+                    image_path,
+                    "bluesky",
+                    lambda: self.upload_image(image_path),
+                    account=self.handle,
+                )
+                blob_reused = blob_reused or from_cache
+                return blob
+
+            blob = self.checkpoint.step(
+                self.on_step,
+                "upload_image",
+                "Uploading image to Bluesky",
+                "blob",
+                upload,
+            )
 
             now = (
                 datetime.datetime.now(datetime.timezone.utc)
@@ -201,18 +315,49 @@ class BlueskyPoster:
             logger.info("Creating BlueSky post...")
             logger.debug(f"Post payload: {payload}")
 
-            response = requests.post(
-                "https://bsky.social/xrpc/com.atproto.repo.createRecord",
-                headers={"Authorization": f"Bearer {self.session['accessJwt']}"},
-                json=payload,
-                timeout=30,
-            )
+            def publish():
+                response = self._authorized_post(
+                    f"{XRPC_URL}/com.atproto.repo.createRecord",
+                    json=payload,
+                    timeout=30,
+                )
 
-            logger.info(f"Post creation response status: {response.status_code}")
-            logger.debug(f"Post creation response headers: {dict(response.headers)}")
+                logger.info(f"Post creation response status: {response.status_code}")
+                logger.debug(
+                    f"Post creation response headers: {dict(response.headers)}"
+                )
 
-            response.raise_for_status()
-            post_result = response.json()
+                response.raise_for_status()
+                return response.json()
+
+            def publish_step():
+                return self.checkpoint.step(
+                    self.on_step,
+                    "publish",
+                    "Publishing post to Bluesky",
+                    "post",
+                    publish,
+                )
+
+            try:
+                post_result = publish_step()
+            except requests.exceptions.HTTPError:
+                if not blob_reused:
+                    raise
+                # Unused blobs are deleted after a while; upload it again
+                logger.info("Reused BlueSky blob was rejected, uploading it again")
+                forget_upload(image_path, "bluesky", self.handle)
+                self.checkpoint.discard("blob")
+                blob_reused = False
+                blob = self.checkpoint.step(
+                    self.on_step,
+                    "upload_image",
+                    "Uploading image to Bluesky",
+                    "blob",
+                    upload,
+                )
+                payload["record"]["embed"]["images"][0]["image"] = blob
+                post_result = publish_step()
 
             logger.info(f"Post created successfully on BlueSky: {post_result}")
             print(f"Post created successfully. : {post_result}")
@@ -228,10 +373,11 @@ class BlueskyPoster:
             logger.error(error_msg)
             raise Exception(error_msg)
         except requests.exceptions.HTTPError as e:
-            error_msg = (
-                f"HTTP error during post creation: {response.status_code} - "
-                f"{response.text if 'response' in locals() else str(e)}"
-            )
+            if e.response is not None:
+                details = f"{e.response.status_code} - {e.response.text}"
+            else:
+                details = str(e)
+            error_msg = f"HTTP error during post creation: {details}"
             logger.error(error_msg)
             raise Exception(error_msg)
         except Exception as e:
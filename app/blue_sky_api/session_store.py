@@ -0,0 +1,150 @@
+"""
+Persistent store for Bluesky sessions.
+
+``createSession`` is strictly rate limited, and a new ``BlueskyPoster`` is
+built for every post, so logging in each time wastes a round trip and the
+rate limit. The store keeps each handle's ``accessJwt``/``refreshJwt`` with
+their expiry times in a JSON file under ``cache/`` so sessions are reused by
+every poster instance and survive server restarts.
+
+Every server process uses the same file: lookups and saves re-read it under
+a file lock, and sign-ins for a handle are serialised across processes, so a
+refresh token rotated by one worker is never reused by another.
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from ..config import CACHE_DIR
+from ..file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+# A token this close to expiring is treated as expired
+EXPIRY_MARGIN_SECONDS = 60
+
+# Used when a token's expiry cannot be read (Bluesky issues 2h access tokens)
+FALLBACK_ACCESS_SECONDS = 3600
+FALLBACK_REFRESH_SECONDS = 30 * 24 * 3600
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Return the ``exp`` claim of a JWT without verifying it"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class BlueskySessionStore:
+    """Sessions by handle, kept in memory and saved to a JSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._handle_locks: Dict[str, threading.Lock] = {}
+        self._sessions: Dict[str, dict] = self._read()
+
+    @contextmanager
+    def lock(self, handle: str):
+        """Serialise sign-ins for a handle across threads and processes"""
+        with self._lock:
+            thread_lock = self._handle_locks.setdefault(handle, threading.Lock())
+        with thread_lock, file_lock(f"{self.path}.signin.lock"):
+            yield
+
+    def get(self, handle: str) -> Optional[dict]:
+        """Return the stored session for a handle, if any"""
+        with self._lock, file_lock(f"{self.path}.lock"):
+            # Another process may have signed in or rotated the tokens
+            self._sessions = self._read()
+            session = self._sessions.get(handle)
+            return dict(session) if session else None
+
+    def save(self, handle: str, session: dict) -> dict:
+        """Store a createSession/refreshSession response with its expiry times"""
+        now = time.time()
+        stored = {
+            "did": session.get("did"),
+            "handle": session.get("handle", handle),
+            "accessJwt": session["accessJwt"],
+            "refreshJwt": session["refreshJwt"],
+            "access_expires_at": jwt_expiry(session["accessJwt"])
+            or now + FALLBACK_ACCESS_SECONDS,
+            "refresh_expires_at": jwt_expiry(session["refreshJwt"])
+            or now + FALLBACK_REFRESH_SECONDS,
+        }
+        with self._lock, file_lock(f"{self.path}.lock"):
+            # Merge into the file's current state, keeping other handles
+            self._sessions = self._read()
+            self._sessions[handle] = stored
+            self._write()
+        return dict(stored)
+
+    def clear(self, handle: str):
+        """Forget a handle's session"""
+        with self._lock, file_lock(f"{self.path}.lock"):
+            self._sessions = self._read()
+            if self._sessions.pop(handle, None) is not None:
+                self._write()
+
+    @staticmethod
+    def access_valid(session: Optional[dict]) -> bool:
+        """Return True if the session's access token can still be used"""
+        return bool(session) and _not_expired(session.get("access_expires_at"))
+
+    @staticmethod
+    def refresh_valid(session: Optional[dict]) -> bool:
+        """Return True if the session's refresh token can still be used"""
+        return bool(session) and _not_expired(session.get("refresh_expires_at"))
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                sessions = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable Bluesky session file: %s", e)
+            return {}
+        return sessions if isinstance(sessions, dict) else {}
+
+    def _write(self):
+        """Save all sessions atomically (caller holds both locks)"""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # The file holds credentials; keep it readable by the owner only
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._sessions, f, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save Bluesky sessions: %s", e)
+
+
+def _not_expired(expires_at) -> bool:
+    return bool(expires_at) and expires_at - EXPIRY_MARGIN_SECONDS > time.time()
+
+
+_store_lock = threading.Lock()
+_store: Optional[BlueskySessionStore] = None
+
+
+def get_session_store() -> BlueskySessionStore:
+    """Return the shared session store, loading it on first use"""
+    global _store  # pylint: disable=global-statement
+    with _store_lock:
+        if _store is None:
+            _store = BlueskySessionStore(
+                os.path.join(CACHE_DIR, "bluesky_sessions.json")
+            )
+        return _store
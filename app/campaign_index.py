@@ -0,0 +1,463 @@
+"""
+SQLite index of campaign metadata.
+
+The home page used to list ``output/`` and parse every campaign file on each
+request. The index keeps one row per campaign (app name, creation date,
+posted and image counts) and one row per campaign platform. It is updated
+when a campaign is generated, posted or deleted, and a background watcher
+picks up campaign files that were added, changed or removed by other means.
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .app_index import AppIndex
+from .campaign_repository import CampaignRepository
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    file TEXT PRIMARY KEY,
+    app_name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    sort_key TEXT NOT NULL,
+    total_platforms INTEGER NOT NULL DEFAULT 0,
+    posted_count INTEGER NOT NULL DEFAULT 0,
+    image_count INTEGER NOT NULL DEFAULT 0,
+    load_error INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS campaigns_by_date ON campaigns (sort_key DESC, file DESC);
+CREATE INDEX IF NOT EXISTS campaigns_by_app ON campaigns (app_name, file);
+CREATE INDEX IF NOT EXISTS campaigns_by_posted ON campaigns (posted_count, file);
+CREATE TABLE IF NOT EXISTS campaign_platforms (
+    file TEXT NOT NULL REFERENCES campaigns (file) ON DELETE CASCADE,
+    platform TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    posted INTEGER NOT NULL DEFAULT 0,
+    image_file TEXT,
+    PRIMARY KEY (file, platform)
+);
+CREATE INDEX IF NOT EXISTS campaign_platforms_by_platform
+    ON campaign_platforms (platform, file);
+"""
+
+# Sort option -> (column, direction); ties are broken by file name
+SORT_OPTIONS = {
+    "newest": ("sort_key", "DESC"),
+    "oldest": ("sort_key", "ASC"),
+    "app": ("app_name", "ASC"),
+    "most_posted": ("posted_count", "DESC"),
+}
+
+# Posting status filter -> SQL condition
+STATUS_FILTERS = {
+    "complete": "posted_count = total_platforms AND load_error = 0",
+    "pending": "posted_count < total_platforms",
+    "unposted": "posted_count = 0 AND total_platforms > 0",
+}
+
+MAX_PAGE_SIZE = 200
+
+# Campaign files parsed per index transaction during a sync
+SYNC_BATCH_SIZE = 500
+
+_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def campaign_created_at(file_name: str) -> Tuple[str, str]:
+    """Return (sort key, display date) from an ads_YYYYMMDD_HHMMSS[_id].json name"""
+    parts = file_name.replace(".json", "").split("_")
+    if len(parts) < 3:
+        return "00000000_000000", "Unknown"
+
+    date_part, time_part = parts[1], parts[2]
+    if len(date_part) != 8 or len(time_part) != 6:
+        return f"{date_part}_{time_part}", "Unknown"
+    return (
+        f"{date_part}_{time_part}",
+        f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:8]} "
+        f"{time_part[:2]}:{time_part[2:4]}:{time_part[4:6]}",
+    )
+
+
+class CampaignIndex:
+    """Campaign metadata stored in SQLite and kept in step with ``output/``"""
+
+    def __init__(
+        self, repository: CampaignRepository, db_path: str, app_index: AppIndex
+    ):
+        self.repository = repository
+        self.output_dir = repository.output_dir
+        self.db_path = db_path
+        self.app_index = app_index
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+
+    def refresh_file(self, file_name: str):
+        """Re-read one campaign file and update its index rows"""
+        entry = self._read_campaign(file_name)
+        if entry is None:
+            self.remove_file(file_name)
+            return
+        self._write([entry])
+
+    def remove_file(self, file_name: str):
+        """Drop a campaign from the index"""
+        self._delete([file_name])
+
+    def sync(self) -> Dict[str, int]:
+        """Bring the index in line with the campaign files on disk.
+
+        Only files whose modification time or size changed are parsed, and
+        their rows are written in batched transactions.
+        """
+        on_disk = {}
+        try:
+            with os.scandir(self.output_dir) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        stat = entry.stat()
+                        on_disk[entry.name] = (stat.st_mtime, stat.st_size)
+        except OSError as e:
+            logger.error("Could not scan %s: %s", self.output_dir, e)
+            return {"updated": 0, "removed": 0}
+
+        with self._lock:
+            indexed = {
+                row["file"]: (row["mtime"], row["size"])
+                for row in self._conn.execute("SELECT file, mtime, size FROM campaigns")
+            }
+
+        changed = [name for name, sig in on_disk.items() if indexed.get(name) != sig]
+        removed = [name for name in indexed if name not in on_disk]
+
+        for start in range(0, len(changed), SYNC_BATCH_SIZE):
+            entries = []
+            for file_name in changed[start : start + SYNC_BATCH_SIZE]:
+                entry = self._read_campaign(file_name)
+                if entry is None:
+                    removed.append(file_name)
+                else:
+                    entries.append(entry)
+            self._write(entries)
+        self._delete(removed)
+
+        if changed or removed:
+            logger.info(
+                "Campaign index synced: %d updated, %d removed",
+                len(changed),
+                len(removed),
+            )
+        return {"updated": len(changed), "removed": len(removed)}
+
+    def mark_all_stale(self):
+        """Make the next sync re-read every campaign (e.g. after app edits)"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE campaigns SET mtime = -1")
+
+    def query(
+        self,
+        filters: Optional[dict] = None,
+        sort: str = "newest",
+        limit: int = 24,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+    ) -> dict:
+        """Return one page of campaigns using keyset (cursor) pagination.
+
+        ``filters`` may hold ``app``, ``platform``, ``status`` (see
+        STATUS_FILTERS) and ``date_from``/``date_to`` (YYYY-MM-DD). Pass the
+        ``next_cursor`` of a page as ``after`` to get the following page, or
+        its ``prev_cursor`` as ``before`` to go back. Raises ValueError for
+        an unknown sort, a bad filter value or a malformed cursor.
+        """
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f"Unknown sort option: {sort}")
+        column, direction = SORT_OPTIONS[sort]
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        conditions, params = self._filter_clause(filters or {})
+
+        backwards = before is not None
+        cursor = before if backwards else after
+        page_conditions = list(conditions)
+        page_params = list(params)
+        if cursor:
+            value, file_name = decode_cursor(cursor, sort)
+            ascending = (direction == "ASC") != backwards
+            page_conditions.append(
+                f"({column}, file) {'>' if ascending else '<'} (?, ?)"
+            )
+            page_params += [value, file_name]
+
+        order = direction
+        if backwards:
+            order = "ASC" if direction == "DESC" else "DESC"
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM campaigns {_where(page_conditions)} "
+                f"ORDER BY {column} {order}, file {order} LIMIT ?",
+                page_params + [limit + 1],
+            ).fetchall()
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM campaigns {_where(conditions)}", params
+            ).fetchone()[0]
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if backwards:
+                rows.reverse()
+            platforms = self._platforms_for([row["file"] for row in rows])
+
+        if backwards:
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, bool(cursor)
+
+        return {
+            "campaigns": [
+                self._summary(row, platforms.get(row["file"], [])) for row in rows
+            ],
+            "total": total,
+            "next_cursor": (
+                encode_cursor(sort, rows[-1][column], rows[-1]["file"])
+                if rows and has_next
+                else None
+            ),
+            "prev_cursor": (
+                encode_cursor(sort, rows[0][column], rows[0]["file"])
+                if rows and has_prev
+                else None
+            ),
+        }
+
+    def app_names(self) -> List[str]:
+        """Return the distinct app names of indexed campaigns"""
+        with self._lock:
+            return [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT DISTINCT app_name FROM campaigns ORDER BY app_name"
+                )
+            ]
+
+    def start_watcher(self, interval: float):
+        """Sync the index every ``interval`` seconds on a daemon thread"""
+        if self._watcher is not None or interval <= 0:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="campaign-index", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """Stop the background watcher"""
+        self._stop.set()
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.sync()
+            except sqlite3.Error as e:
+                logger.error("Campaign index sync failed: %s", e)
+
+    @staticmethod
+    def _filter_clause(filters: dict) -> Tuple[List[str], list]:
+        """Translate listing filters into SQL conditions and parameters"""
+        conditions: List[str] = []
+        params: list = []
+
+        if filters.get("app"):
+            conditions.append("app_name = ?")
+            params.append(filters["app"])
+        if filters.get("platform"):
+            conditions.append(
+                "EXISTS (SELECT 1 FROM campaign_platforms p "
+                "WHERE p.file = campaigns.file AND p.platform = ?)"
+            )
+            params.append(filters["platform"])
+        if filters.get("status"):
+            if filters["status"] not in STATUS_FILTERS:
+                raise ValueError(f"Unknown status filter: {filters['status']}")
+            conditions.append(STATUS_FILTERS[filters["status"]])
+
+        # sort_key is YYYYMMDD_HHMMSS, so dates compare as string prefixes
+        for name, operator, suffix in (
+            ("date_from", ">=", ""),
+            ("date_to", "<=", "_999999"),
+        ):
+            value = filters.get(name)
+            if not value:
+                continue
+            if not _DATE_PATTERN.match(value):
+                raise ValueError(f"{name} must be a YYYY-MM-DD date")
+            conditions.append(f"sort_key {operator} ?")
+            params.append(value.replace("-", "") + suffix)
+
+        return conditions, params
+
+    def _read_campaign(self, file_name: str) -> Optional[Tuple[tuple, List[tuple]]]:
+        """Parse a campaign file into its campaign row and platform rows.
+
+        Returns None if the file no longer exists.
+        """
+        try:
+            stat = os.stat(self.repository.path(file_name))
+        except OSError:
+            return None
+
+        sort_key, created_at = campaign_created_at(file_name)
+        try:
+            ad_data = self.repository.load(file_name)
+            if not isinstance(ad_data, dict):
+                raise ValueError("campaign file is not a JSON object")
+        except (OSError, ValueError) as e:
+            logger.error("Error reading %s: %s", file_name, e)
+            row = (file_name, "Error loading", "Unknown", sort_key, 0, 0, 0, 1)
+            platforms = []
+        else:
+            platforms = self._platform_rows(file_name, ad_data)
+            row = (
+                file_name,
+                self.app_index.display_name(ad_data),
+                created_at,
+                sort_key,
+                len(platforms),
+                sum(posted for _, _, _, posted, _ in platforms),
+                sum(1 for *_, image_file in platforms if image_file),
+                0,
+            )
+        return row + (stat.st_mtime, stat.st_size), platforms
+
+    def _write(self, entries: List[Tuple[tuple, List[tuple]]]):
+        """Replace the rows of the given campaigns in one transaction"""
+        if not entries:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM campaigns WHERE file = ?",
+                [(row[0],) for row, _ in entries],
+            )
+            self._conn.executemany(
+                "INSERT INTO campaigns (file, app_name, created_at, sort_key, "
+                "total_platforms, posted_count, image_count, load_error, mtime, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row, _ in entries],
+            )
+            self._conn.executemany(
+                "INSERT INTO campaign_platforms "
+                "(file, platform, position, posted, image_file) VALUES (?, ?, ?, ?, ?)",
+                [platform for _, platforms in entries for platform in platforms],
+            )
+
+    def _delete(self, files: List[str]):
+        if not files:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM campaigns WHERE file = ?", [(name,) for name in files]
+            )
+
+    def _platform_rows(self, file_name: str, ad_data: dict) -> List[tuple]:
+        rows = []
+        for position, (platform, platform_data) in enumerate(ad_data.items()):
+            if not isinstance(platform_data, dict):
+                platform_data = {}
+            rows.append(
+                (
+                    file_name,
+                    platform,
+                    position,
+                    1 if "post_time" in platform_data else 0,
+                    self._existing_image(platform_data.get("image_path")),
+                )
+            )
+        return rows
+
+    def _existing_image(self, image_path: Optional[str]) -> Optional[str]:
+        """Return the image file name if the image exists in the output dir"""
+        if not image_path:
+            return None
+        image_filename = image_path.split("/")[-1]
+        if os.path.exists(os.path.join(self.output_dir, image_filename)):
+            return image_filename
+        return None
+
+    def _platforms_for(self, files: List[str]) -> Dict[str, List[sqlite3.Row]]:
+        """Load the platform rows of the given campaigns (caller holds the lock)"""
+        if not files:
+            return {}
+        placeholders = ", ".join("?" for _ in files)
+        platforms: Dict[str, List[sqlite3.Row]] = {}
+        for row in self._conn.execute(
+            f"SELECT * FROM campaign_platforms WHERE file IN ({placeholders}) "
+            "ORDER BY file, position",
+            files,
+        ):
+            platforms.setdefault(row["file"], []).append(row)
+        return platforms
+
+    @staticmethod
+    def _summary(row: sqlite3.Row, platforms: List[sqlite3.Row]) -> dict:
+        if row["load_error"]:
+            posting_status = "Error"
+        else:
+            posting_status = f"{row['posted_count']}/{row['total_platforms']} posted"
+        images = [p["image_file"] for p in platforms if p["image_file"]]
+        return {
+            "file": row["file"],
+            "app_name": row["app_name"],
+            "platforms": [p["platform"] for p in platforms],
+            "posted_count": row["posted_count"],
+            "total_platforms": row["total_platforms"],
+            "creation_date": row["created_at"],
+            "images": images,
+            "image_count": len(images),
+            "platform_image_counts": {
+                p["platform"]: 1 if p["image_file"] else 0 for p in platforms
+            },
+            "is_fully_posted": not row["load_error"]
+            and row["posted_count"] == row["total_platforms"],
+            "posting_status": posting_status,
+        }
+
+
+def _where(conditions: List[str]) -> str:
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def encode_cursor(sort: str, value, file_name: str) -> str:
+    """Encode the position after a row as an opaque pagination cursor"""
+    payload = json.dumps([sort, value, file_name], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, str]:
+    """Decode a cursor made by encode_cursor for the same sort option"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, file_name = json.loads(
+            base64.urlsafe_b64decode(padded.encode("ascii"))
+        )
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_sort != sort or not isinstance(file_name, str):
+        raise ValueError("Cursor does not match the requested sort")
+    return value, file_name
@@ -0,0 +1,190 @@
+"""
+Campaign file access with a parsed-document cache.
+
+Every route used to open and ``json.load`` campaign files on its own, often
+several times per request. ``CampaignRepository`` parses each file once and
+keeps the parsed document in a bounded LRU cache keyed by the file's
+(mtime, size), so a file changed on disk is re-read automatically and writes
+made through the repository update the cache directly.
+
+Changes are made with ``update``/``update_platform``, which hold a
+per-campaign lock (a thread lock plus an ``flock`` on a lock file, so other
+server processes are excluded too) while they re-read, patch and atomically
+replace the file. Concurrent posts to different platforms of one campaign
+therefore no longer overwrite each other's results.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock is available
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignRepository:
+    """Load and save campaign JSON files in an output directory.
+
+    Documents returned by ``load`` are shared with the cache and must be
+    treated as read-only. Modify campaigns with ``update`` or
+    ``update_platform``; ``save`` replaces a whole document without locking.
+    """
+
+    def __init__(self, output_dir: str, max_entries: int = 256):
+        self.output_dir = output_dir
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, int], dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._lock_dir = os.path.join(output_dir, ".locks")
+
+    def path(self, file_name: str) -> str:
+        """Return the full path of a campaign file"""
+        return os.path.join(self.output_dir, file_name)
+
+    def exists(self, file_name: str) -> bool:
+        """Return True if the campaign file exists"""
+        return os.path.isfile(self.path(file_name))
+
+    def load(self, file_name: str) -> dict:
+        """Return the parsed campaign, from the cache when the file is unchanged.
+
+        Raises OSError if the file cannot be read and ValueError if it is not
+        valid JSON.
+        """
+        signature = self._signature(file_name)
+        with self._lock:
+            cached = self._cache.get(file_name)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(file_name)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        with open(self.path(file_name), "r", encoding="utf-8") as f:
+            ad_data = json.load(f)
+        self._store(file_name, signature, ad_data)
+        return ad_data
+
+    def load_for_update(self, file_name: str) -> dict:
+        """Return a private copy of the campaign that may be modified"""
+        # A JSON round trip is the cheapest deep copy of a parsed document
+        return json.loads(json.dumps(self.load(file_name)))
+
+    @contextmanager
+    def lock(self, file_name: str):
+        """Hold a campaign's lock against other threads and processes"""
+        with self._lock:
+            thread_lock = self._file_locks.setdefault(file_name, threading.Lock())
+
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self._lock_dir, exist_ok=True)
+            with open(self._lock_path(file_name), "a", encoding="utf-8") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def update(self, file_name: str, mutate: Callable[[dict], None]) -> dict:
+        """Apply ``mutate`` to a fresh copy of the campaign and save it.
+
+        The campaign is locked from the read to the write, so concurrent
+        updates are applied one after another instead of losing changes.
+        Returns the saved document.
+        """
+        with self.lock(file_name):
+            ad_data = self.load_for_update(file_name)
+            mutate(ad_data)
+            self.save(file_name, ad_data)
+        return ad_data
+
+    def update_platform(
+        self,
+        file_name: str,
+        platform: str,
+        changes: dict,
+        remove: Iterable[str] = (),
+    ) -> dict:
+        """Set and remove fields of one platform entry, leaving others alone.
+
+        Raises KeyError if the campaign has no entry for the platform.
+        """
+
+        def patch(ad_data: dict):
+            platform_data = ad_data[platform]
+            platform_data.update(changes)
+            for field in remove:
+                platform_data.pop(field, None)
+
+        return self.update(file_name, patch)[platform]
+
+    def save(self, file_name: str, ad_data: dict):
+        """Write a campaign atomically and cache the saved document"""
+        path = self.path(file_name)
+        # Unique per process and thread: several server processes may save
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(ad_data, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._store(file_name, self._signature(file_name), ad_data)
+
+    def delete(self, file_name: str):
+        """Remove a campaign file and forget its cached document"""
+        with self.lock(file_name):
+            self.invalidate(file_name)
+            path = self.path(file_name)
+            if os.path.exists(path):
+                os.remove(path)
+        try:
+            os.remove(self._lock_path(file_name))
+        except OSError:
+            pass
+
+    def invalidate(self, file_name: str):
+        """Drop a campaign from the cache"""
+        with self._lock:
+            self._cache.pop(file_name, None)
+
+    def stats(self) -> Dict[str, float]:
+        """Return cache hit/miss counters and the number of cached documents"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._cache),
+            }
+
+    def _lock_path(self, file_name: str) -> str:
+        return os.path.join(self._lock_dir, f"{file_name}.lock")
+
+    def _signature(self, file_name: str) -> Tuple[int, int]:
+        stat = os.stat(self.path(file_name))
+        return stat.st_mtime_ns, stat.st_size
+
+    def _store(self, file_name: str, signature: Tuple[int, int], ad_data: dict):
+        with self._lock:
+            self._cache[file_name] = (signature, ad_data)
+            self._cache.move_to_end(file_name)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
@@ -13,6 +13,8 @@ CONFIG_FILE = os.path.join(
 DEFAULT_CONFIG_FILE = os.path.join(
     os.path.dirname(__file__), "..", "configuration", "default_config.json"
 )
+# Directory for on-disk caches (generated responses, sessions, uploads)
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "cache")
 
 
 def load_config():
@@ -70,6 +72,45 @@ def load_config():
     config.setdefault("twitter_access_token_secret", "")
     config.setdefault("twitter_client_id", "")
     config.setdefault("twitter_client_secret", "")
+    config.setdefault("generation_concurrency", 4)
+    config.setdefault("image_generation_concurrency", 4)
+    config.setdefault("generation_queue_size", 4)
+    config.setdefault("batch_text_generation", True)
+    config.setdefault("generation_job_workers", 2)
+    config.setdefault("job_resume_check_seconds", 30)
+    config.setdefault("response_cache_enabled", True)
+    config.setdefault("response_cache_ttl_hours", 168)
+    config.setdefault("response_cache_max_entries", 500)
+    config.setdefault("response_cache_max_mb", 50)
+    config.setdefault("campaign_index_poll_seconds", 5)
+    config.setdefault("campaigns_per_page", 24)
+    config.setdefault("campaign_cache_size", 256)
+    config.setdefault("posting_workers", 8)
+    config.setdefault("post_timeout_seconds", 120)
+    config.setdefault("post_timeouts_by_platform", {"instagram": 180})
+    config.setdefault("http_pool_connections", 4)
+    config.setdefault("http_pool_maxsize", 8)
+    config.setdefault("http_connect_timeout", 10)
+    config.setdefault("http_read_timeout", 30)
+    config.setdefault("media_cache_enabled", True)
+    config.setdefault(
+        "media_cache_ttl_hours",
+        {"imagekit": 720, "twitter": 23, "bluesky": 168, "facebook": 1},
+    )
+    config.setdefault("jpeg_min_quality", 40)
+    config.setdefault("jpeg_subsampling", "4:2:0")
+    config.setdefault("jpeg_progressive", True)
+    config.setdefault("image_min_scale", 0.5)
+    config.setdefault("master_image_mode", False)
+    config.setdefault("master_image_size", "2K")
+    config.setdefault("media_buffer_max_mb", 64)
+    config.setdefault("thumbnail_widths", [320, 640, 1280])
+    config.setdefault("thumbnail_quality", 80)
+    config.setdefault("server_bind", "127.0.0.1:5000")
+    config.setdefault("server_workers", 2)
+    config.setdefault("server_threads", 8)
+    config.setdefault("server_timeout", 120)
+    config.setdefault("shared_state_check_seconds", 2)
 
     return config
 
@@ -100,6 +141,42 @@ TWITTER_API_KEY_SECRET = CONFIG["twitter_api_key_secret"]
 TWITTER_BEARER_TOKEN = CONFIG["twitter_bearer_token"]
 TWITTER_ACCESS_TOKEN = CONFIG["twitter_access_token"]
 TWITTER_ACCESS_TOKEN_SECRET = CONFIG["twitter_access_token_secret"]
+GENERATION_CONCURRENCY = CONFIG["generation_concurrency"]
+IMAGE_GENERATION_CONCURRENCY = CONFIG["image_generation_concurrency"]
+GENERATION_QUEUE_SIZE = CONFIG["generation_queue_size"]
+BATCH_TEXT_GENERATION = CONFIG["batch_text_generation"]
+GENERATION_JOB_WORKERS = CONFIG["generation_job_workers"]
+JOB_RESUME_CHECK_SECONDS = CONFIG["job_resume_check_seconds"]
+RESPONSE_CACHE_ENABLED = CONFIG["response_cache_enabled"]
+RESPONSE_CACHE_TTL_HOURS = CONFIG["response_cache_ttl_hours"]
+RESPONSE_CACHE_MAX_ENTRIES = CONFIG["response_cache_max_entries"]
+RESPONSE_CACHE_MAX_MB = CONFIG["response_cache_max_mb"]
+CAMPAIGN_INDEX_POLL_SECONDS = CONFIG["campaign_index_poll_seconds"]
+CAMPAIGNS_PER_PAGE = CONFIG["campaigns_per_page"]
+CAMPAIGN_CACHE_SIZE = CONFIG["campaign_cache_size"]
+POSTING_WORKERS = CONFIG["posting_workers"]
+POST_TIMEOUT_SECONDS = CONFIG["post_timeout_seconds"]
+POST_TIMEOUTS_BY_PLATFORM = CONFIG["post_timeouts_by_platform"]
+HTTP_POOL_CONNECTIONS = CONFIG["http_pool_connections"]
+HTTP_POOL_MAXSIZE = CONFIG["http_pool_maxsize"]
+HTTP_CONNECT_TIMEOUT = CONFIG["http_connect_timeout"]
+HTTP_READ_TIMEOUT = CONFIG["http_read_timeout"]
+MEDIA_CACHE_ENABLED = CONFIG["media_cache_enabled"]
+MEDIA_CACHE_TTL_HOURS = CONFIG["media_cache_ttl_hours"]
+JPEG_MIN_QUALITY = CONFIG["jpeg_min_quality"]
+JPEG_SUBSAMPLING = CONFIG["jpeg_subsampling"]
+JPEG_PROGRESSIVE = CONFIG["jpeg_progressive"]
+IMAGE_MIN_SCALE = CONFIG["image_min_scale"]
+MASTER_IMAGE_MODE = CONFIG["master_image_mode"]
+MASTER_IMAGE_SIZE = CONFIG["master_image_size"]
+MEDIA_BUFFER_MAX_MB = CONFIG["media_buffer_max_mb"]
+THUMBNAIL_WIDTHS = CONFIG["thumbnail_widths"]
+THUMBNAIL_QUALITY = CONFIG["thumbnail_quality"]
+SERVER_BIND = CONFIG["server_bind"]
+SERVER_WORKERS = CONFIG["server_workers"]
+SERVER_THREADS = CONFIG["server_threads"]
+SERVER_TIMEOUT = CONFIG["server_timeout"]
+SHARED_STATE_CHECK_SECONDS = CONFIG["shared_state_check_seconds"]
 
 
 def save_config(config_data):
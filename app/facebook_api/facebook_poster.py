@@ -8,13 +8,20 @@ import logging
 import os
 
 import requests
-from PIL import Image
 
 from ..config import FB_ACCESS_TOKEN, FB_PAGE_ID
+from ..http_transport import get_transport
+from ..media_buffer import open_media
+from ..media_cache import cached_upload, forget_upload
+from ..media_info import probe_media, validate_media
+from ..posting_progress import PostingCheckpoint, timed_step
 
 # Configure logging for FacebookPoster
 logger = logging.getLogger(__name__)
 
+# Largest photo the Graph API accepts
+MAX_PHOTO_BYTES = 10 * 1024 * 1024
+
 
 class FacebookPoster:
     """
@@ -23,16 +30,31 @@ class FacebookPoster:
     Handles posting content to Facebook pages.
     """
 
-    def __init__(self, page_id=FB_PAGE_ID, access_token=FB_ACCESS_TOKEN):
+    def __init__(
+        self,
+        page_id=FB_PAGE_ID,
+        access_token=FB_ACCESS_TOKEN,
+        on_step=None,
+        transport=None,
+        checkpoint=None,
+    ):
         """
         Initialize the Facebook poster.
 
         Args:
             page_id: Facebook page ID
             access_token: Facebook access token
+            on_step: Optional callback reporting each posting step and its timing
+            transport: HttpTransport to send requests with (default: shared)
+            checkpoint: PostingCheckpoint of an earlier attempt to resume from
         """
         self.page_id = page_id
         self.access_token = access_token
+        self.on_step = on_step
+        self.http = transport or get_transport()
+        self.checkpoint = checkpoint or PostingCheckpoint()
+        # True when the last photo ID came from the media upload cache
+        self.photo_reused = False
         logger.info(
             "FacebookPoster initialized with page_id: %s, access_token: %s",
             bool(self.page_id),
@@ -79,7 +101,13 @@ class FacebookPoster:
 
             if comment_message:
                 logger.info("Adding comment to Facebook post...")
-                comment_id = self.post_comment(post_id, comment_message)
+                comment_id = self.checkpoint.step(
+                    self.on_step,
+                    "comment",
+                    "Adding app link comment",
+                    "comment_id",
+                    lambda: self.post_comment(post_id, comment_message),
+                )
                 logger.info("Comment added successfully with ID: %s", comment_id)
 
             return {
@@ -107,103 +135,54 @@ class FacebookPoster:
             if image_path is None or not os.path.exists(image_path):
                 # No media file, post just the text
                 logger.info("Posting text-only content to Facebook")
-                post_url = f"https://graph.facebook.com/v22.0/{self.page_id}/feed"
                 post_payload = {"access_token": self.access_token, "message": message}
 
-                logger.info("Making text post request to: %s", post_url)
-                post_response = requests.post(post_url, json=post_payload, timeout=30)
-
-                logger.info(
-                    "Facebook text post response status: %s", post_response.status_code
-                )
-                post_response.raise_for_status()
-
-                post_result = post_response.json()
-                post_id = post_result["id"]
-                logger.info("Text post created successfully. Post ID: %s", post_id)
-
             else:
-                # Step 1: Validate and upload the image
-                logger.info("Validating image: %s", image_path)
-
-                # Check if file exists and is readable
-                if not os.path.exists(image_path):
-                    error_msg = f"Image file does not exist: {image_path}"
-                    logger.error(error_msg)
-                    raise RuntimeError(error_msg)
-
-                # Check file size (Facebook limit is 10MB)
-                file_size = os.path.getsize(image_path)
-                max_size = 10 * 1024 * 1024  # 10MB
-                if file_size > max_size:
-                    error_msg = f"Image file too large: {file_size} bytes (max {max_size})"
-                    logger.error(error_msg)
-                    raise RuntimeError(error_msg)
-
-                # Validate image format
-                try:
-                    with Image.open(image_path) as img:
-                        img.verify()  # Verify the image is not corrupted
-                    logger.info("Image validation passed")
-                except Exception as e:
-                    error_msg = f"Invalid image file: {str(e)}"
-                    logger.error(error_msg)
-                    raise RuntimeError(error_msg)
-
-                logger.info("Uploading image to Facebook: %s", image_path)
-
-                with open(image_path, "rb") as img:
-                    files = {
-                        "source": img,
-                    }
-                    upload_payload = {
-                        "access_token": self.access_token,
-                        "published": "false",
-                    }
-                    upload_url = (
-                        f"https://graph.facebook.com/v22.0/{self.page_id}/photos"
-                    )
-
-                    logger.info("Uploading image to: %s", upload_url)
-                    response = requests.post(
-                        upload_url, files=files, data=upload_payload, timeout=60
+                # Step 1: Validate and upload the image (unless already uploaded)
+                if "photo_id" not in self.checkpoint:
+                    logger.info("Validating image: %s", image_path)
+                    with timed_step(self.on_step, "validate_image", "Validating image"):
+                        self._validate_image(image_path)
+
+                def upload():
+                    return self.checkpoint.step(
+                        self.on_step,
+                        "upload_image",
+                        "Uploading image to Facebook",
+                        "photo_id",
+                        lambda: self._upload_photo_cached(image_path),
                     )
 
-                    logger.info(
-                        "Facebook image upload response status: %s",
-                        response.status_code,
-                    )
-                    logger.debug(
-                        "Facebook upload response headers: %s", dict(response.headers)
-                    )
-
-                    response.raise_for_status()
-                    upload_result = response.json()
-                    photo_id = upload_result["id"]
-                    logger.info("Image uploaded successfully. Photo ID: %s", photo_id)
+                photo_id = upload()
 
                 # Step 2: Create the main post with the uploaded image
                 logger.info("Creating main Facebook post with uploaded image...")
-                post_url = f"https://graph.facebook.com/v22.0/{self.page_id}/feed"
                 post_payload = {
                     "access_token": self.access_token,
                     "message": message,
                     "attached_media": [{"media_fbid": photo_id}],
                 }
 
-                logger.info("Making post request to: %s", post_url)
-                post_response = requests.post(post_url, json=post_payload, timeout=30)
-
-                logger.info(
-                    "Facebook post response status: %s", post_response.status_code
+            def publish():
+                return self.checkpoint.step(
+                    self.on_step,
+                    "publish",
+                    "Publishing post to Facebook",
+                    "post_id",
+                    lambda: self._publish(post_payload),
                 )
-                post_response.raise_for_status()
 
-                post_result = post_response.json()
-                post_id = post_result["id"]
-                logger.info("Post created successfully. Post ID: %s", post_id)
-
-            return post_id
+            try:
+                return publish()
+            except requests.exceptions.HTTPError:
+                if not self.photo_reused:
+                    raise
+                # The cached photo may be gone or attached to an earlier post
+                logger.info("Cached Facebook photo was rejected, uploading it again")
+                forget_upload(image_path, "facebook", self.page_id)
+                self.checkpoint.discard("photo_id")
+                post_payload["attached_media"] = [{"media_fbid": upload()}]
+                return publish()
 
         except requests.exceptions.Timeout:
             error_msg = "Facebook request timed out"
@@ -214,18 +193,11 @@ class FacebookPoster:
             logger.error(error_msg)
             raise RuntimeError(error_msg) from exc
         except requests.exceptions.HTTPError as exc:
-            # Determine which response to use
-            if 'post_response' in locals():
-                resp = post_response
-            elif 'response' in locals():
-                resp = response
-            else:
-                resp = exc.response if hasattr(exc, 'response') else None
-            
+            resp = exc.response
             error_msg = (
                 f"Facebook HTTP error: "
-                f"{resp.status_code if resp else 'Unknown'} "
-                f"- {resp.text if resp else str(exc)}"
+                f"{resp.status_code if resp is not None else 'Unknown'} "
+                f"- {resp.text if resp is not None else str(exc)}"
             )
             logger.error(error_msg)
             raise RuntimeError(error_msg) from exc
@@ -234,6 +206,73 @@ class FacebookPoster:
             logger.error(error_msg)
             raise RuntimeError(error_msg) from exc
 
+    def _upload_photo_cached(self, image_path: str) -> str:
+        """Upload a photo unless the same image was uploaded recently"""
+        photo_id, self.photo_reused = cached_upload(
+            image_path,
+            "facebook",
+            lambda: self._upload_photo(image_path),
+            account=self.page_id,
+        )
+        return photo_id
+
+    def _upload_photo(self, image_path: str) -> str:
+        """Upload an unpublished photo and return its ID"""
+        logger.info("Uploading image to Facebook: %s", image_path)
+        info = probe_media(image_path)
+        with open_media(image_path) as media:
+            files = {
+                "source": (info.filename, media.reader(), info.content_type),
+            }
+            upload_payload = {
+                "access_token": self.access_token,
+                "published": "false",
+            }
+            upload_url = f"https://graph.facebook.com/v22.0/{self.page_id}/photos"
+
+            logger.info("Uploading image to: %s", upload_url)
+            response = self.http.post(
+                upload_url, files=files, data=upload_payload, timeout=60
+            )
+
+        logger.info("Facebook image upload response status: %s", response.status_code)
+        logger.debug("Facebook upload response headers: %s", dict(response.headers))
+
+        response.raise_for_status()
+        photo_id = response.json()["id"]
+        logger.info("Image uploaded successfully. Photo ID: %s", photo_id)
+        return photo_id
+
+    def _publish(self, post_payload: dict) -> str:
+        """Create the feed post and return its ID"""
+        post_url = f"https://graph.facebook.com/v22.0/{self.page_id}/feed"
+        logger.info("Making post request to: %s", post_url)
+        post_response = self.http.post(post_url, json=post_payload, timeout=30)
+
+        logger.info("Facebook post response status: %s", post_response.status_code)
+        post_response.raise_for_status()
+
+        post_id = post_response.json()["id"]
+        logger.info("Post created successfully. Post ID: %s", post_id)
+        return post_id
+
+    def _validate_image(self, image_path: str):
+        """Check that the image exists, is within Facebook's size limit and is
+        a complete image, from its header (the file is not decoded)"""
+        try:
+            info = validate_media(image_path, MAX_PHOTO_BYTES)
+        except ValueError as e:
+            error_msg = f"Invalid image file: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        logger.info(
+            "Image validation passed (%s %dx%d, %d bytes)",
+            info.format,
+            info.width,
+            info.height,
+            info.size,
+        )
+
     def post_comment(self, post_id, comment_message):
         """
         Posts a comment to a specified Facebook post.
@@ -253,7 +292,7 @@ class FacebookPoster:
             }
 
             logger.info("Making comment request to: %s", comment_url)
-            comment_response = requests.post(
+            comment_response = self.http.post(
                 comment_url, json=comment_payload, timeout=30
             )
 
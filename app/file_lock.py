@@ -0,0 +1,34 @@
+"""
+Advisory file locks shared by the server processes.
+
+Caches and stores kept in JSON files are read, changed and written back by
+every worker process. ``file_lock`` holds an exclusive ``flock`` on a lock
+file next to the data for the duration of such a read-modify-write, so one
+process never overwrites another's changes. Without ``fcntl`` (Windows) it
+does nothing and a single server process is assumed.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locks are available
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on ``path`` (created if missing)"""
+    if fcntl is None:
+        yield
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,330 @@
+"""
+Two-stage ad generation pipeline.
+
+The text stage generates ``AdContent`` for each platform and hands it to the
+image stage through a bounded queue, so images for early platforms are
+rendered while later platforms' text is still being generated. A full queue
+blocks the text stage (backpressure), and both stages record timings so the
+bottleneck is visible in the logs.
+
+In master image mode the first ad to reach the image stage has one master
+image generated from its description; every platform's image, including its
+own, is then derived from that master instead of a separate Imagen call.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .PosterGenerator import AdContent, AppInfo, PosterGenerator
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling an image worker that the text stage has finished
+_STOP = object()
+
+
+@dataclass
+class StageTiming:
+    """Timing totals for one pipeline stage"""
+
+    workers: int
+    items: int = 0
+    busy_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    per_platform: Dict[str, float] = field(default_factory=dict)
+
+    def record(self, platform: str, seconds: float):
+        """Record the time spent processing one platform"""
+        self.items += 1
+        self.busy_seconds += seconds
+        self.per_platform[platform] = round(seconds, 3)
+
+    @property
+    def load(self) -> float:
+        """Busy time per worker, used to pick the bottleneck stage"""
+        return self.busy_seconds / max(self.workers, 1)
+
+
+class AdGenerationPipeline:
+    """Run text generation and image generation as overlapping stages"""
+
+    def __init__(
+        self,
+        generator: "PosterGenerator",
+        text_workers: int = 4,
+        image_workers: int = 4,
+        queue_size: int = 4,
+        use_cache: bool = True,
+        on_field=None,
+        on_progress=None,
+        master_image: bool = False,
+    ):
+        self.generator = generator
+        self.master_image = master_image
+        self.use_cache = use_cache
+        self.on_field = on_field
+        # Called as on_progress(platform, stage, status) with stage "text" or
+        # "image" and status "queued", "running", "done" or "failed"
+        self.on_progress = on_progress
+        self.text_workers = max(1, int(text_workers))
+        self.image_workers = max(1, int(image_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.errors: Dict[str, str] = {}
+        self.timings: Dict[str, StageTiming] = {}
+        self._lock = threading.Lock()
+        self._master_lock = threading.Lock()
+        self._master = None
+        self._master_attempted = False
+        self._platforms: List[str] = []
+
+    def run(
+        self,
+        app_info: "AppInfo",
+        platforms: List[str],
+        generate_images: bool = True,
+        batch_text: bool = False,
+    ) -> Dict[str, "AdContent"]:
+        """Generate ads for the given platforms and return them by platform.
+
+        With ``batch_text`` the text stage first requests every platform in a
+        single call and only falls back to per-platform requests for the
+        platforms whose batched content was missing or invalid.
+        """
+        ads: Dict[str, "AdContent"] = {}
+        self.errors = {}
+        self._platforms = list(platforms)
+        self._master = None
+        self._master_attempted = False
+        if not platforms:
+            self.timings = {}
+            return ads
+
+        self.timings = {"text": StageTiming(min(self.text_workers, len(platforms)))}
+        if generate_images:
+            self.timings["image"] = StageTiming(min(self.image_workers, len(platforms)))
+
+        image_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        image_threads = []
+        if generate_images:
+            for index in range(self.timings["image"].workers):
+                thread = threading.Thread(
+                    target=self._image_worker,
+                    args=(image_queue,),
+                    name=f"ad-image-{index}",
+                    daemon=True,
+                )
+                thread.start()
+                image_threads.append(thread)
+
+        started = time.perf_counter()
+        try:
+            pending = platforms
+            if batch_text and len(platforms) > 1:
+                pending = self._batch_text_task(
+                    app_info,
+                    platforms,
+                    ads,
+                    image_queue if generate_images else None,
+                )
+
+            with ThreadPoolExecutor(
+                max_workers=self.timings["text"].workers,
+                thread_name_prefix="ad-text",
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        self._text_task,
+                        app_info,
+                        platform,
+                        ads,
+                        image_queue if generate_images else None,
+                    )
+                    for platform in pending
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            for _ in image_threads:
+                image_queue.put(_STOP)
+            for thread in image_threads:
+                thread.join()
+
+        self._log_timings(time.perf_counter() - started)
+        return ads
+
+    def timings_summary(self) -> Dict[str, dict]:
+        """Return stage timings as plain dictionaries (JSON serialisable)"""
+        return {stage: asdict(timing) for stage, timing in self.timings.items()}
+
+    def _batch_text_task(
+        self,
+        app_info: "AppInfo",
+        platforms: List[str],
+        ads: Dict[str, "AdContent"],
+        image_queue: Optional["queue.Queue"],
+    ) -> List[str]:
+        """Generate all platforms' text in one call; return platforms left over"""
+        for platform in platforms:
+            self._notify(platform, "text", "running")
+        started = time.perf_counter()
+        try:
+            batch_ads = self.generator.generate_batch_ad_content(
+                app_info, platforms, use_cache=self.use_cache, on_field=self.on_field
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Batched text stage failed: %s", str(e))
+            batch_ads = {}
+        with self._lock:
+            self.timings["text"].record("batch", time.perf_counter() - started)
+            ads.update(batch_ads)
+
+        for ad_content in batch_ads.values():
+            self._notify(ad_content.platform, "text", "done")
+            self._queue_for_image(ad_content, image_queue)
+
+        return [platform for platform in platforms if platform not in batch_ads]
+
+    def _text_task(
+        self,
+        app_info: "AppInfo",
+        platform: str,
+        ads: Dict[str, "AdContent"],
+        image_queue: Optional["queue.Queue"],
+    ):
+        """Generate the text for one platform and queue it for the image stage"""
+        self._notify(platform, "text", "running")
+        started = time.perf_counter()
+        try:
+            ad_content = self.generator.generate_ad_content(
+                app_info, platform, use_cache=self.use_cache, on_field=self.on_field
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Text stage failed for %s: %s", platform, str(e))
+            ad_content = None
+            self._set_error(platform, str(e))
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.timings["text"].record(platform, elapsed)
+            if ad_content:
+                ads[platform] = ad_content
+            elif platform not in self.errors:
+                self.errors[platform] = "Failed to generate ad content"
+
+        self._notify(platform, "text", "done" if ad_content else "failed")
+        if ad_content:
+            self._queue_for_image(ad_content, image_queue)
+
+    def _queue_for_image(
+        self, ad_content: "AdContent", image_queue: Optional["queue.Queue"]
+    ):
+        """Hand an ad to the image stage, waiting while the queue is full"""
+        if image_queue is None:
+            return
+        self._notify(ad_content.platform, "image", "queued")
+        wait_started = time.perf_counter()
+        image_queue.put(ad_content)  # blocks while the image stage is behind
+        with self._lock:
+            self.timings["text"].wait_seconds += time.perf_counter() - wait_started
+
+    def _image_worker(self, image_queue: "queue.Queue"):
+        """Drain the queue and generate an image for each ad"""
+        while True:
+            wait_started = time.perf_counter()
+            ad_content = image_queue.get()
+            with self._lock:
+                self.timings["image"].wait_seconds += time.perf_counter() - wait_started
+            if ad_content is _STOP:
+                return
+
+            self._notify(ad_content.platform, "image", "running")
+            started = time.perf_counter()
+            try:
+                ad_content.image_path = self._render_image(ad_content)
+                if not ad_content.image_path:
+                    self._set_error(ad_content.platform, "Image generation failed")
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(
+                    "Image stage failed for %s: %s", ad_content.platform, str(e)
+                )
+                self._set_error(ad_content.platform, f"Image generation failed: {e}")
+            self._notify(
+                ad_content.platform,
+                "image",
+                "done" if ad_content.image_path else "failed",
+            )
+            with self._lock:
+                self.timings["image"].record(
+                    ad_content.platform, time.perf_counter() - started
+                )
+
+    def _render_image(self, ad_content: "AdContent") -> Optional[str]:
+        """Return the image path for an ad, derived from the master if enabled"""
+        if self.master_image:
+            master = self._master_image(ad_content)
+            if master is not None:
+                return self.generator.derive_image(ad_content.platform, master)
+        return self.generator.generate_image_from_text(
+            ad_content.platform, ad_content.suggested_image_description
+        )
+
+    def _master_image(self, ad_content: "AdContent"):
+        """Return the campaign's master image, generating it on first use.
+
+        Other image workers wait here while it is generated. If generation
+        fails, None is returned and every platform falls back to its own image.
+        """
+        with self._master_lock:
+            if not self._master_attempted:
+                self._master_attempted = True
+                started = time.perf_counter()
+                try:
+                    self._master = self.generator.generate_master_image(
+                        ad_content.suggested_image_description, self._platforms
+                    )
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error("Master image generation failed: %s", e)
+                if self._master is None:
+                    logger.warning("No master image; generating an image per platform")
+                else:
+                    logger.info(
+                        "Master image generated in %.2fs",
+                        time.perf_counter() - started,
+                    )
+            return self._master
+
+    def _notify(self, platform: str, stage: str, status: str):
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(platform, stage, status)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Progress callback failed: %s", e)
+
+    def _set_error(self, platform: str, message: str):
+        with self._lock:
+            self.errors[platform] = message
+
+    def _log_timings(self, wall_seconds: float):
+        for stage, timing in self.timings.items():
+            logger.info(
+                "Pipeline %s stage: %d item(s), %d worker(s), busy %.2fs, "
+                "waiting %.2fs",
+                stage,
+                timing.items,
+                timing.workers,
+                timing.busy_seconds,
+                timing.wait_seconds,
+            )
+        bottleneck = max(self.timings, key=lambda stage: self.timings[stage].load)
+        logger.info(
+            "Pipeline finished in %.2fs, bottleneck stage: %s",
+            wall_seconds,
+            bottleneck,
+        )
@@ -1,34 +1,100 @@
 import io
+import uuid
 from datetime import datetime
 from pathlib import Path
 
-import google.genai as genai
 from google.genai import types
 from PIL import Image
 
+from .. import config as app_config
 from ..config import PLATFORM_SETTINGS
+from ..image_compression import JpegEncoder, compress_to_size
+from ..image_variants import derive_variant
+from ..media_buffer import remember_encoded
 
 
 class AdImageGenerator:
     def __init__(self, api_key: str, model: str = "imagen-4.0-generate-001"):
+        # Imported here to avoid a circular import with the registry module
+        from .client_registry import get_genai_client
+
         self.gemini_api_key = api_key
         self.model = model
-        self.client = genai.Client(api_key=self.gemini_api_key)
+        self.client = get_genai_client(self.gemini_api_key)
 
     def _compress_image(self, img: Image.Image, max_size_kb: int, filepath: Path):
         """Compress image under the given size limit (KB)."""
-        quality = 95
-        while quality > 10:
+        encoder = JpegEncoder(
+            subsampling=app_config.JPEG_SUBSAMPLING,
+            progressive=app_config.JPEG_PROGRESSIVE,
+        )
+        result = compress_to_size(
+            img,
+            max_size_kb,
+            min_quality=app_config.JPEG_MIN_QUALITY,
+            min_scale=app_config.IMAGE_MIN_SCALE,
+            encoder=encoder,
+        )
+        if result is None:
+            return False
+        with open(filepath, "wb") as f:
+            f.write(result.data)
+        remember_encoded(filepath, result.data)
+        print(f"🗜️ Compressed image: {result.summary()}")
+        return True
+
+    def _request_image(self, prompt: str, aspect_ratio: str, image_size=None):
+        """Ask Imagen for one image and return it as a PIL image, or None."""
+        config = {"number_of_images": 1, "aspect_ratio": aspect_ratio}
+        if image_size:
+            config["image_size"] = image_size
+        response = self.client.models.generate_images(
+            model=self.model,
+            prompt=prompt,
+            config=types.GenerateImagesConfig(**config),
+        )
+
+        if not response.generated_images:
+            print("❌ No image was generated. Try refining your prompt.")
+            return None
+
+        image_data = response.generated_images[0].image.image_bytes
+        return Image.open(io.BytesIO(image_data))
+
+    def _save_image(self, img: Image.Image, platform: str, filepath: Path) -> bool:
+        """Save an image as JPEG within the platform's file size limit."""
+        max_filesize_kb = PLATFORM_SETTINGS.get(platform, {}).get(
+            "max_image_filesize_kb"
+        )
+        # Save with compression if Bluesky or size-limited
+        if max_filesize_kb:
+            if not self._compress_image(img, max_filesize_kb, filepath):
+                print(f"⚠️ Could not compress image below {max_filesize_kb} KB.")
+                return False
+        else:
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
             buffer = io.BytesIO()
-            img.save(buffer, format="JPEG", quality=quality)
-            size_kb = buffer.tell() / 1024
-            if size_kb <= max_size_kb:
-                buffer.seek(0)
-                with open(filepath, "wb") as f:
-                    f.write(buffer.read())
-                return True
-            quality -= 5
-        return False
+            img.save(buffer, format="JPEG", quality=95)
+            data = buffer.getbuffer()
+            with open(filepath, "wb") as f:
+                f.write(data)
+            # Keep the encoded bytes so posting them needs no disk read
+            remember_encoded(filepath, data)
+        return True
+
+    @staticmethod
+    def _output_path(platform: str, output_dir: str, output_filename: str = None):
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Generate unique filename if not provided
+        if not output_filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            suffix = uuid.uuid4().hex[:8]
+            # JPEG compressible
+            output_filename = f"{platform}_ads_{timestamp}_{suffix}.jpg"
+        return output_dir / output_filename
 
     def generate_image_from_text(
         self,
@@ -53,7 +119,6 @@ class AdImageGenerator:
             tone = settings.get("tone", "")
             style = settings.get("style", "")
             optimal_size = settings.get("optimal_image_size", None)
-            max_filesize_kb = settings.get("max_image_filesize_kb", None)
 
             # Refine prompt with tone & style
             refined_prompt = (
@@ -62,46 +127,19 @@ class AdImageGenerator:
                 f"no text, no labels, no captions."
             )
 
-            # Create output directory
-            output_dir = Path(output_dir)
-            output_dir.mkdir(parents=True, exist_ok=True)
-
-            # Generate unique filename if not provided
-            if not output_filename:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_filename = f"{platform}_ads_{timestamp}.jpg"  # JPEG compressible
-
-            filepath = output_dir / output_filename
+            filepath = self._output_path(platform, output_dir, output_filename)
 
             # Generate image with Gemini
-            response = self.client.models.generate_images(
-                model=self.model,
-                prompt=refined_prompt,
-                config=types.GenerateImagesConfig(
-                    number_of_images=1,
-                    aspect_ratio=aspect_ratio,
-                ),
-            )
-
-            if not response.generated_images:
-                print("❌ No image was generated. Try refining your prompt.")
+            img = self._request_image(refined_prompt, aspect_ratio)
+            if img is None:
                 return None
 
-            # Extract image
-            image_data = response.generated_images[0].image.image_bytes
-            img = Image.open(io.BytesIO(image_data))
-
             # Resize to platform optimal size if available
             if optimal_size:
                 img = img.resize(optimal_size, Image.LANCZOS)
 
-            # Save with compression if Bluesky or size-limited
-            if max_filesize_kb:
-                if not self._compress_image(img, max_filesize_kb, filepath):
-                    print(f"⚠️ Could not compress image below {max_filesize_kb} KB.")
-                    return None
-            else:
-                img.save(filepath, format="JPEG", quality=95)
+            if not self._save_image(img, platform, filepath):
+                return None
 
             print(f"✅ Success! Image saved at {filepath}")
             return str(filepath)
@@ -109,3 +147,61 @@ class AdImageGenerator:
         except Exception as e:
             print(f"⚠️ Error while generating image: {e}")
             return None
+
+    def generate_master_image(
+        self, prompt: str, aspect_ratio: str, image_size: str = None
+    ) -> Image.Image:
+        """
+        Generate one high-resolution image to derive every platform's image from.
+
+        Args:
+            prompt (str): Base description of the ad image.
+            aspect_ratio (str): Imagen aspect ratio of the master image.
+            image_size (str, optional): Imagen output size such as "2K".
+        """
+        try:
+            refined_prompt = (
+                f"{prompt}. Modern, high-quality ad creative, visually striking, "
+                f"main subject well inside the frame, "
+                f"no text, no labels, no captions."
+            )
+            img = self._request_image(refined_prompt, aspect_ratio, image_size)
+            if img is None:
+                return None
+            img.load()
+            print(f"✅ Master image generated ({img.width}x{img.height})")
+            return img
+
+        except Exception as e:
+            print(f"⚠️ Error while generating master image: {e}")
+            return None
+
+    def save_platform_variant(
+        self,
+        master: Image.Image,
+        platform: str,
+        output_dir: str,
+        output_filename: str = None,
+    ) -> str:
+        """
+        Crop and resize a master image for a platform and save it.
+
+        Args:
+            master (Image.Image): Image from generate_master_image().
+            platform (str): The target platform (must exist in PLATFORM_SETTINGS).
+            output_dir (str): Directory to save the image.
+            output_filename (str, optional): Custom filename. Defaults to timestamp.
+        """
+        try:
+            filepath = self._output_path(platform, output_dir, output_filename)
+            if not self._save_image(
+                derive_variant(master, platform), platform, filepath
+            ):
+                return None
+
+            print(f"✅ Success! {platform} image derived at {filepath}")
+            return str(filepath)
+
+        except Exception as e:
+            print(f"⚠️ Error while deriving {platform} image: {e}")
+            return None
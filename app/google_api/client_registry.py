@@ -0,0 +1,58 @@
+"""
+Process-wide registry of Google GenAI clients.
+
+Creating a ``genai.Client`` sets up a new HTTP client, so every request that
+built its own paid for connection setup and TLS handshakes. The registry
+creates clients lazily, keeps one per API key (and one image generator per
+API key and model) for the life of the process, and lets a configuration
+reload swap them out.
+"""
+
+import logging
+import threading
+from typing import Dict, Tuple
+
+import google.genai as genai
+
+from .ads_image_generator import AdImageGenerator
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients: Dict[str, genai.Client] = {}
+_image_generators: Dict[Tuple[str, str], AdImageGenerator] = {}
+
+
+def get_genai_client(api_key: str) -> genai.Client:
+    """Return the shared client for an API key, creating it on first use"""
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            logger.info("Creating GenAI client")
+            client = genai.Client(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+
+def get_image_generator(api_key: str, model: str) -> AdImageGenerator:
+    """Return the shared image generator for an API key and Imagen model"""
+    with _lock:
+        generator = _image_generators.get((api_key, model))
+    if generator is None:
+        generator = AdImageGenerator(api_key, model)
+        with _lock:
+            generator = _image_generators.setdefault((api_key, model), generator)
+    return generator
+
+
+def reset_clients():
+    """Forget all cached clients so the next request uses fresh settings.
+
+    Requests already in flight keep the client they hold; the old clients
+    are released once those requests finish.
+    """
+    with _lock:
+        count = len(_clients)
+        _clients.clear()
+        _image_generators.clear()
+    logger.info("Reset %d GenAI client(s)", count)
@@ -0,0 +1,107 @@
+"""
+Shared HTTP transport for the platform clients.
+
+The Facebook, Instagram, Bluesky and imgbb clients used to call
+``requests.post`` directly, which opens a new connection (TCP and TLS
+handshake) for every API call. ``HttpTransport`` wraps one
+``requests.Session`` with per-host connection pools, so the calls of a
+posting flow (upload, publish, comment) and later posts reuse kept-alive
+connections. A process-wide transport is created lazily from the
+configuration; posters accept their own for tests or special cases.
+"""
+
+import logging
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import config as app_config
+
+logger = logging.getLogger(__name__)
+
+
+class HttpTransport:
+    """A pooled, keep-alive HTTP session with default timeouts.
+
+    ``timeout`` passed to a request is the read timeout for that call; the
+    connect timeout is always ``connect_timeout``.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 8,
+        connect_timeout: float = 10,
+        read_timeout: float = 30,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+        # Tokens travel in each request; don't let one API's cookies stick
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=max(1, int(pool_connections)),
+            pool_maxsize=max(1, int(pool_maxsize)),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(
+        self, method: str, url: str, timeout: Optional[float] = None, **kwargs
+    ) -> requests.Response:
+        """Send a request over the pooled session"""
+        return self.session.request(
+            method,
+            url,
+            timeout=(self.connect_timeout, timeout or self.read_timeout),
+            **kwargs,
+        )
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request"""
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_lock = threading.Lock()
+_transport: Optional[HttpTransport] = None
+
+
+def get_transport() -> HttpTransport:
+    """Return the shared transport, creating it from the configuration"""
+    global _transport  # pylint: disable=global-statement
+    with _lock:
+        if _transport is None:
+            # Read through the module so a reload from /config is picked up
+            _transport = HttpTransport(
+                pool_connections=app_config.HTTP_POOL_CONNECTIONS,
+                pool_maxsize=app_config.HTTP_POOL_MAXSIZE,
+                connect_timeout=app_config.HTTP_CONNECT_TIMEOUT,
+                read_timeout=app_config.HTTP_READ_TIMEOUT,
+            )
+            logger.info(
+                "Created HTTP transport (pool size %d per host)",
+                app_config.HTTP_POOL_MAXSIZE,
+            )
+        return _transport
+
+
+def reset_transport():
+    """Drop the shared transport so the next request uses fresh settings.
+
+    Requests already in flight keep the transport they hold; its pooled
+    connections are released when it is garbage collected.
+    """
+    global _transport  # pylint: disable=global-statement
+    with _lock:
+        _transport = None
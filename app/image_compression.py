@@ -0,0 +1,173 @@
+"""
+Size-targeted JPEG encoding.
+
+Platforms such as Bluesky reject images over a byte limit. Stepping the JPEG
+quality down 5 points at a time costs up to 17 full encodes and gives up
+when even the lowest quality is too big. ``compress_to_size`` binary-searches
+the highest quality that fits instead, and when no quality in range fits it
+scales the image down step by step and searches again. The search uses fast
+baseline encodes; only the chosen quality is encoded with the slower
+progressive/optimize settings, which make the file smaller still. Encodes
+are returned as views of the encoder's buffer, so no bytes are copied.
+"""
+
+import io
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Pillow's subsampling values for each chroma subsampling mode
+SUBSAMPLING = {"4:4:4": 0, "4:2:2": 1, "4:2:0": 2}
+
+
+@dataclass
+class CompressionResult:
+    """An encoded JPEG and how it was found"""
+
+    data: memoryview
+    quality: int
+    width: int
+    height: int
+    scale: float
+    encodes: int
+    seconds: float
+
+    @property
+    def size_kb(self) -> float:
+        """Encoded size in KB"""
+        return len(self.data) / 1024
+
+    def summary(self) -> str:
+        """One-line description for logs"""
+        return (
+            f"{self.size_kb:.0f} KB at quality {self.quality}, "
+            f"{self.width}x{self.height} (scale {self.scale:.2f}), "
+            f"{self.encodes} encode(s) in {self.seconds * 1000:.0f} ms"
+        )
+
+
+class JpegEncoder:
+    """Encode images as JPEG with fixed subsampling/progressive/optimize settings"""
+
+    def __init__(
+        self,
+        subsampling: str = "4:2:0",
+        progressive: bool = True,
+        optimize: bool = True,
+    ):
+        if subsampling not in SUBSAMPLING:
+            raise ValueError(f"Unknown chroma subsampling: {subsampling}")
+        self.subsampling = SUBSAMPLING[subsampling]
+        self.progressive = progressive
+        self.optimize = optimize
+        self.encodes = 0
+
+    def encode(self, img: Image.Image, quality: int, fast: bool = False) -> memoryview:
+        """Return the JPEG bytes of an image at a quality, as a view of the buffer.
+
+        ``fast`` skips progressive and optimize, for trial encodes.
+        """
+        buffer = io.BytesIO()
+        img.save(
+            buffer,
+            format="JPEG",
+            quality=quality,
+            subsampling=self.subsampling,
+            progressive=self.progressive and not fast,
+            optimize=self.optimize and not fast,
+        )
+        self.encodes += 1
+        return buffer.getbuffer()
+
+
+def compress_to_size(
+    img: Image.Image,
+    max_size_kb: float,
+    min_quality: int = 40,
+    max_quality: int = 95,
+    min_scale: float = 0.5,
+    scale_step: float = 0.85,
+    encoder: Optional[JpegEncoder] = None,
+) -> Optional[CompressionResult]:
+    """Return the best-quality JPEG of ``img`` that fits in ``max_size_kb``.
+
+    Qualities between ``min_quality`` and ``max_quality`` are binary-searched
+    at full size first; if none fits, the image is scaled down by
+    ``scale_step`` at a time, no smaller than ``min_scale``. Returns None if
+    the image cannot be made small enough.
+    """
+    encoder = encoder or JpegEncoder()
+    max_bytes = int(max_size_kb * 1024)
+    started = time.perf_counter()
+    first_encode = encoder.encodes
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    scale = 1.0
+    while scale >= min_scale:
+        if scale < 1.0:
+            size = (
+                max(1, round(img.width * scale)),
+                max(1, round(img.height * scale)),
+            )
+            candidate = img.resize(size, Image.LANCZOS)
+        else:
+            candidate = img
+
+        found = _search_quality(candidate, max_bytes, min_quality, max_quality, encoder)
+        if found is not None:
+            quality, data = found
+            if encoder.progressive or encoder.optimize:
+                final = encoder.encode(candidate, quality)
+                # Progressive is smaller for all but tiny images; check anyway
+                if len(final) <= len(data):
+                    data = final
+            result = CompressionResult(
+                data=data,
+                quality=quality,
+                width=candidate.width,
+                height=candidate.height,
+                scale=scale,
+                encodes=encoder.encodes - first_encode,
+                seconds=time.perf_counter() - started,
+            )
+            logger.info("Compressed image: %s", result.summary())
+            return result
+        scale *= scale_step
+
+    logger.warning(
+        "Could not compress image below %s KB (%d encodes in %.0f ms)",
+        max_size_kb,
+        encoder.encodes - first_encode,
+        (time.perf_counter() - started) * 1000,
+    )
+    return None
+
+
+def _search_quality(img, max_bytes, min_quality, max_quality, encoder):
+    """Return (quality, data) for the highest quality that fits, or None"""
+    # Most images fit at the top quality; and if the lowest quality is
+    # too big there is nothing to search at this size
+    data = encoder.encode(img, max_quality, fast=True)
+    if len(data) <= max_bytes:
+        return max_quality, data
+    data = encoder.encode(img, min_quality, fast=True)
+    if len(data) > max_bytes:
+        return None
+
+    best = (min_quality, data)
+    low, high = min_quality + 1, max_quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = encoder.encode(img, quality, fast=True)
+        if len(data) <= max_bytes:
+            best = (quality, data)
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best
@@ -0,0 +1,204 @@
+"""
+Serving generated images and their thumbnails.
+
+Campaign pages used to show every generated image at full resolution, with
+no cache validators, so each visit downloaded megabytes. ``ThumbnailCache``
+renders WebP (or JPEG, for browsers that don't accept WebP) thumbnails at the
+fixed ``thumbnail_widths`` under ``cache/thumbnails/`` and re-renders them
+only when the source image changes. ``image_response`` sends originals and
+thumbnails with a strong ETag derived from the image content, Last-Modified,
+and Range support. Image URLs in the pages carry the file's version
+(``file_version``), so those responses are cached for a year; unversioned
+requests are revalidated and answered with 304 while the image is unchanged.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from flask import request, send_file
+
+from .config import CACHE_DIR, THUMBNAIL_QUALITY, THUMBNAIL_WIDTHS
+from .media_info import get_media_probe
+
+logger = logging.getLogger(__name__)
+
+# Lifetime of responses whose URL names the file version
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+def file_version(path: str) -> str:
+    """Return a token that changes whenever the file is replaced"""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}{stat.st_size:x}"
+
+
+class ThumbnailCache:
+    """Thumbnails of images at fixed widths, kept as files on disk"""
+
+    def __init__(self, cache_dir: str, widths, quality: int = 80):
+        self.cache_dir = cache_dir
+        self.widths = sorted(int(width) for width in widths)
+        self.quality = quality
+        self.rendered = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def width_for(self, display_width: int) -> int:
+        """Return the smallest thumbnail width covering a display width"""
+        for width in self.widths:
+            if width >= display_width:
+                return width
+        return self.widths[-1]
+
+    def path_for(self, source_path: str, width: int, fmt: str) -> str:
+        """Return the thumbnail file for a source image, rendering it if needed.
+
+        Raises ValueError for widths other than the configured ones or if the
+        source is not an image, and FileNotFoundError if it does not exist.
+        """
+        if width not in self.widths:
+            raise ValueError(f"Unsupported thumbnail width: {width}")
+        image_format, _ = _FORMATS[fmt]
+        prefix = self._prefix(source_path)
+        path = os.path.join(
+            self.cache_dir, f"{prefix}.{file_version(source_path)}.{width}.{fmt}"
+        )
+        if os.path.exists(path):
+            return path
+
+        with self._key_lock(prefix):
+            # Another request may have rendered it while we waited
+            if not os.path.exists(path):
+                self._render(source_path, path, width, image_format)
+                self._remove_stale(prefix, path)
+        return path
+
+    def _render(self, source_path: str, path: str, width: int, image_format: str):
+        # Imported on first render, keeping PIL out of server startup
+        # pylint: disable=import-outside-toplevel
+        from PIL import Image, UnidentifiedImageError
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            with Image.open(source_path) as img:
+                height = max(1, round(img.height * width / img.width))
+                # JPEG sources are decoded at a reduced scale straight away
+                img.draft("RGB", (width, height))
+                thumbnail = img.convert("RGB")
+        except UnidentifiedImageError as e:
+            raise ValueError(f"Not an image: {source_path}") from e
+        # Never enlarge: small sources are re-encoded at their own size
+        thumbnail.thumbnail((width, thumbnail.height), Image.LANCZOS)
+
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            if image_format == "WEBP":
+                thumbnail.save(temp_path, format="WEBP", quality=self.quality, method=4)
+            else:
+                thumbnail.save(
+                    temp_path,
+                    format="JPEG",
+                    quality=self.quality,
+                    progressive=True,
+                    optimize=True,
+                )
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        with self._lock:
+            self.rendered += 1
+        logger.info("Rendered %dpx thumbnail of %s", width, source_path)
+
+    def _remove_stale(self, prefix: str, keep: str):
+        """Delete thumbnails of earlier versions of the same source image"""
+        keep_version = os.path.basename(keep).split(".")[1]
+        for name in os.listdir(self.cache_dir):
+            parts = name.split(".")
+            if parts[0] == prefix and parts[1] != keep_version:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _prefix(source_path: str) -> str:
+        # The stem keeps the cache browsable; the hash keeps paths unique
+        stem = os.path.splitext(os.path.basename(source_path))[0].replace(".", "_")
+        digest = hashlib.sha1(os.path.abspath(source_path).encode("utf-8"))
+        return f"{stem}-{digest.hexdigest()[:10]}"
+
+
+_thumbnails = ThumbnailCache(
+    os.path.join(CACHE_DIR, "thumbnails"), THUMBNAIL_WIDTHS, THUMBNAIL_QUALITY
+)
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Return the process-wide thumbnail cache"""
+    return _thumbnails
+
+
+def preferred_format() -> str:
+    """Return "webp" if the browser accepts it, otherwise "jpeg" """
+    # Only an explicit image/webp counts: browsers without WebP send */*
+    accepted = {value for value, quality in request.accept_mimetypes if quality}
+    return "webp" if "image/webp" in accepted else "jpeg"
+
+
+def image_response(
+    path: str,
+    etag: Optional[str] = None,
+    mimetype: str = None,
+    version: Optional[str] = None,
+):
+    """Send a file with ETag/Last-Modified, 304 and Range support.
+
+    Requests whose ``v`` argument matches ``version`` (by default the file's
+    own version) get a one-year immutable lifetime; others must revalidate.
+    """
+    if etag is None:
+        try:
+            # Strong validator from the content, shared with the upload cache
+            etag = get_media_probe().sha256(path)[:32]
+        except ValueError:
+            etag = True  # Not an image: Werkzeug's mtime/size based ETag
+    response = send_file(
+        path, mimetype=mimetype, conditional=True, etag=etag, max_age=0
+    )
+    response.cache_control.public = True
+    if request.args.get("v") == (version or file_version(path)):
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def thumbnail_response(source_path: str, width: int):
+    """Send the thumbnail of an image in the format the browser prefers"""
+    fmt = preferred_format()
+    path = _thumbnails.path_for(source_path, width, fmt)
+    source_etag = get_media_probe().sha256(source_path)[:32]
+    # Validation and versioning follow the source image, not the cache file
+    response = image_response(
+        path,
+        etag=f"{source_etag}-{width}-{THUMBNAIL_QUALITY}-{fmt}",
+        mimetype=_FORMATS[fmt][1],
+        version=file_version(source_path),
+    )
+    response.vary.add("Accept")
+    return response
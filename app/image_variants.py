@@ -0,0 +1,123 @@
+"""
+Platform image variants derived from one master image.
+
+Generating a separate Imagen image per platform costs one Imagen call per
+platform even though the visual concept is the same. In master image mode a
+single high-resolution image is generated per campaign, in the Imagen aspect
+ratio that needs the least cropping for the selected platforms, and each
+platform's image is cut from it: the crop window keeps the busiest part of
+the picture (most edge detail) and is then resized to the platform's
+``optimal_image_size``.
+"""
+
+from typing import Iterable, Tuple
+
+from PIL import Image, ImageFilter
+
+from .config import PLATFORM_SETTINGS
+
+# Aspect ratios Imagen can generate
+IMAGEN_ASPECT_RATIOS = ("1:1", "3:4", "4:3", "9:16", "16:9")
+
+# Longest side of the copy the crop position is searched on
+_ANALYSIS_SIZE = 256
+
+# How much a centred crop is preferred over an equally busy off-centre one
+_CENTER_WEIGHT = 0.15
+
+
+def ratio_value(ratio: str) -> float:
+    """Return width / height for a ratio such as ``"16:9"``"""
+    width, height = ratio.split(":")
+    return float(width) / float(height)
+
+
+def target_ratio(platform: str) -> float:
+    """Return the width / height a platform's image should have"""
+    settings = PLATFORM_SETTINGS.get(platform, {})
+    optimal_size = settings.get("optimal_image_size")
+    if optimal_size:
+        return optimal_size[0] / optimal_size[1]
+    return ratio_value(settings.get("aspect_ratio", "16:9"))
+
+
+def crop_loss(source_ratio: float, wanted_ratio: float) -> float:
+    """Return the fraction of an image lost when cropping it to another ratio"""
+    return 1 - min(source_ratio / wanted_ratio, wanted_ratio / source_ratio)
+
+
+def choose_master_aspect_ratio(platforms: Iterable[str]) -> str:
+    """Return the Imagen aspect ratio that needs the least cropping.
+
+    The ratio with the smallest worst-case loss over all platforms wins, ties
+    go to the one with the smallest total loss.
+    """
+    wanted = [target_ratio(platform) for platform in platforms]
+    if not wanted:
+        return "1:1"
+
+    def cost(ratio):
+        losses = [crop_loss(ratio_value(ratio), value) for value in wanted]
+        return round(max(losses), 6), sum(losses)
+
+    return min(IMAGEN_ASPECT_RATIOS, key=cost)
+
+
+def smart_crop_box(img: Image.Image, ratio: float) -> Tuple[int, int, int, int]:
+    """Return the crop box with the given width / height ratio that keeps the
+    most detail, searched along the axis that has to be cropped"""
+    width, height = img.size
+    if abs(width / height - ratio) < 0.01:
+        return 0, 0, width, height
+
+    crop_width = width
+    crop_height = height
+    horizontal = width / height > ratio
+    if horizontal:
+        crop_width = max(1, min(width, round(height * ratio)))
+    else:
+        crop_height = max(1, min(height, round(width / ratio)))
+
+    # Edge strength per column (or row) of a small greyscale copy
+    scale = _ANALYSIS_SIZE / max(width, height)
+    small = img.convert("L").resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR
+    )
+    # Pillow copies border pixels unfiltered; replace them with their neighbours
+    edges = small.filter(ImageFilter.FIND_EDGES)
+    edges = edges.crop((1, 1, max(2, edges.width - 1), max(2, edges.height - 1)))
+    profile_size = (edges.width, 1) if horizontal else (1, edges.height)
+    profile = list(edges.resize(profile_size, Image.BOX).tobytes())
+    profile = profile[:1] + profile + profile[-1:]
+
+    length = len(profile)
+    window = max(
+        1, min(length, round((crop_width if horizontal else crop_height) * scale))
+    )
+    positions = length - window
+    best_start, best_score = positions // 2, None
+    running = sum(profile[:window])
+    for start in range(positions + 1):
+        if start:
+            running += profile[start + window - 1] - profile[start - 1]
+        offset = abs(start - positions / 2) / (positions / 2) if positions else 0
+        # Ties (e.g. a flat background) go to the most central window
+        score = (running * (1 - _CENTER_WEIGHT * offset), -offset)
+        if best_score is None or score > best_score:
+            best_start, best_score = start, score
+
+    if horizontal:
+        left = min(width - crop_width, round(best_start / scale))
+        return left, 0, left + crop_width, height
+    top = min(height - crop_height, round(best_start / scale))
+    return 0, top, width, top + crop_height
+
+
+def derive_variant(master: Image.Image, platform: str) -> Image.Image:
+    """Crop and resize a master image to a platform's ratio and optimal size"""
+    settings = PLATFORM_SETTINGS.get(platform, {})
+    img = master.crop(smart_crop_box(master, target_ratio(platform)))
+    optimal_size = settings.get("optimal_image_size")
+    if optimal_size:
+        img = img.resize(tuple(optimal_size), Image.LANCZOS)
+    return img
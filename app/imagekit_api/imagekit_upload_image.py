@@ -4,10 +4,14 @@ ImageKit image upload module.
 This module provides functionality to upload images to ImageKit.
 """
 
+import os
+
 from imagekitio.client import ImageKit
 from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
 
 from ..config import IMAGEKIT_PRIVATE_KEY, IMAGEKIT_PUBLIC_KEY, IMAGEKIT_URL_ENDPOINT
+from ..media_buffer import open_media
+from ..media_info import validate_media
 
 
 class ImageKitUploader:
@@ -37,19 +41,27 @@ class ImageKitUploader:
             Upload result
         """
         try:
-            with open(file_path, "rb") as file_to_upload:
+            info = validate_media(file_path)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
+        # Generated images are JPEG whatever their extension says
+        file_name = f"{os.path.splitext(file_name)[0]}{info.extension}"
+        try:
+            # The SDK takes (name, file object, content type) as the multipart
+            # part; the reader serves the in-memory or mapped bytes
+            with open_media(file_path) as media:
                 options = UploadFileRequestOptions(tags=tags or [])
                 upload = self.imagekit.upload_file(
-                    file=file_to_upload, file_name=file_name, options=options
+                    file=(file_name, media.reader(), info.content_type),
+                    file_name=file_name,
+                    options=options,
                 )
             if upload.response_metadata.http_status_code == 200:
                 return upload.url
             print("Upload failed.")
             print(f"Error: {upload.response_metadata.raw}")
             return None
-        except FileNotFoundError:
-            print(f"Error: The file '{file_path}' was not found.")
-            return None
         except (IOError, OSError, ValueError, ConnectionError, TimeoutError) as e:
             print(f"An unexpected error occurred: {e}")
             return None
@@ -1,17 +1,20 @@
-import requests
-
 from ..config import IMGBB_API_KEY
+from ..http_transport import get_transport
+from ..media_buffer import open_media
+from ..media_info import probe_media
 
 
-def upload_to_imgbb(image_path) -> str:
-    with open(image_path, "rb") as file:
+def upload_to_imgbb(image_path, transport=None) -> str:
+    http = transport or get_transport()
+    info = probe_media(image_path)
+    with open_media(image_path) as media:
         url = "https://api.imgbb.com/1/upload"
         payload = {
             "key": IMGBB_API_KEY,
         }
         files = {
-            "image": file,
+            "image": (info.filename, media.reader(), info.content_type),
         }
-        response = requests.post(url, data=payload, files=files)
+        response = http.post(url, data=payload, files=files, timeout=60)
         response.raise_for_status()
         return response.json()["data"]["url"]
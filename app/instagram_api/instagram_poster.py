@@ -5,6 +5,8 @@ import requests
 from PIL import Image
 
 from ..config import INSTAGRAM_ACCESS_TOKEN, INSTAGRAM_ACCOUNT_ID
+from ..http_transport import get_transport
+from ..posting_progress import PostingCheckpoint
 
 # Configure logging for InstagramPoster
 logger = logging.getLogger(__name__)
@@ -12,10 +14,18 @@ logger = logging.getLogger(__name__)
 
 class InstagramPoster:
     def __init__(
-        self, ig_user_id=INSTAGRAM_ACCOUNT_ID, access_token=INSTAGRAM_ACCESS_TOKEN
+        self,
+        ig_user_id=INSTAGRAM_ACCOUNT_ID,
+        access_token=INSTAGRAM_ACCESS_TOKEN,
+        on_step=None,
+        transport=None,
+        checkpoint=None,
     ):
         self.ig_user_id = ig_user_id
         self.access_token = access_token
+        self.on_step = on_step
+        self.http = transport or get_transport()
+        self.checkpoint = checkpoint or PostingCheckpoint()
         logger.info(
             f"InstagramPoster initialized with user_id: {bool(self.ig_user_id)}, "
             f"access_token: {bool(self.access_token)}"
@@ -51,19 +61,27 @@ class InstagramPoster:
                 f"'caption_length': {len(caption)}, 'access_token': '[HIDDEN]'}}"
             )
 
-            response = requests.post(create_url, data=payload, timeout=30)
-
-            logger.info(
-                f"Instagram media creation response status: {response.status_code}"
-            )
-            logger.debug(
-                f"Instagram creation response headers: {dict(response.headers)}"
+            def create_container():
+                response = self.http.post(create_url, data=payload, timeout=30)
+
+                logger.info(
+                    f"Instagram media creation response status: {response.status_code}"
+                )
+                logger.debug(
+                    f"Instagram creation response headers: {dict(response.headers)}"
+                )
+
+                response.raise_for_status()
+                return response.json()["id"]
+
+            creation_id = self.checkpoint.step(
+                self.on_step,
+                "create_container",
+                "Creating Instagram media container",
+                "creation_id",
+                create_container,
             )
-
-            response.raise_for_status()
-            creation_result = response.json()
-            creation_id = creation_result["id"]
-            logger.info(f"Media container created successfully with ID: {creation_id}")
+            logger.info(f"Media container ready with ID: {creation_id}")
 
             # Step 2: Publish media
             logger.info("Publishing Instagram media...")
@@ -75,18 +93,27 @@ class InstagramPoster:
                 "access_token": self.access_token,
             }
 
-            logger.info(f"Making media publish request to: {publish_url}")
-            publish_response = requests.post(
-                publish_url, data=publish_payload, timeout=30
+            def publish():
+                logger.info(f"Making media publish request to: {publish_url}")
+                publish_response = self.http.post(
+                    publish_url, data=publish_payload, timeout=30
+                )
+
+                logger.info(
+                    f"Instagram media publish response status: "
+                    f"{publish_response.status_code}"
+                )
+                publish_response.raise_for_status()
+                return publish_response.json()["id"]
+
+            media_id = self.checkpoint.step(
+                self.on_step,
+                "publish",
+                "Publishing post to Instagram",
+                "media_id",
+                publish,
             )
-
-            logger.info(
-                f"Instagram media publish response status: "
-                f"{publish_response.status_code}"
-            )
-            publish_response.raise_for_status()
-
-            result = publish_response.json()
+            result = {"id": media_id}
             logger.info(f"Instagram post published successfully: {result}")
             print(f"Posting image to Instagram: {result}")
 
@@ -0,0 +1,259 @@
+"""
+Background job queue for ad generation.
+
+Generation requests are stored as jobs, run on a worker pool and tracked
+with per-platform progress. Job state is written to one JSON file per job
+so queued or interrupted jobs are picked up again after a server restart.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single server process is assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+UNFINISHED_STATUSES = (QUEUED, RUNNING)
+
+
+def _pid_alive(pid) -> bool:
+    """Return True if a process with this pid is still running"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class JobManager:
+    """Run generation jobs in the background and persist their state.
+
+    ``runner(params, on_field, on_progress)`` does the actual work and
+    returns the JSON-serialisable result stored on the job.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: str,
+        runner: Callable,
+        max_workers: int = 2,
+        retention_days: float = 7,
+    ):
+        self.jobs_dir = jobs_dir
+        self.runner = runner
+        self.retention_seconds = retention_days * 24 * 3600
+        self._jobs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(max_workers)), thread_name_prefix="generation-job"
+        )
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    def submit(self, params: dict, platforms: List[str]) -> dict:
+        """Create a job for the given generation params and queue it"""
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "owner_pid": os.getpid(),
+            "params": params,
+            "progress": {
+                platform: {"text": "pending", "image": "pending"}
+                for platform in platforms
+            },
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._save(job)
+        logger.info("Queued generation job %s for %s", job["id"], platforms)
+        self._executor.submit(self._run, job["id"])
+        return self.get(job["id"])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return a snapshot of a job, loading it from disk if needed"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = self._load(job_id)
+            if job is None:
+                return None
+            return json.loads(json.dumps(job))
+
+    def resume_unfinished(self):
+        """Re-queue jobs left queued or running by a process that has exited"""
+        # Server workers start together; the lock makes sure the first one
+        # claims each job and the others see it as owned by a live process
+        with self._resume_lock():
+            resumed = self._resume_unfinished()
+        if resumed:
+            logger.info("Resumed %d unfinished generation job(s)", resumed)
+
+    def start_watcher(self, interval: float):
+        """Resume orphaned jobs every ``interval`` seconds on a daemon thread.
+
+        Jobs of a server process that exits while others keep running (e.g.
+        a worker replaced by a graceful reload) are otherwise only resumed
+        on the next full restart.
+        """
+        if self._watcher is not None or interval <= 0:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="job-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """Stop the background watcher"""
+        self._stop.set()
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.resume_unfinished()
+            except OSError as e:
+                logger.error("Checking for orphaned jobs failed: %s", e)
+
+    @contextmanager
+    def _resume_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(
+            os.path.join(self.jobs_dir, ".resume.lock"), "a", encoding="utf-8"
+        ) as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _resume_unfinished(self) -> int:
+        resumed = 0
+        for file_name in os.listdir(self.jobs_dir):
+            if not file_name.endswith(".json"):
+                continue
+            job = self._load(file_name[:-5])
+            if job is None:
+                continue
+
+            if job["status"] not in UNFINISHED_STATUSES:
+                self._remove_if_expired(job)
+                continue
+            owner_pid = job.get("owner_pid")
+            if owner_pid == os.getpid():
+                with self._lock:
+                    if job["id"] in self._jobs:
+                        continue  # Queued or running in this process
+            elif _pid_alive(owner_pid):
+                continue  # Still being worked on by another server process
+
+            with self._lock:
+                job["status"] = QUEUED
+                job["owner_pid"] = os.getpid()
+                self._jobs[job["id"]] = job
+                self._save(job)
+            self._executor.submit(self._run, job["id"])
+            resumed += 1
+        return resumed
+
+    def _run(self, job_id: str):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = RUNNING
+            job["started_at"] = datetime.now().isoformat()
+            self._save(job)
+            params = job["params"]
+
+        def on_field(platform, field, value):
+            if field in ("headline", "body_text"):
+                self._update_progress(job_id, platform, {field: value})
+
+        def on_progress(platform, stage, status):
+            self._update_progress(job_id, platform, {stage: status})
+
+        try:
+            result = self.runner(params, on_field=on_field, on_progress=on_progress)
+            status = COMPLETED if result.get("status") == "success" else FAILED
+            error = None if status == COMPLETED else result.get("message")
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Generation job %s failed: %s", job_id, str(e))
+            result, status, error = None, FAILED, str(e)
+
+        with self._lock:
+            job["status"] = status
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = datetime.now().isoformat()
+            if not params.get("generate_images"):
+                for progress in job["progress"].values():
+                    if progress.get("image") == "pending":
+                        progress["image"] = "skipped"
+            self._save(job)
+        logger.info("Generation job %s finished with status %s", job_id, status)
+
+    def _update_progress(self, job_id: str, platform: str, changes: dict):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["progress"].setdefault(platform, {}).update(changes)
+            self._save(job)
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: dict):
+        """Write the job file atomically (caller holds the lock)"""
+        path = self._job_path(job["id"])
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(job, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error("Could not save job %s: %s", job["id"], e)
+
+    def _load(self, job_id: str) -> Optional[dict]:
+        # Job ids are uuid hex strings; reject anything else (e.g. "../x")
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._job_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove_if_expired(self, job: dict):
+        path = self._job_path(job["id"])
+        try:
+            if time.time() - os.path.getmtime(path) > self.retention_seconds:
+                os.remove(path)
+        except OSError:
+            pass
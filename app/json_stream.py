@@ -0,0 +1,164 @@
+"""
+Helpers for parsing JSON produced by a language model.
+
+``parse_json_text`` parses a complete response that may be wrapped in a
+markdown code fence. ``IncrementalJsonParser`` parses a streamed response
+chunk by chunk and reports each top-level field of the JSON object as soon
+as its value is complete.
+"""
+
+import json
+from typing import Any, Dict, List, Tuple
+
+# Parser states
+_BEFORE_OBJECT = "before_object"
+_EXPECT_KEY = "expect_key"
+_IN_KEY = "in_key"
+_EXPECT_COLON = "expect_colon"
+_EXPECT_VALUE = "expect_value"
+_IN_VALUE = "in_value"
+_IN_LITERAL = "in_literal"
+_AFTER_VALUE = "after_value"
+_DONE = "done"
+
+
+def strip_code_fence(text: str) -> str:
+    """Remove a surrounding markdown code fence such as ```json ... ```"""
+    text = text.strip()
+    if text.startswith("```"):
+        # Drop the opening fence line, including an optional language tag
+        newline = text.find("\n")
+        text = text[newline + 1 :] if newline != -1 else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+def parse_json_text(text: str) -> Any:
+    """Parse JSON from a model response, tolerating a markdown code fence"""
+    return json.loads(strip_code_fence(text))
+
+
+class IncrementalJsonParser:
+    """Incrementally parse a streamed JSON object.
+
+    Text before the opening brace (such as a code fence) is ignored.
+    ``feed`` returns the (key, value) pairs of the top-level object whose
+    values were completed by the new chunk.
+    """
+
+    def __init__(self):
+        self.result: Dict[str, Any] = {}
+        self._text = ""
+        self._pos = 0
+        self._state = _BEFORE_OBJECT
+        self._key = None
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def complete(self) -> bool:
+        """True once the closing brace of the top-level object was seen"""
+        return self._state == _DONE
+
+    @property
+    def text(self) -> str:
+        """All text received so far"""
+        return self._text
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk of text and return newly completed fields"""
+        self._text += chunk or ""
+        completed = []
+        text = self._text
+
+        while self._pos < len(text) and self._state != _DONE:
+            char = text[self._pos]
+            state = self._state
+
+            if state == _BEFORE_OBJECT:
+                if char == "{":
+                    self._state = _EXPECT_KEY
+            elif state == _EXPECT_KEY:
+                if char == '"':
+                    self._start = self._pos
+                    self._escape = False
+                    self._state = _IN_KEY
+                elif char == "}":
+                    self._state = _DONE
+            elif state == _IN_KEY:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._key = json.loads(text[self._start : self._pos + 1])
+                    self._state = _EXPECT_COLON
+            elif state == _EXPECT_COLON:
+                if char == ":":
+                    self._state = _EXPECT_VALUE
+            elif state == _EXPECT_VALUE:
+                if not char.isspace():
+                    self._start_value(char)
+            elif state == _IN_VALUE:
+                if self._scan_value(char):
+                    completed.append(self._finish_value(self._pos + 1))
+                    self._state = _AFTER_VALUE
+            elif state == _IN_LITERAL:
+                if char in ",}" or char.isspace():
+                    completed.append(self._finish_value(self._pos))
+                    self._state = _AFTER_VALUE
+                    # Re-read the delimiter in the new state
+                    continue
+            elif state == _AFTER_VALUE:
+                if char == ",":
+                    self._state = _EXPECT_KEY
+                elif char == "}":
+                    self._state = _DONE
+
+            self._pos += 1
+
+        return completed
+
+    def _start_value(self, char: str):
+        self._start = self._pos
+        self._escape = False
+        if char == '"':
+            self._in_string = True
+            self._depth = 0
+            self._state = _IN_VALUE
+        elif char in "[{":
+            self._in_string = False
+            self._depth = 1
+            self._state = _IN_VALUE
+        else:
+            # Number, true, false or null
+            self._state = _IN_LITERAL
+
+    def _scan_value(self, char: str) -> bool:
+        """Advance through a string/array/object value; True when it ends"""
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                return self._depth == 0
+            return False
+
+        if char == '"':
+            self._in_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}":
+            self._depth -= 1
+            return self._depth == 0
+        return False
+
+    def _finish_value(self, end: int) -> Tuple[str, Any]:
+        value = json.loads(self._text[self._start : end])
+        self.result[self._key] = value
+        return self._key, value
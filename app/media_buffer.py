@@ -0,0 +1,190 @@
+"""
+Encoded media handed to uploads without copying it.
+
+Uploads used to read each image file into a new ``bytes`` object, and an
+image encoded during generation was written to disk only to be read back
+when it was posted. ``MediaBuffer`` exposes an image as a ``memoryview``:
+either of the encoded bytes still held in memory from generation, or of the
+file mapped read-only with ``mmap``. The view is passed as the request body
+as is, so it is streamed to the socket without intermediate copies.
+
+Encoded images are remembered per file (path, modification time and size)
+up to ``media_buffer_max_mb`` in total, so an image generated and posted by
+the same process is never read back from disk.
+"""
+
+import io
+import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .config import MEDIA_BUFFER_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+
+class MediaReader(io.RawIOBase):
+    """Read-only, seekable file object over a memoryview.
+
+    For APIs that insist on a file object; reads copy only what is asked for.
+    """
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self._view[self._position : self._position + len(buffer)]
+        size = len(chunk)
+        buffer[:size] = chunk
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    @property
+    def len(self) -> int:
+        """Total size, as requests and requests-toolbelt read it"""
+        return len(self._view)
+
+
+class MediaBuffer:
+    """An encoded image as a memoryview, from memory or a mapped file.
+
+    Use as a context manager; the view must not be used after ``close()``.
+    """
+
+    def __init__(self, view: memoryview, source: str, mapping=None):
+        self.view = view
+        # "memory" if the bytes came from generation, "mmap" if from disk
+        self.source = source
+        self._mapping = mapping
+
+    @classmethod
+    def from_file(cls, path: str) -> "MediaBuffer":
+        """Map a file read-only instead of reading it into memory"""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls(memoryview(b""), "mmap")
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(memoryview(mapping), "mmap", mapping)
+
+    @property
+    def size(self) -> int:
+        """Size in bytes"""
+        return self.view.nbytes
+
+    def reader(self) -> MediaReader:
+        """Return a file object over the buffer"""
+        return MediaReader(self.view)
+
+    def close(self):
+        """Release the view and unmap the file"""
+        self.view.release()
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self) -> "MediaBuffer":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EncodedMediaRegistry:
+    """Encoded images by file, kept in memory up to a total size (LRU)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[int, int, memoryview]]" = OrderedDict()
+
+    def remember(self, path: str, data) -> None:
+        """Keep the bytes just written to ``path`` for later uploads"""
+        size = memoryview(data).nbytes
+        if size == 0 or size > self.max_bytes:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        if stat.st_size != size:
+            return
+        # A read-only view, not a copy: the encoder's buffer stays alive for
+        # as long as the registry or an upload refers to it
+        data = memoryview(data).toreadonly()
+        key = os.path.abspath(path)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (stat.st_mtime_ns, size, data)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def lookup(self, path: str) -> Optional[memoryview]:
+        """Return the remembered bytes if the file has not changed since"""
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            mtime_ns, size, data = entry
+            if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def clear(self):
+        """Forget every remembered image"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+
+_registry = EncodedMediaRegistry(MEDIA_BUFFER_MAX_MB * 1024 * 1024)
+
+
+def remember_encoded(path: str, data) -> None:
+    """Record the encoded bytes of an image file that was just written"""
+    _registry.remember(path, data)
+
+
+def open_media(path: str) -> MediaBuffer:
+    """Return an image file's bytes without copying them.
+
+    Uses the bytes remembered from generation while the file is unchanged and
+    maps the file otherwise. Raises OSError if the file cannot be read.
+    """
+    data = _registry.lookup(path)
+    if data is not None:
+        logger.debug("Using encoded image from memory: %s", path)
+        return MediaBuffer(memoryview(data), "memory")
+    return MediaBuffer.from_file(path)
@@ -0,0 +1,202 @@
+"""
+Cache of uploaded media, keyed by image content.
+
+Retrying or reposting a campaign used to upload the same generated image to
+ImageKit, X, Bluesky or Facebook again. ``MediaUploadCache`` maps the
+SHA-256 of the image bytes, the upload target and the account to the remote
+reference the upload returned (URL, media ID, blob), so an unchanged image
+is only uploaded once. Each target has its own expiry because remote
+references do not live equally long: ImageKit URLs are permanent, X media
+IDs expire after 24 hours and unused Bluesky blobs are deleted after a while.
+
+All server processes share the file: lookups re-read it, and changes are
+merged into its current contents under a file lock before it is rewritten.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import CACHE_DIR, MEDIA_CACHE_ENABLED, MEDIA_CACHE_TTL_HOURS
+from .file_lock import file_lock
+from .media_info import get_media_probe
+
+logger = logging.getLogger(__name__)
+
+# Used for targets without an entry in media_cache_ttl_hours
+DEFAULT_TTL_HOURS = 1
+
+
+class MediaUploadCache:
+    """Remote media references by (content hash, target, account), in a JSON file"""
+
+    def __init__(self, path: str, ttl_hours: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.ttl_hours = dict(ttl_hours or {})
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = self._read()
+
+    def digest(self, image_path: str) -> str:
+        """Hash an image, reusing the hash while the file is unchanged"""
+        return get_media_probe().sha256(image_path)
+
+    def get(self, digest: str, target: str, account: str = "") -> Optional[Any]:
+        """Return the cached reference, or None if missing or expired"""
+        key = self._key(digest, target, account)
+        with self._lock:
+            # Another server process may have uploaded or invalidated it
+            with file_lock(self._lock_path):
+                self._entries = self._read()
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] <= time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["ref"]
+
+    def set(self, digest: str, target: str, ref: Any, account: str = ""):
+        """Store the reference an upload returned"""
+        ttl_hours = float(self.ttl_hours.get(target, DEFAULT_TTL_HOURS))
+        if ttl_hours <= 0:
+            return
+        now = time.time()
+        with self._lock, file_lock(self._lock_path):
+            # Merge into the file's current state, keeping other processes' uploads
+            self._entries = self._read()
+            self._entries[self._key(digest, target, account)] = {
+                "ref": ref,
+                "created": now,
+                "expires_at": now + ttl_hours * 3600,
+            }
+            self._prune(now)
+            self._write()
+
+    def invalidate(self, digest: str, target: str, account: str = ""):
+        """Forget a reference the platform no longer accepts"""
+        with self._lock, file_lock(self._lock_path):
+            self._entries = self._read()
+            if self._entries.pop(self._key(digest, target, account), None):
+                self._write()
+
+    def upload(
+        self,
+        image_path: str,
+        target: str,
+        upload_func: Callable[[], Any],
+        account: str = "",
+    ) -> Tuple[Any, bool]:
+        """Return (reference, reused), calling ``upload_func`` only on a miss"""
+        try:
+            digest = self.digest(image_path)
+        except (OSError, ValueError):
+            # Let the upload report the missing, unreadable or invalid file
+            return upload_func(), False
+
+        ref = self.get(digest, target, account)
+        if ref is not None:
+            logger.info("Reusing %s upload of %s", target, os.path.basename(image_path))
+            return ref, True
+        ref = upload_func()
+        if ref:
+            self.set(digest, target, ref, account)
+        return ref, False
+
+    def forget(self, image_path: str, target: str, account: str = ""):
+        """Forget the reference cached for an image"""
+        try:
+            self.invalidate(self.digest(image_path), target, account)
+        except (OSError, ValueError):
+            pass
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of live entries"""
+        now = time.time()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": sum(
+                    1 for entry in self._entries.values() if entry["expires_at"] > now
+                ),
+            }
+
+    @property
+    def _lock_path(self) -> str:
+        return f"{self.path}.lock"
+
+    @staticmethod
+    def _key(digest: str, target: str, account: str) -> str:
+        # Accounts are hashed so tokens used as account ids are not stored
+        account_id = hashlib.sha256(account.encode("utf-8")).hexdigest()[:16]
+        return f"{target}:{account_id}:{digest}"
+
+    def _prune(self, now: float):
+        for key in [k for k, e in self._entries.items() if e["expires_at"] <= now]:
+            del self._entries[key]
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable media upload cache: %s", e)
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self):
+        """Save all entries atomically (caller holds both locks)"""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(temp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not save media upload cache: %s", e)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+_shared_cache: Optional[MediaUploadCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_media_cache() -> Optional[MediaUploadCache]:
+    """Return the process-wide media upload cache, or None when it is disabled"""
+    global _shared_cache  # pylint: disable=global-statement
+
+    if not MEDIA_CACHE_ENABLED:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = MediaUploadCache(
+                os.path.join(CACHE_DIR, "media_uploads.json"), MEDIA_CACHE_TTL_HOURS
+            )
+        return _shared_cache
+
+
+def cached_upload(
+    image_path: str, target: str, upload_func: Callable[[], Any], account: str = ""
+) -> Tuple[Any, bool]:
+    """Upload through the shared cache; uploads directly when it is disabled"""
+    cache = get_media_cache()
+    if cache is None:
+        return upload_func(), False
+    return cache.upload(image_path, target, upload_func, account)
+
+
+def forget_upload(image_path: str, target: str, account: str = ""):
+    """Drop a cached reference from the shared cache, if it is enabled"""
+    cache = get_media_cache()
+    if cache is not None:
+        cache.forget(image_path, target, account)
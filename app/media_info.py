@@ -0,0 +1,183 @@
+"""
+One header probe per image file.
+
+Posters used to check an image with ``os.path.exists`` and
+``os.path.getsize``, guess its content type from the file extension (the
+generator saves JPEGs as ``.png``) and, for Facebook, decode it completely
+with ``verify()``. ``probe_media`` reads only the image header, plus the last
+bytes to catch truncated files, and returns a ``MediaInfo`` with the format,
+dimensions, size and content type. Results are cached by path, modification
+time and size, so the posters, the upload cache and the web interface share
+one probe per file. The SHA-256 of the file is added on first request.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from .media_buffer import open_media
+
+logger = logging.getLogger(__name__)
+
+# How the encoded data of each format ends; used to detect truncated files
+_TRAILERS = {
+    "JPEG": b"\xff\xd9",
+    "PNG": b"IEND\xaeB`\x82",
+}
+
+# File extension to use for each format when a name has to match the data
+_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+
+
+@dataclass
+class MediaInfo:
+    """What a header probe learned about an image file"""
+
+    path: str
+    format: str
+    width: int
+    height: int
+    size: int
+    content_type: str
+    # False if the data stops before the format's end marker
+    complete: bool
+    mtime_ns: int
+    sha256: Optional[str] = None
+
+    @property
+    def extension(self) -> str:
+        """File extension matching the image data, e.g. ``.jpg``"""
+        return _EXTENSIONS.get(self.format, os.path.splitext(self.path)[1])
+
+    @property
+    def filename(self) -> str:
+        """Base name of the file with the extension that matches its data"""
+        stem = os.path.splitext(os.path.basename(self.path))[0]
+        return f"{stem}{self.extension}"
+
+
+class MediaProbe:
+    """MediaInfo by (path, mtime, size), kept for the most recent files"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], MediaInfo]]" = (
+            OrderedDict()
+        )
+
+    def probe(self, path: str) -> MediaInfo:
+        """Return the image's MediaInfo, reading its header if not cached.
+
+        Raises FileNotFoundError if the file is missing and ValueError if it
+        is not an image.
+        """
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        info = _read_header(path, stat)
+        with self._lock:
+            self._entries[key] = (signature, info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return info
+
+    def sha256(self, path: str) -> str:
+        """Return the SHA-256 hex digest of the image, hashing it once"""
+        info = self.probe(path)
+        if info.sha256 is None:
+            # Hashes the in-memory or mapped bytes without reading a copy
+            with open_media(path) as media:
+                info.sha256 = hashlib.sha256(media.view).hexdigest()
+        return info.sha256
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of cached probes"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+def _read_header(path: str, stat: os.stat_result) -> MediaInfo:
+    # Imported on first probe, keeping PIL out of server startup
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        # Image.open only parses the header; pixel data is never decoded
+        with Image.open(path) as img:
+            image_format = img.format
+            width, height = img.size
+            content_type = img.get_format_mimetype() or "application/octet-stream"
+    except UnidentifiedImageError as e:
+        raise ValueError(f"Not a supported image: {path}") from e
+
+    complete = True
+    trailer = _TRAILERS.get(image_format)
+    if trailer:
+        with open(path, "rb") as f:
+            f.seek(max(0, stat.st_size - len(trailer)))
+            complete = f.read() == trailer
+
+    return MediaInfo(
+        path=path,
+        format=image_format,
+        width=width,
+        height=height,
+        size=stat.st_size,
+        content_type=content_type,
+        complete=complete,
+        mtime_ns=stat.st_mtime_ns,
+    )
+
+
+_probe = MediaProbe()
+
+
+def get_media_probe() -> MediaProbe:
+    """Return the process-wide probe cache"""
+    return _probe
+
+
+def probe_media(path: str) -> MediaInfo:
+    """Return the MediaInfo of an image file from the shared probe cache"""
+    return _probe.probe(path)
+
+
+def validate_media(path: str, max_bytes: Optional[int] = None) -> MediaInfo:
+    """Probe an image and raise ValueError unless it can be uploaded as is.
+
+    Checks that the file exists, is an image, is not truncated and, if
+    ``max_bytes`` is given, is no larger than that.
+    """
+    try:
+        info = probe_media(path)
+    except FileNotFoundError as e:
+        raise ValueError(f"Image file does not exist: {path}") from e
+    except OSError as e:
+        raise ValueError(f"Image file cannot be read: {e}") from e
+    if not info.complete:
+        raise ValueError(f"Image file is truncated: {path}")
+    if max_bytes is not None and info.size > max_bytes:
+        raise ValueError(f"Image file too large: {info.size} bytes (max {max_bytes})")
+    return info
@@ -0,0 +1,66 @@
+"""
+Platform posters and uploaders, imported on first use.
+
+``AdPoster`` used to import every poster module, and with them tweepy,
+imagekitio, requests and PIL, whenever it was imported, so starting the web
+interface paid for all SDKs before serving a single page. The registry maps
+each platform to the module and class that post to it; a module is imported
+the first time its platform is used and the class is kept for later calls.
+"""
+
+import importlib
+import logging
+import threading
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Platform -> (module relative to this package, class name)
+POSTERS: Dict[str, Tuple[str, str]] = {
+    "facebook": (".facebook_api.facebook_poster", "FacebookPoster"),
+    "twitter": (".twitter_api.twitter_poster", "TwitterPoster"),
+    "bluesky": (".blue_sky_api.blue_sky_poster", "BlueskyPoster"),
+    "instagram": (".instagram_api.instagram_poster", "InstagramPoster"),
+}
+
+# Image hosts used by posters that need a public image URL
+UPLOADERS: Dict[str, Tuple[str, str]] = {
+    "imagekit": (".imagekit_api.imagekit_upload_image", "ImageKitUploader"),
+}
+
+_lock = threading.Lock()
+_loaded: Dict[Tuple[str, str], type] = {}
+
+
+def _load(entry: Tuple[str, str]) -> type:
+    with _lock:
+        cls = _loaded.get(entry)
+        if cls is None:
+            module_name, class_name = entry
+            module = importlib.import_module(module_name, __package__)
+            cls = _loaded[entry] = getattr(module, class_name)
+            logger.debug("Loaded %s from %s", class_name, module.__name__)
+        return cls
+
+
+def get_poster_class(platform: str) -> type:
+    """Return the poster class of a platform, importing its module if needed.
+
+    Raises ValueError for an unknown platform.
+    """
+    if platform not in POSTERS:
+        raise ValueError(f"Unsupported platform: {platform}")
+    return _load(POSTERS[platform])
+
+
+def get_uploader_class(name: str) -> type:
+    """Return an image uploader class, importing its module if needed"""
+    if name not in UPLOADERS:
+        raise ValueError(f"Unsupported image uploader: {name}")
+    return _load(UPLOADERS[name])
+
+
+def loaded_platforms() -> list:
+    """Return the platforms whose poster module has been imported"""
+    with _lock:
+        return [platform for platform, entry in POSTERS.items() if entry in _loaded]
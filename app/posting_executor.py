@@ -0,0 +1,179 @@
+"""
+Concurrent posting of one campaign to several platforms.
+
+``PlatformPostingExecutor`` runs one posting task per platform on a shared
+thread pool, so a campaign is published in about the time of its slowest
+platform instead of the sum of all of them. Every platform has its own
+timeout and a failing or hanging platform does not affect the others; the
+outcome of each is collected into one aggregated result.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Per-platform outcomes; a timed-out post may still finish in the background,
+# one that was still queued at its deadline is cancelled and never runs
+COMPLETED = "completed"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+NOT_STARTED = "not_started"
+
+# Aggregated statuses
+PARTIAL = "partial"
+
+# Called as on_result(platform, outcome) as soon as each platform is settled
+ResultCallback = Callable[[str, dict], None]
+
+
+def aggregate_status(outcomes: Dict[str, dict]) -> str:
+    """Return completed, failed or partial for a set of platform outcomes"""
+    succeeded = sum(
+        1 for outcome in outcomes.values() if outcome["status"] == COMPLETED
+    )
+    if outcomes and succeeded == len(outcomes):
+        return COMPLETED
+    return PARTIAL if succeeded else FAILED
+
+
+class PlatformPostingExecutor:
+    """Run posting tasks for several platforms at once with per-platform timeouts.
+
+    A task is a callable that posts to one platform and returns a dict with
+    at least ``status`` (``completed`` or ``failed``); an exception counts as
+    a failure. Python threads cannot be cancelled, so a task that runs past
+    its timeout is reported as ``timed_out`` and left to finish on its own.
+    A task still queued behind other runs at its deadline is cancelled and
+    reported as ``not_started``.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        default_timeout: float = 120,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.default_timeout = default_timeout
+        self.timeouts = dict(timeouts or {})
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(max_workers)), thread_name_prefix="platform-post"
+        )
+
+    def timeout_for(self, platform: str) -> float:
+        """Return the number of seconds a platform's post may take"""
+        return float(self.timeouts.get(platform) or self.default_timeout)
+
+    def run(
+        self,
+        tasks: Dict[str, Callable[[], dict]],
+        on_result: Optional[ResultCallback] = None,
+    ) -> dict:
+        """Run every task concurrently and wait until each one is settled.
+
+        Returns ``{"status", "elapsed_ms", "platforms": {platform: outcome}}``
+        where each outcome has ``status`` and ``duration_ms`` plus whatever
+        the task returned, or ``error`` if it raised or timed out.
+        """
+        started = time.perf_counter()
+        futures = {}
+        deadlines = {}
+        for platform, task in tasks.items():
+            futures[self._executor.submit(self._call, task)] = platform
+            deadlines[platform] = started + self.timeout_for(platform)
+
+        outcomes: Dict[str, dict] = {}
+        pending = set(futures)
+        while pending:
+            next_deadline = min(deadlines[futures[future]] for future in pending)
+            done, pending = wait(
+                pending,
+                timeout=max(0.0, next_deadline - time.perf_counter()),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                platform = futures[future]
+                outcome = future.result()
+                outcome["duration_ms"] = _elapsed_ms(started)
+                self._settle(outcomes, platform, outcome, on_result)
+
+            now = time.perf_counter()
+            for future in [f for f in pending if deadlines[futures[f]] <= now]:
+                platform = futures[future]
+                pending.discard(future)
+                timeout = self.timeout_for(platform)
+                # The deadline runs from submission; a task still waiting for
+                # a pool thread must not start (and post) after it
+                if future.cancel():
+                    logger.warning(
+                        "Posting to %s not started within %.0fs", platform, timeout
+                    )
+                    outcome = {
+                        "status": NOT_STARTED,
+                        "error": f"Not started within {timeout:.0f}s",
+                    }
+                else:
+                    logger.warning(
+                        "Posting to %s timed out after %.0fs", platform, timeout
+                    )
+                    outcome = {
+                        "status": TIMED_OUT,
+                        "error": f"No result after {timeout:.0f}s",
+                    }
+                outcome["duration_ms"] = _elapsed_ms(started)
+                self._settle(outcomes, platform, outcome, on_result)
+
+        return {
+            "status": aggregate_status(outcomes),
+            "elapsed_ms": _elapsed_ms(started),
+            "platforms": {platform: outcomes[platform] for platform in tasks},
+        }
+
+    def run_in_background(
+        self,
+        tasks: Dict[str, Callable[[], dict]],
+        on_result: Optional[ResultCallback] = None,
+        on_finish: Optional[Callable[[dict], None]] = None,
+    ) -> threading.Thread:
+        """Start ``run`` on its own thread and pass the result to ``on_finish``"""
+
+        def coordinate():
+            result = self.run(tasks, on_result)
+            if on_finish is not None:
+                on_finish(result)
+
+        # The coordinator waits on the pool, so it must not run inside it
+        thread = threading.Thread(target=coordinate, name="post-all", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self, wait_for_tasks: bool = True):
+        """Stop accepting tasks and release the worker threads"""
+        self._executor.shutdown(wait=wait_for_tasks)
+
+    @staticmethod
+    def _call(task: Callable[[], dict]) -> dict:
+        try:
+            outcome = dict(task() or {})
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Posting task failed: %s", e)
+            return {"status": FAILED, "error": str(e), "error_type": type(e).__name__}
+        outcome.setdefault("status", COMPLETED)
+        return outcome
+
+    @staticmethod
+    def _settle(outcomes, platform, outcome, on_result):
+        outcomes[platform] = outcome
+        if on_result is None:
+            return
+        try:
+            on_result(platform, outcome)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Posting result callback failed: %s", e)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
@@ -0,0 +1,359 @@
+"""
+Live progress reporting for posting ads.
+
+Posters report each real step of a post (login, image upload, publish, ...)
+through an ``on_step(step, status, message, duration_ms)`` callback. A
+``PostingSession`` collects those steps as events that the web interface
+streams to the browser with server-sent events while the post is running.
+With an events directory, every event is also appended to a JSON-lines file
+so another server process can stream a run it is not executing.
+
+A ``PostingCheckpoint`` holds the outputs of completed steps (uploaded photo
+id, media container id, ...) so a failed post can be retried from the step
+that failed instead of uploading media again or creating a duplicate post.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Called as on_step(step, status, message, duration_ms); status is "running",
+# "done" or "failed" and duration_ms is None while the step is running
+StepCallback = Callable[[str, str, str, Optional[float]], None]
+
+# Session statuses
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+@contextmanager
+def timed_step(on_step: Optional[StepCallback], step: str, message: str):
+    """Report a step as running, then as done or failed with its duration"""
+    _report(on_step, step, "running", message, None)
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        _report(on_step, step, "failed", message, _elapsed_ms(started))
+        raise
+    _report(on_step, step, "done", message, _elapsed_ms(started))
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _report(on_step, step, status, message, duration_ms):
+    if on_step is None:
+        return
+    try:
+        on_step(step, status, message, duration_ms)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Step callback failed: %s", e)
+
+
+class PostingCheckpoint:
+    """Outputs of completed posting steps, kept so a retry can resume.
+
+    ``on_record(values)`` is called with all outputs whenever one is
+    recorded or discarded, so they can be saved with the campaign.
+    """
+
+    def __init__(
+        self,
+        values: Optional[Dict[str, Any]] = None,
+        on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.values: Dict[str, Any] = dict(values or {})
+        self.on_record = on_record
+
+    def __contains__(self, key: str) -> bool:
+        return self.values.get(key) is not None
+
+    def get(self, key: str, default=None):
+        """Return a recorded step output"""
+        return self.values.get(key, default)
+
+    def record(self, key: str, value):
+        """Store a step output and save the checkpoint"""
+        self.values[key] = value
+        self._save()
+
+    def discard(self, key: str):
+        """Forget an output that can no longer be reused"""
+        if self.values.pop(key, None) is not None:
+            self._save()
+
+    def step(
+        self,
+        on_step: Optional[StepCallback],
+        step: str,
+        message: str,
+        key: str,
+        func: Callable[[], Any],
+    ):
+        """Run a posting step unless an earlier attempt recorded its output"""
+        if key in self:
+            logger.info("Reusing %s from an earlier attempt", key)
+            _report(on_step, step, "done", f"{message} (done earlier)", 0.0)
+            return self.values[key]
+        with timed_step(on_step, step, message):
+            value = func()
+        self.record(key, value)
+        return value
+
+    def _save(self):
+        if self.on_record is None:
+            return
+        try:
+            self.on_record(dict(self.values))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Could not save posting checkpoint: %s", e)
+
+
+class PostingSession:
+    """Events of one posting run, readable while the run is in progress"""
+
+    def __init__(self, ad_file: str, platform: str, events_dir: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.ad_file = ad_file
+        self.platform = platform
+        self.status = RUNNING
+        self.started = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.events: List[dict] = []
+        self._condition = threading.Condition()
+        self.log_path = (
+            os.path.join(events_dir, f"{self.id}.jsonl") if events_dir else None
+        )
+        if self.log_path is not None:
+            # Created up front so other processes know the run before its
+            # first event
+            try:
+                open(self.log_path, "a", encoding="utf-8").close()
+            except OSError as e:
+                logger.warning("Could not create posting event log: %s", e)
+
+    def on_step(
+        self, step: str, status: str, message: str, duration_ms: Optional[float]
+    ):
+        """Step callback handed to the posters"""
+        self.emit(
+            {
+                "event": "step",
+                "step": step,
+                "status": status,
+                "message": message,
+                "duration_ms": duration_ms,
+                "elapsed_ms": _elapsed_ms(self.started),
+            }
+        )
+
+    def emit(self, event: dict):
+        """Append an event and wake up readers"""
+        with self._condition:
+            self.events.append(event)
+            self._log(event)
+            self._condition.notify_all()
+
+    def finish(self, status: str, **result):
+        """Record the final result event and mark the session finished"""
+        with self._condition:
+            self.status = status
+            self.finished_at = time.time()
+            self.events.append(
+                {
+                    "event": "result",
+                    "status": status,
+                    "elapsed_ms": _elapsed_ms(self.started),
+                    **result,
+                }
+            )
+            self._log(self.events[-1])
+            self._condition.notify_all()
+
+    def _log(self, event: dict):
+        """Append an event to the log file (caller holds the condition)"""
+        if self.log_path is None:
+            return
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not log posting event: %s", e)
+
+    def result(self) -> Optional[dict]:
+        """Return the final result event, or None while the run is going"""
+        with self._condition:
+            if self.status == RUNNING:
+                return None
+            return self.events[-1]
+
+    def steps(self) -> List[dict]:
+        """Return the finished (done or failed) steps with their timings"""
+        with self._condition:
+            return [
+                {
+                    "step": event["step"],
+                    "message": event["message"],
+                    "status": event["status"],
+                    "duration_ms": event["duration_ms"],
+                }
+                for event in self.events
+                if event["event"] == "step" and event["status"] != "running"
+            ]
+
+    def wait_for_events(
+        self, start: int, timeout: float = 15.0
+    ) -> Tuple[List[dict], bool]:
+        """Return events from index ``start`` and whether the run has finished.
+
+        Blocks for up to ``timeout`` seconds while there is nothing new.
+        """
+        with self._condition:
+            if len(self.events) <= start and self.status == RUNNING:
+                self._condition.wait(timeout)
+            return self.events[start:], self.status != RUNNING
+
+
+class StoredPostingSession:
+    """Read-only view of a posting run logged by another server process.
+
+    The run is treated as failed if its log disappears or is not written to
+    for ``stale_after`` seconds, e.g. because the process posting it died.
+    """
+
+    # How often the log file is re-read while waiting for new events
+    poll_seconds = 0.25
+
+    def __init__(
+        self, session_id: str, log_path: str, stale_after: Optional[float] = None
+    ):
+        self.id = session_id
+        self.log_path = log_path
+        self.stale_after = stale_after
+
+    def _read(self) -> Tuple[List[dict], Optional[float]]:
+        """Return the logged events and the log's modification time"""
+        events = []
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                modified = os.fstat(f.fileno()).st_mtime
+                for line in f:
+                    # A line still being written has no newline yet
+                    if not line.endswith("\n"):
+                        break
+                    events.append(json.loads(line))
+        except FileNotFoundError:
+            return events, None
+        except (OSError, ValueError):
+            pass
+        else:
+            return events, modified
+        return events, time.time()
+
+    def _abandoned(self, modified: Optional[float]) -> Optional[str]:
+        if modified is None:
+            return "The posting run's event log is gone"
+        if self.stale_after and time.time() - modified > self.stale_after:
+            return f"No progress from the posting run for {self.stale_after:.0f}s"
+        return None
+
+    def wait_for_events(
+        self, start: int, timeout: float = 15.0
+    ) -> Tuple[List[dict], bool]:
+        """Return events from index ``start`` and whether the run has finished"""
+        deadline = time.monotonic() + timeout
+        while True:
+            events, modified = self._read()
+            finished = bool(events) and events[-1]["event"] == "result"
+            if not finished:
+                reason = self._abandoned(modified)
+                if reason:
+                    logger.warning("Posting run %s abandoned: %s", self.id, reason)
+                    events.append(
+                        {
+                            "event": "result",
+                            "status": FAILED,
+                            "message": reason,
+                            "error_type": "Abandoned",
+                        }
+                    )
+                    finished = True
+            if len(events) > start or finished or time.monotonic() >= deadline:
+                return events[start:], finished
+            time.sleep(self.poll_seconds)
+
+
+class PostingSessions:
+    """Registry of posting sessions; finished ones are kept for a while.
+
+    With ``events_dir`` each session logs its events there, and ``get``
+    finds sessions started by other server processes through their logs.
+    """
+
+    def __init__(
+        self,
+        retention_seconds: float = 600,
+        events_dir: Optional[str] = None,
+        stale_after: Optional[float] = None,
+    ):
+        self.retention_seconds = retention_seconds
+        self.events_dir = events_dir
+        # Seconds without a logged event after which another process's run
+        # is considered dead
+        self.stale_after = stale_after
+        self._sessions: Dict[str, PostingSession] = {}
+        self._lock = threading.Lock()
+        if events_dir:
+            os.makedirs(events_dir, exist_ok=True)
+
+    def create(self, ad_file: str, platform: str) -> PostingSession:
+        """Start tracking a new posting run"""
+        session = PostingSession(ad_file, platform, self.events_dir)
+        with self._lock:
+            self._prune()
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str):
+        """Return a session by id, or None if it is unknown or expired"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None or not self.events_dir:
+            return session
+        # Session ids are uuid hex strings; reject anything else (e.g. "../x")
+        if not session_id.isalnum():
+            return None
+        log_path = os.path.join(self.events_dir, f"{session_id}.jsonl")
+        if not os.path.exists(log_path):
+            return None
+        return StoredPostingSession(session_id, log_path, self.stale_after)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for session_id, session in list(self._sessions.items()):
+            if session.finished_at is not None and session.finished_at < cutoff:
+                del self._sessions[session_id]
+        if not self.events_dir:
+            return
+        # Logs of every process, including runs from before a restart
+        try:
+            names = os.listdir(self.events_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.events_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,167 @@
+"""
+On-disk cache for Gemini ad-text responses.
+
+Entries are content-addressed by a hash of (model, rendered prompt,
+generation params), expire after a TTL and are evicted least-recently-used
+first once the cache grows past its entry or size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from .config import (
+    CACHE_DIR,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_MB,
+    RESPONSE_CACHE_TTL_HOURS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Content-addressed JSON response cache stored as one file per entry"""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 500,
+        max_bytes: int = 50 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: Optional[dict] = None) -> str:
+        """Hash the inputs that determine a response into a cache key"""
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "params": params or {}},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expiry"""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if time.time() - entry["created"] > self.ttl_seconds:
+                os.remove(path)
+                logger.debug("Response cache entry %s expired", key[:12])
+                raise KeyError(key)
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        logger.info("Response cache hit for %s", key[:12])
+        return entry["value"]
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serialisable value under key"""
+        path = self._entry_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"created": time.time(), "value": value}, f, ensure_ascii=False
+                )
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not write response cache entry: %s", e)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._evict()
+
+    def delete(self, key: str):
+        """Remove an entry, e.g. one whose value turned out to be unusable"""
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current cache size"""
+        entries = self._entries()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entries(self):
+        """List (mtime, size, path) for every cache entry"""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            logger.warning("Could not scan response cache: %s", e)
+        return entries
+
+    def _evict(self):
+        """Drop least-recently-used entries until within the size limits"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total_bytes = sum(size for _, size, _ in entries)
+            while entries and (
+                len(entries) > self.max_entries or total_bytes > self.max_bytes
+            ):
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                    total_bytes -= size
+                except OSError:
+                    continue
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None when it is disabled"""
+    global _shared_cache  # pylint: disable=global-statement
+
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                os.path.join(CACHE_DIR, "responses"),
+                ttl_seconds=float(RESPONSE_CACHE_TTL_HOURS) * 3600,
+                max_entries=int(RESPONSE_CACHE_MAX_ENTRIES),
+                max_bytes=int(float(RESPONSE_CACHE_MAX_MB) * 1024 * 1024),
+            )
+        return _shared_cache
@@ -0,0 +1,122 @@
+"""
+Configuration and app templates kept in step across server processes.
+
+Under a multi-process server each worker has its own ``CONFIG`` and
+``APP_TEMPLATES``, and a change saved through one worker (``/config``, the
+app template pages) or edited on disk used to reach only that worker.
+``SharedStateWatcher`` compares the modification times of ``config.json``
+and the app template files at most every ``shared_state_check_seconds`` and
+reloads both when they change. ``reload_shared_state`` updates the existing
+dictionaries in place, so modules that imported ``CONFIG`` or
+``APP_TEMPLATES`` by name see the new values too, and drops the clients
+built from the old settings.
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from . import config as app_config
+
+logger = logging.getLogger(__name__)
+
+_reload_lock = threading.Lock()
+
+
+def state_signature() -> Tuple:
+    """Return (name, mtime, size) of config.json and every app template file"""
+    paths = [app_config.CONFIG_FILE]
+    try:
+        paths += sorted(
+            os.path.join(app_config.input_dir, name)
+            for name in os.listdir(app_config.input_dir)
+            if name.endswith(".json")
+        )
+    except OSError:
+        pass
+
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _update_in_place(target: dict, source: dict):
+    # Update before deleting so readers never see an empty dictionary
+    target.update(source)
+    for key in [key for key in target if key not in source]:
+        del target[key]
+
+
+def reload_shared_state():
+    """Re-read config.json and the app templates into the live dictionaries"""
+    # Imported here: the registries import config themselves
+    from .google_api.client_registry import reset_clients
+    from .http_transport import reset_transport
+
+    with _reload_lock:
+        config_dict = app_config.CONFIG
+        templates = app_config.APP_TEMPLATES
+        importlib.reload(app_config)
+        _update_in_place(config_dict, app_config.CONFIG)
+        _update_in_place(templates, app_config.APP_TEMPLATES)
+        app_config.CONFIG = config_dict
+        app_config.APP_TEMPLATES = templates
+
+    # Drop cached GenAI clients and the HTTP pool so new settings apply
+    reset_clients()
+    reset_transport()
+    logger.info("Reloaded configuration and %d app template(s)", len(templates))
+
+
+class SharedStateWatcher:
+    """Reload configuration and app templates when their files change"""
+
+    def __init__(
+        self,
+        interval: float = 2.0,
+        on_reload: Optional[Callable[[], None]] = None,
+    ):
+        self.interval = interval
+        self._listeners: List[Callable[[], None]] = [on_reload] if on_reload else []
+        self._lock = threading.Lock()
+        self._signature = state_signature()
+        self._checked = time.monotonic()
+
+    def check(self) -> bool:
+        """Reload if the files changed; returns True if a reload happened.
+
+        Cheap enough for every request: the files are looked at no more than
+        once per ``interval`` seconds.
+        """
+        if self.interval <= 0 or time.monotonic() - self._checked < self.interval:
+            return False
+        with self._lock:
+            if time.monotonic() - self._checked < self.interval:
+                return False
+            self._checked = time.monotonic()
+            signature = state_signature()
+            if signature == self._signature:
+                return False
+            self._signature = signature
+        self.reload()
+        return True
+
+    def reload(self):
+        """Reload now and remember the files' current state"""
+        reload_shared_state()
+        with self._lock:
+            self._signature = state_signature()
+            self._checked = time.monotonic()
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning("Shared state listener failed: %s", e)
@@ -1,5 +1,4 @@
 import logging
-import os
 from typing import Optional
 
 import tweepy
@@ -10,10 +9,17 @@ from ..config import (
     TWITTER_API_KEY,
     TWITTER_API_KEY_SECRET,
 )
+from ..media_buffer import open_media
+from ..media_cache import cached_upload
+from ..media_info import validate_media
+from ..posting_progress import PostingCheckpoint
 
 # Configure logging for TwitterPoster
 logger = logging.getLogger(__name__)
 
+# Largest image the simple media upload accepts
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
 
 class TwitterPoster:
     def __init__(
@@ -22,7 +28,13 @@ class TwitterPoster:
         access_token_secret: str = TWITTER_ACCESS_TOKEN_SECRET,
         api_key: str = TWITTER_API_KEY,
         api_key_secret: str = TWITTER_API_KEY_SECRET,
+        on_step=None,
+        checkpoint=None,
     ):
+        self.on_step = on_step
+        self.checkpoint = checkpoint or PostingCheckpoint()
+        # Media IDs belong to the account that uploaded them
+        self.account = access_token
         logger.info(
             f"TwitterPoster initializing with credentials - API Key: {bool(api_key)}, "
             f"Access Token: {bool(access_token)}"
@@ -69,15 +81,38 @@ class TwitterPoster:
         )
 
         try:
-            media_id = self.upload_image(image_path)
-            tweet_id = self.post_tweet_with_image(message, media_id)
+            media_id = self.checkpoint.step(
+                self.on_step,
+                "upload_image",
+                "Uploading image to X",
+                "media_id",
+                lambda: cached_upload(
+                    image_path,
+                    "twitter",
+                    lambda: self.upload_image(image_path),
+                    account=self.account,
+                )[0],
+            )
+            tweet_id = self.checkpoint.step(
+                self.on_step,
+                "publish",
+                "Publishing tweet",
+                "tweet_id",
+                lambda: self.post_tweet_with_image(message, media_id),
+            )
 
             if reply_message is None and app_url:
                 reply_message = f"Get the app on Google Play: {app_url}"
 
             if reply_message:
                 logger.info("Adding reply to Twitter tweet...")
-                self.reply_to_tweet(tweet_id, reply_message)
+                self.checkpoint.step(
+                    self.on_step,
+                    "reply",
+                    "Adding app link reply",
+                    "reply_id",
+                    lambda: self.reply_to_tweet(tweet_id, reply_message),
+                )
 
             return tweet_id
 
@@ -92,19 +127,21 @@ class TwitterPoster:
         """
         logger.info(f"Uploading image to Twitter: {image_path}")
 
-        if not os.path.exists(image_path):
-            error_msg = f"Twitter image file not found: {image_path}"
+        try:
+            info = validate_media(image_path, MAX_IMAGE_BYTES)
+        except ValueError as e:
+            error_msg = f"Twitter image invalid: {e}"
             logger.error(error_msg)
             raise Exception(error_msg)
-
-        # Check file size
-        file_size = os.path.getsize(image_path)
-        logger.info(f"Twitter image file size: {file_size} bytes")
+        logger.info(f"Twitter image file size: {info.size} bytes")
 
         try:
             # The tweepy.API object handles the OAuth1 logic internally
             logger.info("Making Twitter media upload request...")
-            media = self.api.media_upload(image_path)
+            # Hand tweepy the in-memory or mapped image instead of a new file read
+            # The name tells tweepy the real format of the data
+            with open_media(image_path) as buffer:
+                media = self.api.media_upload(info.filename, file=buffer.reader())
             media_id = media.media_id_string
             logger.info(f"Twitter image uploaded successfully. Media ID: {media_id}")
             print(f"Image uploaded successfully. Media ID: {media_id}")
@@ -202,7 +239,13 @@ class TwitterPoster:
                 )
 
             # Use the message with URL for posting
-            tweet_id = self._post_tweet(message=full_message)
+            tweet_id = self.checkpoint.step(
+                self.on_step,
+                "publish",
+                "Publishing tweet",
+                "tweet_id",
+                lambda: self._post_tweet(message=full_message),
+            )
 
             return tweet_id
 
@@ -8,23 +8,65 @@ advertisements across multiple social media platforms.
 import json
 import logging
 import os
+import shutil
+import sqlite3
+import threading
 from datetime import datetime
 
 from flask import (
     Flask,
+    Response,
+    abort,
     flash,
     jsonify,
     make_response,
     redirect,
     render_template,
     request,
-    send_from_directory,
     url_for,
 )
+from werkzeug.utils import safe_join
 
 from .AdPoster import AdPoster
-from .config import APP_TEMPLATES, CONFIG, PLATFORM_SETTINGS, save_config
-from .PosterGenerator import AppInfo
+from .app_index import AppIndex, backfill_app_keys_once
+from .campaign_index import SORT_OPTIONS, STATUS_FILTERS, CampaignIndex
+from .campaign_repository import CampaignRepository
+from .config import (
+    APP_TEMPLATES,
+    CACHE_DIR,
+    CAMPAIGN_CACHE_SIZE,
+    CAMPAIGN_INDEX_POLL_SECONDS,
+    CAMPAIGNS_PER_PAGE,
+    CONFIG,
+    GENERATION_JOB_WORKERS,
+    JOB_RESUME_CHECK_SECONDS,
+    MASTER_IMAGE_MODE,
+    PLATFORM_SETTINGS,
+    POST_TIMEOUT_SECONDS,
+    POST_TIMEOUTS_BY_PLATFORM,
+    POSTING_WORKERS,
+    SHARED_STATE_CHECK_SECONDS,
+    save_config,
+)
+from .image_server import (
+    file_version,
+    get_thumbnail_cache,
+    image_response,
+    thumbnail_response,
+)
+from .job_queue import JobManager
+from .media_cache import get_media_cache
+from .media_info import get_media_probe
+from .posting_executor import NOT_STARTED, PlatformPostingExecutor
+from .posting_progress import (
+    COMPLETED,
+    FAILED,
+    PostingCheckpoint,
+    PostingSessions,
+    timed_step,
+)
+from .response_cache import get_response_cache
+from .shared_state import SharedStateWatcher
 
 app = Flask(__name__)
 app.secret_key = "adposter-secret-key-2025"  # Required for flash messages
@@ -43,12 +85,42 @@ if not os.path.exists(OUTPUT_DIR):
     except OSError as e:
         logging.error("Could not create output directory %s: %s", OUTPUT_DIR, e)
 
+# Parsed campaign files, shared by every route that reads or writes them
+campaigns = CampaignRepository(OUTPUT_DIR, CAMPAIGN_CACHE_SIZE)
+
+# App name/URL lookups; rebuilt whenever the app templates change
+app_index = AppIndex(APP_TEMPLATES)
+# Add app keys to campaigns saved before they were recorded (runs once)
+backfill_app_keys_once(
+    campaigns, app_index, os.path.join(CACHE_DIR, "app_keys_backfilled.json")
+)
+
+# Picks up configuration and app template changes made by other processes
+shared_state = SharedStateWatcher(
+    SHARED_STATE_CHECK_SECONDS, on_reload=lambda: app_index.rebuild(APP_TEMPLATES)
+)
+
+
+@app.before_request
+def refresh_shared_state():
+    """Reload configuration and app templates if another worker changed them."""
+    shared_state.check()
+
+
+# Campaign metadata for the home page; the watcher picks up outside changes
+campaign_index = CampaignIndex(
+    campaigns, os.path.join(CACHE_DIR, "campaign_index.db"), app_index
+)
+campaign_index.sync()
+campaign_index.start_watcher(float(CAMPAIGN_INDEX_POLL_SECONDS))
+
 
-def get_images_for_ad(ad_file):
-    """Retrieve image files associated with a specific ad by reading the JSON file."""
-    ad_path = os.path.join(OUTPUT_DIR, ad_file)
+def get_images_for_ad(ad_file, ad_data=None):
+    """Retrieve image files associated with a specific ad.
 
-    if not os.path.exists(ad_path):
+    Pass ``ad_data`` when the campaign has already been loaded.
+    """
+    if ad_data is None and not campaigns.exists(ad_file):
         logging.debug("Ad file %s does not exist", ad_file)
         return [], {}
 
@@ -56,8 +128,8 @@ def get_images_for_ad(ad_file):
     platform_images = {}
 
     try:
-        with open(ad_path, "r", encoding="utf-8") as f:
-            ad_data = json.load(f)
+        if ad_data is None:
+            ad_data = campaigns.load(ad_file)
 
         # Check each platform for image_path
         for platform, platform_data in ad_data.items():
@@ -96,140 +168,32 @@ def get_images_for_ad(ad_file):
     return images, platform_images
 
 
-@app.route("/")
-def home():
-    """Display a list of generated ads with enhanced information."""
-    ads = []
-    # Get all JSON files
-    json_files = [f for f in os.listdir(OUTPUT_DIR) if f.endswith(".json")]
-
-    # Sort files by the timestamp in filename (format: ads_YYYYMMDD_HHMMSS.json)
-    json_files.sort(
-        key=lambda x: (
-            x.split("_")[1:3] if len(x.split("_")) >= 3 else ["00000000", "000000"]
-        ),
-        reverse=True,
-    )
-
-    # Create list of ads with enhanced information
-    for file_name in json_files:
-        ad_path = os.path.join(OUTPUT_DIR, file_name)
-        try:
-            with open(ad_path, "r", encoding="utf-8") as f:
-                ad_data = json.load(f)
-
-            # Extract meaningful information
-            platforms = list(ad_data.keys())
-            app_name = None
-            posted_count = 0
-            total_platforms = len(platforms)
-            creation_date = None
-
-            # Get app name from APP_TEMPLATES by matching content
-            for platform in platforms:
-                platform_data = ad_data[platform]
-
-                # Try to match app name from APP_TEMPLATES
-                if "name" in platform_data and platform_data["name"]:
-                    content_name = platform_data["name"]
-                    # Check if this matches any app in APP_TEMPLATES
-                    for _, app_config in APP_TEMPLATES.items():
-                        if app_config["name"] == content_name:
-                            app_name = app_config["name"]
-                            break
-
-                # If not found by name, try to match by app URL
-                if not app_name and "app_url" in platform_data:
-                    app_url = platform_data["app_url"]
-                    for _, app_config in APP_TEMPLATES.items():
-                        if (
-                            app_config["app_url"] in app_url
-                            or app_url in app_config["app_url"]
-                        ):
-                            app_name = app_config["name"]
-                            break
-
-                # If not found, try to match by keywords in headline/body text
-                if not app_name and "headline" in platform_data:
-                    headline = platform_data["headline"]
-                    body_text = platform_data.get("body_text", "")
-                    content = f"{headline} {body_text}".lower()
-
-                    for _, app_config in APP_TEMPLATES.items():
-                        app_config_name = app_config["name"].lower()
-                        # Check if app name appears in content
-                        if app_config_name in content:
-                            app_name = app_config["name"]
-                            break
-
-                if app_name:
-                    break
-
-            # Count posted platforms
-            for platform in platforms:
-                if "post_time" in ad_data[platform]:
-                    posted_count += 1
-
-            # Extract creation date from filename
-            try:
-                date_part = file_name.split("_")[1]  # YYYYMMDD
-                time_part = file_name.split("_")[2].replace(".json", "")  # HHMMSS
-                creation_date = (
-                    f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:8]} "
-                    f"{time_part[:2]}:{time_part[2:4]}:{time_part[4:6]}"
-                )
-            except (IndexError, ValueError):
-                creation_date = "Unknown"
+# Query string arguments accepted by the campaign listing
+CAMPAIGN_FILTER_ARGS = ("app", "platform", "status", "date_from", "date_to")
 
-            images, platform_images = get_images_for_ad(file_name)
 
-            # Count images per platform - use config for platform names
-            platform_image_counts = {}
-            for platform_key in PLATFORM_SETTINGS.keys():
-                platform_image_counts[platform_key] = (
-                    1 if platform_images.get(platform_key, False) else 0
-                )
+def parse_campaign_query(args):
+    """Read campaign listing filters, sort and paging from request args."""
+    filters = {name: args.get(name, "").strip() for name in CAMPAIGN_FILTER_ARGS}
+    filters = {name: value for name, value in filters.items() if value}
+    return {
+        "filters": filters,
+        "sort": args.get("sort", "newest"),
+        "limit": args.get("limit", CAMPAIGNS_PER_PAGE, type=int),
+        "after": args.get("after") or None,
+        "before": args.get("before") or None,
+    }
 
-            ads.append(
-                {
-                    "file": file_name,
-                    "app_name": app_name or "Unknown App",
-                    "platforms": platforms,
-                    "posted_count": posted_count,
-                    "total_platforms": total_platforms,
-                    "creation_date": creation_date,
-                    "images": images,
-                    "image_count": len(images),
-                    "platform_image_counts": platform_image_counts,
-                    "is_fully_posted": posted_count == total_platforms,
-                    "posting_status": f"{posted_count}/{total_platforms} posted",
-                }
-            )
 
-        except (IOError, OSError, json.JSONDecodeError, ValueError) as e:
-            logging.error("Error reading %s: %s", file_name, e)
-            # Fallback to basic info
-            images, platform_images = get_images_for_ad(file_name)
-            platform_image_counts = {}
-            for platform_key in PLATFORM_SETTINGS.keys():
-                platform_image_counts[platform_key] = (
-                    1 if platform_images.get(platform_key, False) else 0
-                )
-            ads.append(
-                {
-                    "file": file_name,
-                    "app_name": "Error loading",
-                    "platforms": [],
-                    "posted_count": 0,
-                    "total_platforms": 0,
-                    "creation_date": "Unknown",
-                    "images": images,
-                    "image_count": len(images),
-                    "platform_image_counts": platform_image_counts,
-                    "is_fully_posted": False,
-                    "posting_status": "Error",
-                }
-            )
+@app.route("/")
+def home():
+    """Display a page of generated ads from the campaign index."""
+    query = parse_campaign_query(request.args)
+    try:
+        listing = campaign_index.query(**query)
+    except ValueError as e:
+        flash(f"Invalid campaign filter: {e}", "error")
+        return redirect(url_for("home"))
 
     # Check if user needs guidance
     needs_setup = not APP_TEMPLATES or len(APP_TEMPLATES) == 0
@@ -237,8 +201,15 @@ def home():
 
     return render_template(
         "home.html",
-        ads=ads,
-        total_campaigns=len(ads),
+        ads=listing["campaigns"],
+        total_campaigns=listing["total"],
+        next_cursor=listing["next_cursor"],
+        prev_cursor=listing["prev_cursor"],
+        filters=query["filters"],
+        sort=query["sort"],
+        sort_options=list(SORT_OPTIONS),
+        status_options=list(STATUS_FILTERS),
+        app_names=campaign_index.app_names(),
         platform_settings=PLATFORM_SETTINGS,
         app_templates=APP_TEMPLATES,
         needs_setup=needs_setup,
@@ -246,60 +217,29 @@ def home():
     )
 
 
+@app.route("/api/campaigns")
+def api_campaigns():
+    """List campaigns as JSON with filters, sorting and cursor pagination."""
+    try:
+        listing = campaign_index.query(**parse_campaign_query(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", **listing})
+
+
 @app.route("/ad/<ad_file>")
 def view_ad(ad_file):
     """View details of a specific ad with images."""
-    ad_path = os.path.join(OUTPUT_DIR, ad_file)
-    if not os.path.exists(ad_path):
+    if not campaigns.exists(ad_file):
         return "Ad not found", 404
 
-    with open(ad_path, "r", encoding="utf-8") as f:
-        ad_data = json.load(f)
+    ad_data = campaigns.load(ad_file)
 
     # Extract app name using APP_TEMPLATES
-    app_name = None
-    platforms = list(ad_data.keys())
-
-    for platform in platforms:
-        platform_data = ad_data[platform]
-
-        # Try to match app name from APP_TEMPLATES
-        if "name" in platform_data and platform_data["name"]:
-            content_name = platform_data["name"]
-            # Check if this matches any app in APP_TEMPLATES
-            for _, app_config in APP_TEMPLATES.items():
-                if app_config["name"] == content_name:
-                    app_name = app_config["name"]
-                    break
-
-        # If not found by name, try to match by app URL
-        if not app_name and "app_url" in platform_data:
-            app_url = platform_data["app_url"]
-            for _, app_config in APP_TEMPLATES.items():
-                if app_config["app_url"] in app_url or app_url in app_config["app_url"]:
-                    app_name = app_config["name"]
-                    break
-
-        # If not found, try to match by keywords in headline/body text
-        if not app_name and "headline" in platform_data:
-            headline = platform_data["headline"]
-            body_text = platform_data.get("body_text", "")
-            content = f"{headline} {body_text}".lower()
-
-            for _, app_config in APP_TEMPLATES.items():
-                app_config_name = app_config["name"].lower()
-                # Check if app name appears in content
-                if app_config_name in content:
-                    app_name = app_config["name"]
-                    break
-
-        if app_name:
-            break
-
-    if not app_name:
-        app_name = "Unknown App"
-
-    images = get_images_for_ad(ad_file)
+    app_name = app_index.display_name(ad_data)
+
+    images = get_images_for_ad(ad_file, ad_data)
+    thumbnails = get_thumbnail_cache()
     response = make_response(
         render_template(
             "ad_detail.html",
@@ -308,6 +248,8 @@ def view_ad(ad_file):
             images=images,
             app_name=app_name,
             platform_settings=PLATFORM_SETTINGS,
+            thumbnail_widths=thumbnails.widths,
+            thumbnail_width=thumbnails.width_for(640),
         )
     )
     response.headers["Content-Type"] = "text/html"
@@ -347,409 +289,639 @@ def generate_ad_page():
         "generate.html",
         app_templates=app_templates,
         platform_settings=platform_settings,
+        master_image_mode=MASTER_IMAGE_MODE,
+    )
+
+
+def parse_generate_form(form):
+    """Validate the ad generation form.
+
+    Returns (params, None) on success or (None, error_message) on failure.
+    """
+    selected_app_key = form.get("app_name")  # This is actually the app key
+    selected_platforms = form.getlist("platforms")
+    generate_images = form.get("generate_images") == "on"
+    use_cache = form.get("bypass_cache") != "on"
+    master_image = form.get("master_image") == "on"
+    custom_feature = form.get("custom_feature", "").strip()
+
+    # Filter out disabled platforms
+    selected_platforms = [
+        p
+        for p in selected_platforms
+        if not PLATFORM_SETTINGS.get(p, {}).get("disabled", False)
+    ]
+
+    # Validate input
+    if not selected_app_key:
+        return None, "Please select an app"
+
+    if not selected_platforms:
+        return None, "Please select at least one platform"
+
+    # Check if we have any app templates
+    if not APP_TEMPLATES:
+        return None, "No app templates available. Please add at least one app first."
+
+    # Find the app template
+    if selected_app_key not in APP_TEMPLATES:
+        return None, (
+            f"App template not found for key: {selected_app_key}. "
+            f"Available apps: {list(APP_TEMPLATES.keys())}"
+        )
+
+    app_template = APP_TEMPLATES[selected_app_key].copy()
+
+    # Add custom feature to the app template if provided
+    if custom_feature:
+        app_template["key_features"] = app_template.get("key_features", []).copy()
+        app_template["key_features"].append(custom_feature)
+
+    return {
+        "app_key": selected_app_key,
+        "app_template": app_template,
+        "platforms": selected_platforms,
+        "generate_images": generate_images,
+        "use_cache": use_cache,
+        "master_image": master_image,
+        "custom_feature": custom_feature,
+    }, None
+
+
+def run_generation(params, on_field=None, on_progress=None):
+    """Generate the ads described by parse_generate_form() params.
+
+    Returns the JSON-serialisable response body for the generate endpoints.
+    """
+    selected_app_name = params["app_template"]["name"]
+    selected_platforms = params["platforms"]
+
+    # Imported on first generation: the generator loads google.genai and PIL
+    from .PosterGenerator import AppInfo  # pylint: disable=import-outside-toplevel
+
+    # Create AppInfo object
+    app_info = AppInfo(**params["app_template"])
+
+    # Initialize AdPoster and generate ads
+    poster = AdPoster()
+
+    logging.info(
+        "Starting ad generation for %s on platforms: %s",
+        selected_app_name,
+        selected_platforms,
+    )
+
+    # Generate ads
+    ads_data = poster.generate_ads(
+        app_info,
+        selected_platforms,
+        generate_images=params["generate_images"],
+        use_cache=params["use_cache"],
+        on_field=on_field,
+        on_progress=on_progress,
+        app_key=params["app_key"],
+        # Jobs queued before this option existed don't have it
+        master_image=params.get("master_image"),
     )
 
+    if not ads_data:
+        return {
+            "status": "error",
+            "message": "Failed to generate ads. Please check your API configuration.",
+            "errors": poster.generation_errors,
+        }
+
+    if poster.campaign_file:
+        try:
+            campaign_index.refresh_file(os.path.basename(poster.campaign_file))
+        except sqlite3.Error as e:
+            # The campaign is saved; the index watcher picks it up later
+            logging.error("Could not index %s: %s", poster.campaign_file, e)
+
+    # Prepare response data
+    result_data = {
+        "app": selected_app_name,
+        "campaign_file": (
+            os.path.basename(poster.campaign_file) if poster.campaign_file else None
+        ),
+        "platforms": selected_platforms,
+        "generate_images": params["generate_images"],
+        "custom_feature": params["custom_feature"],
+        "ads_generated": len(ads_data),
+        "generated_platforms": list(ads_data.keys()),
+        "failed_platforms": poster.generation_errors,
+        "stage_timings": poster.stage_timings,
+    }
+
+    # Add ad details if available
+    result_data["ads_details"] = {}
+    for platform, ad_content in ads_data.items():
+        result_data["ads_details"][platform] = {
+            "headline": ad_content.headline,
+            "body_text": (
+                ad_content.body_text[:100] + "..."
+                if len(ad_content.body_text) > 100
+                else ad_content.body_text
+            ),
+            "hashtags_count": len(ad_content.hashtags),
+            "has_image": bool(ad_content.image_path),
+            "image_path": ad_content.image_path,
+        }
+
+    logging.info("Successfully generated ads for %d platforms", len(ads_data))
+
+    return {
+        "status": "success",
+        "message": f"Successfully generated ads for {len(ads_data)} platform(s)!",
+        "data": result_data,
+    }
+
+
+# Exceptions reported back to the browser instead of failing the request
+GENERATION_ERRORS = (
+    ValueError,
+    TypeError,
+    KeyError,
+    ConnectionError,
+    TimeoutError,
+    json.JSONDecodeError,
+)
+
+
+def move_legacy_jobs(old_dir, new_dir):
+    """Move job files saved under output/jobs by earlier versions"""
+    if not os.path.isdir(old_dir):
+        return
+    os.makedirs(new_dir, exist_ok=True)
+    for name in os.listdir(old_dir):
+        if name.endswith(".json"):
+            os.replace(os.path.join(old_dir, name), os.path.join(new_dir, name))
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# Background workers for POST /generate; jobs are persisted under cache/jobs,
+# outside the directory served by /output
+JOBS_DIR = os.path.join(CACHE_DIR, "jobs")
+move_legacy_jobs(os.path.join(OUTPUT_DIR, "jobs"), JOBS_DIR)
+generation_jobs = JobManager(JOBS_DIR, run_generation, GENERATION_JOB_WORKERS)
+generation_jobs.resume_unfinished()
+generation_jobs.start_watcher(float(JOB_RESUME_CHECK_SECONDS))
+
+# Live posting runs, streamed to the browser by /posts/<post_id>/events; their
+# event logs let any server process stream a run
+posting_sessions = PostingSessions(
+    events_dir=os.path.join(CACHE_DIR, "posting_events"),
+    stale_after=max([POST_TIMEOUT_SECONDS, *POST_TIMEOUTS_BY_PLATFORM.values()]),
+)
+
+# Runs the platforms of POST /ad/<ad_file>/post_all side by side
+posting_executor = PlatformPostingExecutor(
+    POSTING_WORKERS, POST_TIMEOUT_SECONDS, POST_TIMEOUTS_BY_PLATFORM
+)
+
+
+def job_summary(job):
+    """Return the public view of a generation job."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "app": job["params"]["app_template"].get("name"),
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "progress": job["progress"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
 
 @app.route("/generate", methods=["POST"])
 def generate_ad():
-    """Handle ad generation form submission."""
-    try:
-        # Get form data
-        selected_app_key = request.form.get("app_name")  # This is actually the app key
-        selected_platforms = request.form.getlist("platforms")
-        generate_images = request.form.get("generate_images") == "on"
-        custom_feature = request.form.get("custom_feature", "").strip()
-
-        # Filter out disabled platforms
-        selected_platforms = [
-            p
-            for p in selected_platforms
-            if not PLATFORM_SETTINGS.get(p, {}).get("disabled", False)
-        ]
+    """Queue an ad generation job and return its ID straight away."""
+    params, error_message = parse_generate_form(request.form)
+    if error_message:
+        return jsonify({"status": "error", "message": error_message})
+
+    job = generation_jobs.submit(params, params["platforms"])
+    response = job_summary(job)
+    response["status_url"] = url_for("job_status", job_id=job["id"])
+    return jsonify(response), 202
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Report the status and per-platform progress of a generation job."""
+    job = generation_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(job_summary(job))
+
+
+def resolve_image_path(image_path):
+    """Return the absolute path of a stored ad image, or None if it is missing."""
+    if not image_path:
+        return None
+
+    # Handle relative paths - convert to absolute path
+    if not image_path.startswith("/"):
+        # Remove 'output/' prefix if present in the stored path
+        if image_path.startswith("output/"):
+            image_filename = image_path[7:]  # Remove 'output/' prefix
+        else:
+            image_filename = image_path
+        full_image_path = os.path.join(OUTPUT_DIR, image_filename)
+    else:
+        full_image_path = image_path
 
-        # Validate input
-        if not selected_app_key:
-            return jsonify({"status": "error", "message": "Please select an app"})
+    if not os.path.exists(full_image_path):
+        logging.warning(
+            "Image file not found: %s, posting without image", full_image_path
+        )
+        return None
 
-        if not selected_platforms:
-            return jsonify(
-                {"status": "error", "message": "Please select at least one platform"}
-            )
+    logging.info("Using image: %s", full_image_path)
+    return full_image_path
 
-        # Check if we have any app templates
-        if not APP_TEMPLATES:
-            return jsonify(
-                {
-                    "status": "error",
-                    "message": "No app templates available. Please add at least "
-                    "one app first.",
-                }
-            )
 
-        # Find the app template
-        if selected_app_key not in APP_TEMPLATES:
-            return jsonify(
-                {
-                    "status": "error",
-                    "message": f"App template not found for key: {selected_app_key}. "
-                    f"Available apps: {list(APP_TEMPLATES.keys())}",
-                }
-            )
+def save_posting_result(ad_file, platform, status, steps, error_details=None):
+    """Record the outcome of a posting run in the campaign's platform entry."""
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    changes = {
+        "post_time": current_time,
+        "posting_progress": steps,
+        "posting_status": status,
+    }
+    if error_details:
+        changes["error_details"] = error_details
+        remove = ()
+    else:
+        # The next post of this ad is a new post, not a resumed one
+        remove = ("error_details", "posting_checkpoint")
+    campaigns.update_platform(ad_file, platform, changes, remove=remove)
+    return current_time
 
-        app_template = APP_TEMPLATES[selected_app_key].copy()
-        selected_app_name = app_template["name"]
 
-        # Add custom feature to the app template if provided
-        if custom_feature:
-            app_template["key_features"] = app_template.get("key_features", []).copy()
-            app_template["key_features"].append(custom_feature)
+def posting_checkpoint(ad_file, platform):
+    """Return the steps a failed post completed, saving new ones as they finish."""
+    try:
+        values = campaigns.load(ad_file)[platform].get("posting_checkpoint")
+    except (IOError, OSError, KeyError, ValueError):
+        values = None
 
-        # Create AppInfo object
-        app_info = AppInfo(**app_template)
+    def save(checkpoint_values):
+        campaigns.update_platform(
+            ad_file, platform, {"posting_checkpoint": checkpoint_values}
+        )
+
+    return PostingCheckpoint(values, save)
 
-        # Initialize AdPoster and generate ads
-        poster = AdPoster()
 
-        logging.info(
-            "Starting ad generation for %s on platforms: %s",
-            selected_app_name,
-            selected_platforms,
+def run_post(session, platform, image_path, body_text, app_url):
+    """Post an ad in the background, reporting each step to the session."""
+    logging.info("Starting post process for %s: %s...", platform, body_text[:50])
+    logging.debug(
+        "Posting parameters: platform=%s, image_path=%s, body_text_length=%d, app_url=%s",
+        platform,
+        image_path,
+        len(body_text),
+        app_url,
+    )
+
+    error_details = None
+    try:
+        AdPoster().post_ad(
+            platform,
+            image_path,
+            body_text,
+            app_url,
+            on_step=session.on_step,
+            checkpoint=posting_checkpoint(session.ad_file, platform),
         )
+        logging.info("post_ad method completed successfully for %s", platform)
+    except Exception as post_ad_error:  # pylint: disable=broad-except
+        error_details = {
+            "error_type": type(post_ad_error).__name__,
+            "error_message": str(post_ad_error),
+            "platform": platform,
+            "has_image": bool(image_path),
+            "image_path": image_path if image_path else "None",
+            "body_text_length": len(body_text),
+            "app_url": app_url,
+        }
+        logging.error("Detailed error in post_ad: %s", error_details)
 
-        # Generate ads
-        ads_data = poster.generate_ads(
-            app_info, selected_platforms, generate_images=generate_images
+    status = "failed" if error_details else "completed"
+    post_time = None
+    try:
+        with timed_step(session.on_step, "save", "Updating campaign record"):
+            post_time = save_posting_result(
+                session.ad_file, platform, status, session.steps(), error_details
+            )
+            # The index database may be locked by another server process
+            campaign_index.refresh_file(session.ad_file)
+    except (IOError, OSError, KeyError, ValueError, sqlite3.Error) as e:
+        logging.error("Could not save posting result for %s: %s", platform, e)
+
+    if error_details:
+        session.finish(
+            FAILED,
+            message=f"Failed to post to {platform.title()}: "
+            f"{error_details['error_message']}",
+            error_type=error_details["error_type"],
+            error_details=error_details,
         )
+        return
+
+    logging.info("Successfully completed posting process to %s", platform)
+    session.finish(
+        COMPLETED,
+        message=f"Successfully posted to {platform.title()}!",
+        post_time=post_time,
+        platform_details={
+            "name": platform.title(),
+            "content_length": len(body_text),
+            "has_image": bool(image_path),
+            "image_path": image_path.split("/")[-1] if image_path else None,
+        },
+    )
+
+
+def posting_params(ad_data, platform):
+    """Return (image_path, body_text, app_url) for posting a platform's ad.
+
+    Raises ValueError if the campaign cannot be posted to the platform.
+    """
+    # Check if the platform exists in the ad data
+    if not isinstance(ad_data.get(platform), dict):
+        raise ValueError(f"Platform {platform} not found in ad data")
+
+    platform_data = ad_data[platform]
+
+    # Get the required data for posting
+    body_text = platform_data.get("body_text", "")
+    app_url = platform_data.get("app_url", "")
+
+    # Validate required data
+    if not body_text:
+        raise ValueError("No body text found for this platform")
+
+    image_path = resolve_image_path(platform_data.get("image_path", ""))
+    return image_path, body_text, app_url
+
 
-        if not ads_data:
+def is_posted(platform_data):
+    """Return True if a platform's ad has already been posted successfully."""
+    return bool(platform_data.get("post_time")) and (
+        platform_data.get("posting_status") != "failed"
+    )
+
+
+@app.route("/ad/<ad_file>/<platform>/post", methods=["POST"])
+def post_ad_to_platform(ad_file, platform):
+    """Start posting an ad to a specific platform.
+
+    Posting runs in the background; the response carries the URL of a
+    server-sent events stream that reports every step as it happens.
+    """
+    try:
+        # Load the ad data from the JSON file
+        if not campaigns.exists(ad_file):
             return jsonify(
-                {
-                    "status": "error",
-                    "message": "Failed to generate ads. Please check your API configuration.",
-                }
+                {"status": "error", "message": f"Ad file {ad_file} not found"}
             )
 
-        # Prepare response data
-        result_data = {
-            "app": selected_app_name,
-            "platforms": selected_platforms,
-            "generate_images": generate_images,
-            "custom_feature": custom_feature,
-            "ads_generated": len(ads_data),
-            "generated_platforms": list(ads_data.keys()),
-        }
-
-        # Add ad details if available
-        if ads_data:
-            result_data["ads_details"] = {}
-            for platform, ad_content in ads_data.items():
-                result_data["ads_details"][platform] = {
-                    "headline": ad_content.headline,
-                    "body_text": (
-                        ad_content.body_text[:100] + "..."
-                        if len(ad_content.body_text) > 100
-                        else ad_content.body_text
-                    ),
-                    "hashtags_count": len(ad_content.hashtags),
-                    "has_image": bool(ad_content.image_path),
-                    "image_path": ad_content.image_path,
-                }
-
-        logging.info("Successfully generated ads for %d platforms", len(ads_data))
+        ad_data = campaigns.load(ad_file)
+        image_path, body_text, app_url = posting_params(ad_data, platform)
 
+    except (IOError, OSError, json.JSONDecodeError, ValueError) as e:
+        logging.error("Error posting ad to %s: %s", platform, str(e))
         return jsonify(
             {
-                "status": "success",
-                "message": f"Successfully generated ads for {len(ads_data)} platform(s)!",
-                "data": result_data,
+                "status": "error",
+                "message": "Failed to post to %s: %s" % (platform, str(e)),
             }
         )
 
-    except (
-        ValueError,
-        TypeError,
-        KeyError,
-        ConnectionError,
-        TimeoutError,
-        json.JSONDecodeError,
-    ) as e:
-        logging.error("Error generating ads: %s", str(e))
-        return jsonify(
+    session = posting_sessions.create(ad_file, platform)
+    threading.Thread(
+        target=run_post,
+        args=(session, platform, image_path, body_text, app_url),
+        name=f"post-{platform}",
+        daemon=True,
+    ).start()
+
+    return (
+        jsonify(
             {
-                "status": "error",
-                "message": "An error occurred during ad generation: %s" % str(e),
+                "status": "accepted",
+                "post_id": session.id,
+                "events_url": url_for("posting_events", post_id=session.id),
             }
-        )
+        ),
+        202,
+    )
 
 
-@app.route("/ad/<ad_file>/<platform>/post", methods=["POST"])
-def post_ad_to_platform(ad_file, platform):
-    """Handle posting an ad to a specific platform."""
-    try:
-        # Load the ad data from the JSON file
-        ad_path = os.path.join(OUTPUT_DIR, ad_file)
+@app.route("/ad/<ad_file>/post_all", methods=["POST"])
+def post_ad_to_all_platforms(ad_file):
+    """Start posting an ad to several platforms at the same time.
 
-        if not os.path.exists(ad_path):
+    Takes an optional JSON body ``{"platforms": [...]}``; by default every
+    platform that has not been posted yet is used. Each platform gets its
+    own posting run and event stream, and the run returned as ``post_id``
+    streams a ``platform`` event as each platform finishes, then a
+    ``result`` event with the aggregated outcome.
+    """
+    try:
+        if not campaigns.exists(ad_file):
             return jsonify(
                 {"status": "error", "message": f"Ad file {ad_file} not found"}
             )
+        ad_data = campaigns.load(ad_file)
+    except (IOError, OSError, ValueError) as e:
+        logging.error("Error loading %s for posting: %s", ad_file, str(e))
+        return jsonify({"status": "error", "message": f"Failed to load ad: {e}"})
+
+    requested = (request.get_json(silent=True) or {}).get("platforms")
+    if requested is None:
+        requested = [
+            platform
+            for platform, platform_data in ad_data.items()
+            if isinstance(platform_data, dict) and not is_posted(platform_data)
+        ]
 
-        with open(ad_path, "r", encoding="utf-8") as f:
-            ad_data = json.load(f)
-
-        # Check if the platform exists in the ad data
-        if platform not in ad_data:
-            return jsonify(
-                {
-                    "status": "error",
-                    "message": f"Platform {platform} not found in ad data",
-                }
-            )
+    tasks, runs, sessions, skipped = {}, {}, {}, {}
+    for platform in requested:
+        try:
+            params = posting_params(ad_data, platform)
+        except ValueError as e:
+            skipped[platform] = str(e)
+            continue
+        session = sessions[platform] = posting_sessions.create(ad_file, platform)
+        tasks[platform] = posting_task(session, platform, *params)
+        runs[platform] = {
+            "post_id": session.id,
+            "events_url": url_for("posting_events", post_id=session.id),
+        }
 
-        platform_data = ad_data[platform]
+    if not tasks:
+        return jsonify(
+            {
+                "status": "error",
+                "message": "No platforms to post to",
+                "skipped": skipped,
+            }
+        )
 
-        # Get the required data for posting
-        body_text = platform_data.get("body_text", "")
-        app_url = platform_data.get("app_url", "")
-        image_path = platform_data.get("image_path", "")
+    batch = posting_sessions.create(ad_file, ",".join(tasks))
 
-        # Validate required data
-        if not body_text:
-            return jsonify(
-                {"status": "error", "message": "No body text found for this platform"}
+    def on_result(platform, outcome):
+        if outcome["status"] == NOT_STARTED:
+            # The task never ran, so nothing else ends the platform's stream
+            sessions[platform].finish(
+                FAILED,
+                message=f"Posting to {platform.title()} did not start in time",
+                error_type="NotStarted",
             )
+        batch.emit({"event": "platform", "platform": platform, **outcome})
 
-        # Check if image exists if image_path is provided
-        if image_path:
-            # Handle relative paths - convert to absolute path
-            if not image_path.startswith("/"):
-                # Remove 'output/' prefix if present in the stored path
-                if image_path.startswith("output/"):
-                    image_filename = image_path[7:]  # Remove 'output/' prefix
-                else:
-                    image_filename = image_path
-                full_image_path = os.path.join(OUTPUT_DIR, image_filename)
-            else:
-                full_image_path = image_path
-
-            if not os.path.exists(full_image_path):
-                logging.warning(
-                    "Image file not found: %s, posting without image", full_image_path
-                )
-                image_path = None
-            else:
-                image_path = full_image_path
-                logging.info("Using image: %s", image_path)
+    def on_finish(result):
+        status = result.pop("status")
+        posted = [p for p, o in result["platforms"].items() if o["status"] == COMPLETED]
+        message = f"Posted to {len(posted)} of {len(tasks)} platform(s)"
+        batch.finish(status, message=message, skipped=skipped, **result)
+        logging.info("Post to all for %s: %s", ad_file, message)
 
-        # Initialize AdPoster and post the ad
-        poster = AdPoster()
+    posting_executor.run_in_background(tasks, on_result, on_finish)
 
-        logging.info("Starting post process for %s: %s...", platform, body_text[:50])
+    return (
+        jsonify(
+            {
+                "status": "accepted",
+                "post_id": batch.id,
+                "events_url": url_for("posting_events", post_id=batch.id),
+                "platforms": runs,
+                "skipped": skipped,
+            }
+        ),
+        202,
+    )
 
-        # Create progress tracking
-        progress_steps = []
 
-        try:
-            # Step 1: Initialize platform connection
-            progress_steps.append(f"🔗 Connecting to {platform.title()} API...")
-            logging.info("Step 1: Initializing %s connection", platform)
-
-            # Step 2: Prepare content
-            progress_steps.append("📝 Preparing ad content and validating data...")
-            logging.info(
-                "Step 2: Preparing content - Body: %d chars, Image: %s",
-                len(body_text),
-                "Yes" if image_path else "No",
-            )
+def posting_task(session, platform, image_path, body_text, app_url):
+    """Return a task that runs a post and returns the session's result."""
 
-            # Step 3: Platform-specific preparation
-            if platform == "instagram":
-                progress_steps.append("📤 Uploading image to ImageKit service...")
-            elif platform == "facebook":
-                progress_steps.append("🖼️ Processing image for Facebook posting...")
-            elif platform == "twitter":
-                progress_steps.append(
-                    "🐦 Formatting content for Twitter constraints..."
-                )
-            elif platform == "bluesky":
-                progress_steps.append("☁️ Preparing content for BlueSky network...")
-            else:
-                progress_steps.append(
-                    f"⚙️ Configuring {platform.title()} posting parameters..."
-                )
+    def task():
+        run_post(session, platform, image_path, body_text, app_url)
+        result = session.result() or {}
+        return {
+            key: result[key]
+            for key in ("status", "message", "post_time", "error_type")
+            if key in result
+        }
 
-            # Step 4: Upload image (if applicable)
-            if image_path:
-                progress_steps.append(
-                    f"🖼️ Processing and uploading image ({image_path.split('/')[-1]})..."
-                )
-                logging.info("Step 4: Processing image: %s", image_path)
-
-            # Step 5: Post to platform
-            progress_steps.append(f"🚀 Publishing to {platform.title()}...")
-            logging.info("Step 5: Calling post_ad method for %s", platform)
-            logging.debug(
-                "Posting parameters: platform=%s, image_path=%s, body_text_length=%d, app_url=%s",
-                platform,
-                image_path,
-                len(body_text),
-                app_url,
-            )
+    return task
 
-            # Call the post_ad method with detailed error tracking
-            try:
-                poster.post_ad(platform, image_path, body_text, app_url)
-                logging.info("post_ad method completed successfully for %s", platform)
-            except (
-                ValueError,
-                TypeError,
-                KeyError,
-                ConnectionError,
-                TimeoutError,
-                IOError,
-                OSError,
-            ) as post_ad_error:
-                error_details = {
-                    "error_type": type(post_ad_error).__name__,
-                    "error_message": str(post_ad_error),
-                    "platform": platform,
-                    "has_image": bool(image_path),
-                    "image_path": image_path if image_path else "None",
-                    "body_text_length": len(body_text),
-                    "app_url": app_url,
-                }
-                logging.error("Detailed error in post_ad: %s", error_details)
-
-                # Add specific error information to progress
-                progress_steps.append(
-                    f"❌ Posting failed: {error_details['error_type']} - "
-                    f"{error_details['error_message']}"
-                )
 
-                # Update ad data with error information
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                ad_data[platform]["post_time"] = current_time
-                ad_data[platform]["posting_progress"] = progress_steps
-                ad_data[platform]["posting_status"] = "failed"
-                ad_data[platform]["error_details"] = error_details
-
-                # Save error information to file
-                with open(ad_path, "w", encoding="utf-8") as f:
-                    json.dump(ad_data, f, indent=2, ensure_ascii=False)
-
-                return jsonify(
-                    {
-                        "status": "error",
-                        "message": f"Failed to post to {platform.title()}: "
-                        f"{error_details['error_message']}",
-                        "error_type": error_details["error_type"],
-                        "progress_steps": progress_steps,
-                        "error_details": error_details,
-                    }
-                )
+@app.route("/posts/<post_id>/events")
+def posting_events(post_id):
+    """Stream the steps of a posting run as server-sent events.
 
-            # Step 6: Verify posting
-            progress_steps.append("✅ Verifying successful publication...")
-            logging.info("Step 6: Post completed successfully for %s", platform)
-
-            # Step 7: Update records
-            progress_steps.append("💾 Updating campaign records and analytics...")
-            logging.info("Step 7: Updating ad data with timestamp")
-
-            # Step 8: Final confirmation
-            progress_steps.append(f"🎉 Successfully posted to {platform.title()}!")
-
-        except (
-            ValueError,
-            TypeError,
-            KeyError,
-            ConnectionError,
-            TimeoutError,
-            IOError,
-            OSError,
-        ) as post_error:
-            error_msg = str(post_error)
-            error_type = type(post_error).__name__
-            logging.error(
-                "Outer exception in post_ad_to_platform: %s - %s", error_type, error_msg
-            )
-            progress_steps.append(
-                "❌ Unexpected error: %s - %s" % (error_type, error_msg)
-            )
+    ``step`` events report each step as running, then done or failed with
+    its duration; a final ``result`` event carries the outcome.
+    """
+    session = posting_sessions.get(post_id)
+    if session is None:
+        return jsonify({"status": "error", "message": "Posting run not found"}), 404
 
-            # Update ad data with error information
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ad_data[platform]["post_time"] = current_time
-            ad_data[platform]["posting_progress"] = progress_steps
-            ad_data[platform]["posting_status"] = "failed"
-            ad_data[platform]["error_details"] = {
-                "error_type": error_type,
-                "error_message": error_msg,
-                "platform": platform,
-            }
+    # Let a reconnecting EventSource continue where it left off
+    try:
+        start = int(request.headers.get("Last-Event-ID", -1)) + 1
+    except ValueError:
+        start = 0
+
+    def stream():
+        index = start
+        while True:
+            events, finished = session.wait_for_events(index)
+            for event in events:
+                yield "id: %d\nevent: %s\ndata: %s\n\n" % (
+                    index,
+                    event["event"],
+                    json.dumps(event, ensure_ascii=False),
+                )
+                index += 1
+            if finished:
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-            # Save error information to file
-            with open(ad_path, "w", encoding="utf-8") as f:
-                json.dump(ad_data, f, indent=2, ensure_ascii=False)
 
-            return jsonify(
-                {
-                    "status": "error",
-                    "message": f"Unexpected error posting to {platform}: {error_msg}",
-                    "error_type": error_type,
-                    "progress_steps": progress_steps,
-                }
-            )
+@app.route("/cache/stats")
+def cache_stats():
+    """Report hit/miss counters for the ad-text response cache."""
+    cache = get_response_cache()
+    media_cache = get_media_cache()
+    extra = {
+        "campaigns": campaigns.stats(),
+        "media_uploads": media_cache.stats() if media_cache else "disabled",
+        "media_info": get_media_probe().stats(),
+        "thumbnails_rendered": get_thumbnail_cache().rendered,
+    }
+    if cache is None:
+        return jsonify({"status": "disabled", **extra})
+    return jsonify({"status": "enabled", **cache.stats(), **extra})
 
-        # Update the ad data with post time and progress info
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ad_data[platform]["post_time"] = current_time
-        ad_data[platform]["posting_progress"] = progress_steps
-        ad_data[platform]["posting_status"] = "completed"
 
-        # Save the updated ad data back to the file
-        with open(ad_path, "w", encoding="utf-8") as f:
-            json.dump(ad_data, f, indent=2, ensure_ascii=False)
+def output_path(filename):
+    """Return the path of a file in the output directory, or abort with 404.
 
-        logging.info("Successfully completed posting process to %s", platform)
+    Only files directly in the directory are served: subdirectories and
+    hidden entries (e.g. ``.locks``) hold internal state.
+    """
+    if "/" in filename or "\\" in filename or filename.startswith("."):
+        abort(404)
+    path = safe_join(OUTPUT_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    return path
 
-        return jsonify(
-            {
-                "status": "success",
-                "message": f"Successfully posted to {platform.title()}!",
-                "post_time": current_time,
-                "progress_steps": progress_steps,
-                "platform_details": {
-                    "name": platform.title(),
-                    "content_length": len(body_text),
-                    "has_image": bool(image_path),
-                    "image_path": image_path.split("/")[-1] if image_path else None,
-                },
-            }
-        )
 
-    except (
-        ValueError,
-        TypeError,
-        KeyError,
-        ConnectionError,
-        TimeoutError,
-        IOError,
-        OSError,
-    ) as e:
-        logging.error("Error posting ad to %s: %s", platform, str(e))
-        return jsonify(
-            {
-                "status": "error",
-                "message": "Failed to post to %s: %s" % (platform, str(e)),
-            }
-        )
+@app.template_global()
+def image_url(filename, width=None):
+    """URL of an output image, or of its thumbnail ``width`` pixels wide.
+
+    The URL names the file version so browsers may cache it for a year.
+    """
+    filename = filename.split("/")[-1]
+    try:
+        version = file_version(os.path.join(OUTPUT_DIR, filename))
+    except OSError:
+        version = None
+    if width:
+        return url_for("serve_thumbnail", width=width, filename=filename, v=version)
+    return url_for("serve_output_file", filename=filename, v=version)
 
 
 @app.route("/output/<path:filename>")
 def serve_output_file(filename):
-    """Serve files from the output directory."""
-    return send_from_directory(OUTPUT_DIR, filename)
+    """Serve files from the output directory with cache validators."""
+    return image_response(output_path(filename))
+
+
+@app.route("/thumbnails/<int:width>/<path:filename>")
+def serve_thumbnail(width, filename):
+    """Serve a cached thumbnail of an output image."""
+    try:
+        return thumbnail_response(output_path(filename), width)
+    except ValueError:
+        abort(404)
 
 
 # App Management Routes
@@ -784,6 +956,9 @@ def add_app():
 
         # Reload APP_TEMPLATES
         APP_TEMPLATES[app_key] = app_data
+        # Campaign app names are resolved through the templates
+        app_index.rebuild(APP_TEMPLATES)
+        campaign_index.mark_all_stale()
 
         return redirect(url_for("list_apps"))
 
@@ -811,6 +986,9 @@ def edit_app(app_key):
 
         # Reload APP_TEMPLATES
         APP_TEMPLATES[app_key] = app_data
+        # Campaign app names are resolved through the templates
+        app_index.rebuild(APP_TEMPLATES)
+        campaign_index.mark_all_stale()
 
         return redirect(url_for("list_apps"))
 
@@ -831,6 +1009,8 @@ def delete_app(app_key):
     # Remove from APP_TEMPLATES
     if app_key in APP_TEMPLATES:
         del APP_TEMPLATES[app_key]
+    app_index.rebuild(APP_TEMPLATES)
+    campaign_index.mark_all_stale()
 
     return redirect(url_for("list_apps"))
 
@@ -843,9 +1023,8 @@ def delete_campaign(campaign_file):
         return "Invalid campaign file", 400
 
     # Delete the JSON file
-    json_path = os.path.join(OUTPUT_DIR, campaign_file)
-    if os.path.exists(json_path):
-        os.remove(json_path)
+    if campaigns.exists(campaign_file):
+        campaigns.delete(campaign_file)
         logging.info("Deleted campaign file: %s", campaign_file)
 
     # Delete associated images
@@ -861,6 +1040,7 @@ def delete_campaign(campaign_file):
                 os.remove(image_path)
                 logging.info("Deleted image: %s", image_file)
 
+    campaign_index.remove_file(campaign_file)
     return redirect(url_for("home"))
 
 
@@ -903,15 +1083,13 @@ def save_configuration():
         "twitter_client_id": request.form.get("twitter_client_id", ""),
         "twitter_client_secret": request.form.get("twitter_client_secret", ""),
     }
+    # Keep settings that have no form field (e.g. generation_concurrency)
+    config_data = {**CONFIG, **config_data}
 
     # Save configuration
     if save_config(config_data):
-        # Reload configuration
-        import importlib
-
-        from . import config
-
-        importlib.reload(config)
+        # Reload in place and drop clients built from the old settings
+        shared_state.reload()
         flash("Configuration saved successfully!", "success")
     else:
         flash("Error saving configuration!", "error")
@@ -0,0 +1,20 @@
+"""
+WSGI entry point for running AdPoster under a production server.
+
+``python -m app.web_interface`` starts Flask's single-process development
+server with the debugger. Production servers import ``app`` from here
+instead, e.g. ``gunicorn -c gunicorn.conf.py app.wsgi:app`` (see
+``gunicorn.conf.py`` and ``./start-server.sh --production``).
+"""
+
+import logging
+
+from .config import LOG_LEVEL
+
+# Configured before web_interface is imported, whose own DEBUG logging setup
+# for the development server then has no effect
+logging.basicConfig(level=LOG_LEVEL)
+
+from .web_interface import app  # pylint: disable=wrong-import-position
+
+__all__ = ["app"]
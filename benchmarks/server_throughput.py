@@ -0,0 +1,151 @@
+"""
+Compare request throughput of the development server and Gunicorn.
+
+Starts each server on a free local port, sends the same requests to a few
+read-only pages at a fixed concurrency and reports requests per second and
+latency percentiles:
+
+    python benchmarks/server_throughput.py --requests 500 --concurrency 16
+
+The development server is what ``python -m app.web_interface`` runs (Flask's
+server with the debugger); Gunicorn runs with ``gunicorn.conf.py``.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = ["/", "/api/campaigns"]
+
+DEV_SERVER = (
+    "from app.web_interface import app; "
+    "app.run(host='127.0.0.1', port={port}, debug=True, use_reloader=False)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name: str, port: int) -> subprocess.Popen:
+    if name == "dev":
+        command = [sys.executable, "-c", DEV_SERVER.format(port=port)]
+    else:
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "app.wsgi:app",
+        ]
+    # Own process group, so the server's children are stopped with it
+    return subprocess.Popen(
+        command,
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "PYTHONPATH": PROJECT_ROOT},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def stop_server(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def wait_until_ready(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + PATHS[0], timeout=5):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def fetch(url: str) -> float:
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=60) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def run_load(base_url: str, requests: int, concurrency: int) -> dict:
+    urls = [base_url + PATHS[i % len(PATHS)] for i in range(requests)]
+    errors = 0
+    latencies = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(fetch, url) for url in urls]:
+            try:
+                latencies.append(future.result())
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentiles[49] * 1000 if percentiles else 0.0,
+        "p95_ms": percentiles[94] * 1000 if percentiles else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument(
+        "--servers", nargs="+", choices=["dev", "gunicorn"], default=["dev", "gunicorn"]
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests to {', '.join(PATHS)} "
+        f"at concurrency {args.concurrency}"
+    )
+    print(f"{'server':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for name in args.servers:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = start_server(name, port)
+        try:
+            wait_until_ready(base_url)
+            run_load(base_url, args.warmup, args.concurrency)
+            result = run_load(base_url, args.requests, args.concurrency)
+        finally:
+            stop_server(process)
+        print(
+            f"{name:<10} {result['requests_per_second']:>8.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
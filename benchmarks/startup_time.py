@@ -0,0 +1,79 @@
+"""
+Check the cold start import time of the web interface against a budget.
+
+Imports ``app.web_interface`` in fresh interpreters with ``python -X
+importtime``, reports the median cumulative import time and the slowest
+packages, and exits with status 1 if the median is over the budget or if a
+platform SDK that should load on first use was imported at startup:
+
+    python benchmarks/startup_time.py --budget-ms 500
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded only when a platform posts or ads are generated
+LAZY_MODULES = ("tweepy", "google.genai", "imagekitio", "PIL", "requests")
+
+
+def measure(module: str) -> dict:
+    """Import a module in a new interpreter; return {module: cumulative us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "PYTHONPATH": PROJECT_ROOT},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.web_interface")
+    parser.add_argument("--budget-ms", type=float, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # The first run compiles bytecode; it is not a fair cold start
+    measure(args.module)
+    runs = [measure(args.module) for _ in range(max(1, args.runs))]
+    totals = [timings[args.module] / 1000 for timings in runs]
+    median = statistics.median(totals)
+
+    last = runs[-1]
+    print(f"{args.module}: median {median:.1f} ms over {len(runs)} runs")
+    print("Slowest top-level imports (cumulative ms):")
+    top_level = {name: us for name, us in last.items() if "." not in name}
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {name:<30} {us / 1000:>8.1f}")
+
+    failed = False
+    eager = [name for name in LAZY_MODULES if name in last]
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: {median:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print(f"OK: within the {args.budget_ms:.0f} ms budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
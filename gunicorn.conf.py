@@ -0,0 +1,32 @@
+"""
+Gunicorn settings for running AdPoster in production.
+
+    gunicorn -c gunicorn.conf.py app.wsgi:app
+
+Address, worker processes, threads per worker and the request timeout come
+from ``server_bind``, ``server_workers``, ``server_threads`` and
+``server_timeout`` in ``configuration/config.json``.
+
+``kill -HUP <master pid>`` reloads gracefully: new workers are started with
+the current code, configuration and app templates (and the server settings
+above), and the old ones finish their requests before they exit. The
+application is not preloaded into the master so that a reload re-imports it.
+"""
+
+from app.config import load_config
+
+# Read afresh: this file is evaluated again on every reload
+_config = load_config()
+
+bind = _config["server_bind"]
+workers = _config["server_workers"]
+# Threaded workers: posting progress streams hold a connection open
+worker_class = "gthread"
+threads = _config["server_threads"]
+timeout = _config["server_timeout"]
+graceful_timeout = _config["server_timeout"]
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
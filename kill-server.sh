@@ -1,10 +1,10 @@
 #!/bin/bash
 
 # AdPoster Server Kill Script
-# This script stops the running Flask development server
+# This script stops the running Flask development or Gunicorn server
 
 # Find all server processes with multiple patterns
-SERVER_PIDS=$(ps aux | grep -E "(web_interface|app\.web_interface|python.*web_interface)" | grep -v grep | awk '{print $2}')
+SERVER_PIDS=$(ps aux | grep -E "(web_interface|app\.web_interface|python.*web_interface|app\.wsgi)" | grep -v grep | awk '{print $2}')
 
 # Also check for processes using port 5000
 PORT_PIDS=$(lsof -ti :5000 2>/dev/null || true)
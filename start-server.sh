@@ -1,7 +1,8 @@
 #!/bin/bash
 
 # AdPoster Server Startup Script
-# This script starts the Flask development server in the background
+# This script starts the Flask development server in the background.
+# With --production it starts Gunicorn with the settings in gunicorn.conf.py.
 
 # Set the project root directory (relative to script location)
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
@@ -9,8 +10,18 @@ PROJECT_ROOT="$SCRIPT_DIR"
 
 # Set PYTHONPATH and run the server in background
 cd "$PROJECT_ROOT"
+if [ "$1" = "--production" ]; then
+    PYTHONPATH="$PROJECT_ROOT" "$PROJECT_ROOT/adposter_env/bin/gunicorn" -c gunicorn.conf.py app.wsgi:app &
+
+    echo "AdPoster production server started in background (PID: $!)"
+    echo "Server address: see server_bind in configuration/config.json"
+    echo "To reload after changing code or settings, run: kill -HUP $!"
+    echo "To stop the server, run: kill $!"
+    exit 0
+fi
+
 PYTHONPATH="$PROJECT_ROOT" "$PROJECT_ROOT/adposter_env/bin/python" -m app.web_interface &
 
 echo "AdPoster server started in background (PID: $!)"
 echo "Server running at: http://127.0.0.1:5000"
-echo "To stop the server, run: kill $!"
\ No newline at end of file
+echo "To stop the server, run: kill $!"